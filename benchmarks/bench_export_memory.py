@@ -0,0 +1,63 @@
+"""Peak memory of exporting a vocabulary matrix
+
+Builds a KeyedVectors from its memory-mapped .wecache and exports every
+row with get_vectors (whole matrix in memory) or save_vectors (streamed
+into a .npy file a chunk at a time), each in a fresh process.
+Peak RSS (ru_maxrss, Linux) also counts pages of the .wecache read through
+the memory map, which the OS can reclaim.
+
+    $ python -m benchmarks.bench_export_memory --n-vocab 200000 --n-dim 300
+"""
+import argparse
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+
+from word_embedder.embedders import KeyedVectors
+from word_embedder.get_vectors import get_vectors, save_vectors
+
+from .bench_load_bin import write_synthetic_bin
+
+
+EXPORTERS = ['get_vectors', 'save_vectors']
+
+
+def _measure(name: str, path: str) -> None:
+    embedder = KeyedVectors(path=path, binary=True)
+    embedder.build()
+    before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if name == 'get_vectors':
+        get_vectors(embedder)
+    else:
+        save_vectors(embedder, path + '.npy', chunk_size=16384)
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - before
+    print(f"{name:<14}{peak / 2 ** 10:>10.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--n-vocab', type=int, default=200000)
+    parser.add_argument('--n-dim', type=int, default=300)
+    parser.add_argument('--measure', nargs=2, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.measure:
+        _measure(*args.measure)
+        return
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, 'synthetic.bin')
+        write_synthetic_bin(path, n_vocab=args.n_vocab, n_dim=args.n_dim)
+        KeyedVectors(path=path, binary=True).build()  # write the .wecache
+        print(f"{args.n_vocab} x {args.n_dim}, {args.n_vocab * args.n_dim * 4 / 2 ** 20:.1f} MB")
+        print(f"{'exporter':<14}{'peak MB':>10}")
+        for name in EXPORTERS:
+            subprocess.run(
+                [sys.executable, '-m', 'benchmarks.bench_export_memory', '--measure', name, path],
+                check=True,
+            )
+
+
+if __name__ == '__main__':
+    main()
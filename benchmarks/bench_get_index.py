@@ -0,0 +1,66 @@
+"""Per-lookup latency of word -> index resolution
+
+Compares the old linear `list.index` scan with the dict and
+sorted-array vocab indices on a synthetic vocabulary.
+
+    $ python -m benchmarks.bench_get_index --n-vocab 200000
+"""
+import argparse
+import random
+import string
+import sys
+import timeit
+
+from word_embedder.embedders.vocab_index import build_vocab_index
+
+
+def _random_vocab(n_vocab: int, seed: int = 2018):
+    rng = random.Random(seed)
+    vocab = set()
+    while len(vocab) < n_vocab:
+        vocab.add(''.join(rng.choices(string.ascii_letters, k=rng.randint(3, 12))))
+    return list(vocab)
+
+
+def _list_index(vocab_list, word):
+    try:
+        return vocab_list.index(word)
+    except ValueError:
+        return -1
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--n-vocab', type=int, default=200000)
+    parser.add_argument('--n-queries', type=int, default=2000)
+    args = parser.parse_args()
+
+    vocab_list = _random_vocab(args.n_vocab)
+    rng = random.Random(0)
+    queries = [rng.choice(vocab_list) for _ in range(args.n_queries)]
+
+    results = []
+    # list.index is linear, so use fewer queries to keep the run short
+    n_linear = max(1, args.n_queries // 100)
+    elapsed = timeit.timeit(
+        lambda: [_list_index(vocab_list, w) for w in queries[:n_linear]], number=1)
+    results.append(('list.index', elapsed / n_linear, sys.getsizeof(vocab_list)))
+
+    for index_type in ['hash', 'sorted']:
+        vocab_index = build_vocab_index(vocab_list, index_type=index_type)
+        elapsed = timeit.timeit(
+            lambda: [vocab_index.get(w) for w in queries], number=1)
+        if index_type == 'hash':
+            size = sys.getsizeof(vocab_index._word2index)
+        else:
+            size = sys.getsizeof(vocab_index._sorted_words) + vocab_index._indices.nbytes
+        results.append((index_type, elapsed / args.n_queries, size))
+
+    print(f"n_vocab = {args.n_vocab}")
+    print(f"{'index':<12}{'us / lookup':>14}{'index MB':>12}")
+    for name, per_lookup, size in results:
+        print(f"{name:<12}{per_lookup * 1e6:>14.3f}{size / 2 ** 20:>12.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+"""Recall@10 and QPS of IVFIndex against exact search
+
+Builds an index over synthetic clustered vectors and compares
+it with the blocked exact search used by KeyedVectors.most_similar.
+
+    $ python -m benchmarks.bench_ivf --n-vocab 200000 --n-dim 100
+"""
+import argparse
+import time
+
+import numpy as np
+
+from word_embedder.embedders import IVFIndex
+from word_embedder.embedders.similarity import normalize_rows, top_k_similar
+
+
+class ArrayEmbedder:
+
+    """Minimal embedder over an in-memory matrix"""
+
+    def __init__(self, vectors: np.ndarray):
+        self._vectors = vectors
+
+    def build(self):
+        pass
+
+    @property
+    def n_vocab(self) -> int:
+        return self._vectors.shape[0]
+
+    @property
+    def n_dim(self) -> int:
+        return self._vectors.shape[1]
+
+    def lookup_many(self, indices: np.ndarray) -> np.ndarray:
+        return self._vectors[indices]
+
+
+def synthetic_vectors(n_vocab: int, n_dim: int, n_topics: int = 1000, seed: int = 2018):
+    rand_state = np.random.RandomState(seed)
+    topics = rand_state.randn(n_topics, n_dim)
+    labels = rand_state.randint(0, n_topics, size=n_vocab)
+    return (topics[labels] + 0.8 * rand_state.randn(n_vocab, n_dim)).astype(np.float32)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--n-vocab', type=int, default=200000)
+    parser.add_argument('--n-dim', type=int, default=100)
+    parser.add_argument('--n-queries', type=int, default=200)
+    args = parser.parse_args()
+
+    vectors = synthetic_vectors(args.n_vocab, args.n_dim)
+    queries = normalize_rows(vectors[np.random.RandomState(0).choice(args.n_vocab, args.n_queries)])
+
+    normed = normalize_rows(vectors)
+    start = time.perf_counter()
+    exact, _ = top_k_similar(normed, queries, topk=10)
+    exact_qps = args.n_queries / (time.perf_counter() - start)
+
+    start = time.perf_counter()
+    index = IVFIndex().fit(ArrayEmbedder(vectors))
+    print(f"{args.n_vocab} x {args.n_dim}, {len(index._centroids)} lists, "
+          f"built in {time.perf_counter() - start:.1f} s")
+    print(f"{'search':<14}{'recall@10':>10}{'QPS':>10}")
+    print(f"{'exact':<14}{1.:>10.3f}{exact_qps:>10.0f}")
+    for n_probe in [1, 2, 4, 8, 16, 32]:
+        start = time.perf_counter()
+        found, _ = index.search(queries, topk=10, n_probe=n_probe)
+        qps = args.n_queries / (time.perf_counter() - start)
+        recall = np.mean([
+            len(set(row) & set(expected)) / 10
+            for row, expected in zip(found.tolist(), exact.tolist())
+        ])
+        print(f"{'ivf n_probe=' + str(n_probe):<14}{recall:>10.3f}{qps:>10.0f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,59 @@
+"""Lookup throughput of KeyedVectorsLight by thread count
+
+Reads random vectors of a synthetic word2vec .bin file through
+LowMemoryVecLoader in mmap and pread mode from a thread pool.
+
+    $ python -m benchmarks.bench_light_threads --n-vocab 200000 --n-dim 300
+"""
+import argparse
+import os
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from word_embedder.embedders.keyed_vectors_light import LowMemoryVecLoader, _load_bin_file
+
+from .bench_load_bin import write_synthetic_bin
+
+
+def _throughput(loader, indices: np.ndarray, n_threads: int) -> float:
+    chunks = np.array_split(indices, n_threads)
+
+    def lookup(chunk):
+        for index in chunk.tolist():
+            loader[index]
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=n_threads) as executor:
+        list(executor.map(lookup, chunks))
+    return len(indices) / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--n-vocab', type=int, default=200000)
+    parser.add_argument('--n-dim', type=int, default=300)
+    parser.add_argument('--n-lookups', type=int, default=200000)
+    args = parser.parse_args()
+
+    indices = np.random.RandomState(0).randint(0, args.n_vocab, size=args.n_lookups)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, 'synthetic.bin')
+        write_synthetic_bin(path, n_vocab=args.n_vocab, n_dim=args.n_dim)
+        byte_pos = _load_bin_file(path)[-1]
+
+        print(f"{'threads':<10}{'mmap lookups/s':>16}{'pread lookups/s':>18}")
+        for n_threads in [1, 2, 4, 8, 16]:
+            row = []
+            for use_mmap in [True, False]:
+                loader = LowMemoryVecLoader(
+                    path, byte_pos=byte_pos, binary=True, use_mmap=use_mmap)
+                row.append(_throughput(loader, indices, n_threads))
+                del loader
+            print(f"{n_threads:<10}{row[0]:>16.0f}{row[1]:>18.0f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+"""Index and load time of a word2vec .bin file
+
+Writes a synthetic word2vec binary file and compares the legacy
+byte-by-byte word reader with the chunked reader shared by
+KeyedVectors and KeyedVectorsLight.
+
+    $ python -m benchmarks.bench_load_bin --n-vocab 200000 --n-dim 300
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from word_embedder.embedders.keyed_vectors import _load_bin_file
+from word_embedder.embedders.keyed_vectors_light import _load_bin_file as _index_bin_file
+
+
+def write_synthetic_bin(path: str, n_vocab: int, n_dim: int, seed: int = 2018):
+    rng = np.random.RandomState(seed)
+    with open(path, 'wb') as fout:
+        fout.write(f"{n_vocab} {n_dim}\n".encode('utf8'))
+        for start in range(0, n_vocab, 10000):
+            block = rng.randn(min(10000, n_vocab - start), n_dim).astype(np.float32)
+            fout.write(b''.join(
+                f"w{start + i} ".encode('utf8') + row.tobytes()
+                for i, row in enumerate(block)
+            ))
+
+
+def _legacy_load_bin_file(path: str, with_vectors: bool = True):
+    with open(path, 'rb') as fin:
+        vocab_size, embedding_size = (int(x) for x in fin.readline().split())
+        vocab_list = ['0'] * vocab_size
+        word_vectors = None
+        if with_vectors:
+            word_vectors = np.random.rand(vocab_size, embedding_size).astype(np.float32)
+        binary_len = 4 * embedding_size
+        for idx in range(vocab_size):
+            word = []
+            while True:
+                ch = fin.read(1)
+                if ch == b' ':
+                    break
+                if ch != b'\n':
+                    word.append(ch)
+            vocab_list[idx] = b''.join(word).decode('utf8')
+            data = fin.read(binary_len)
+            if with_vectors:
+                word_vectors[idx, :] = np.frombuffer(data, dtype='float32')
+    return vocab_list, word_vectors
+
+
+def _timeit(func, *args, **kwargs):
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    return time.perf_counter() - start, result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--n-vocab', type=int, default=200000)
+    parser.add_argument('--n-dim', type=int, default=300)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, 'synthetic.bin')
+        write_synthetic_bin(path, n_vocab=args.n_vocab, n_dim=args.n_dim)
+        print(f"{args.n_vocab} x {args.n_dim}, {os.path.getsize(path) / 2 ** 20:.1f} MB")
+
+        legacy_load, (legacy_vocab, legacy_vectors) = _timeit(_legacy_load_bin_file, path)
+        legacy_index, _ = _timeit(_legacy_load_bin_file, path, with_vectors=False)
+        load, (_, _, vocab, vectors, _) = _timeit(_load_bin_file, path)
+        index, _ = _timeit(_index_bin_file, path)
+        assert legacy_vocab == vocab
+        np.testing.assert_array_equal(legacy_vectors, vectors)
+
+        print(f"{'':<8}{'legacy':>10}{'chunked':>10}")
+        print(f"{'load':<8}{legacy_load:>9.2f}s{load:>9.2f}s")
+        print(f"{'index':<8}{legacy_index:>9.2f}s{index:>9.2f}s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,56 @@
+"""Peak memory of loading a word2vec .bin file
+
+Each loader runs in a fresh process, the increase of its peak RSS
+(ru_maxrss, Linux) is compared with the size of the loaded matrix.
+
+    $ python -m benchmarks.bench_load_memory --n-vocab 200000 --n-dim 300
+"""
+import argparse
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+
+from word_embedder.embedders.keyed_vectors import _load_bin_file
+
+from .bench_load_bin import _legacy_load_bin_file, write_synthetic_bin
+
+
+LOADERS = ['legacy', 'float32', 'float16', 'int8']
+
+
+def _measure(name: str, path: str) -> None:
+    before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if name == 'legacy':
+        _, vectors = _legacy_load_bin_file(path)
+    else:
+        vectors = _load_bin_file(path, storage_dtype=name)[3]
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - before
+    print(f"{name:<10}{peak / 2 ** 10:>10.1f}{vectors.nbytes / 2 ** 20:>10.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--n-vocab', type=int, default=200000)
+    parser.add_argument('--n-dim', type=int, default=300)
+    parser.add_argument('--measure', nargs=2, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.measure:
+        _measure(*args.measure)
+        return
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, 'synthetic.bin')
+        write_synthetic_bin(path, n_vocab=args.n_vocab, n_dim=args.n_dim)
+        print(f"{args.n_vocab} x {args.n_dim}, {os.path.getsize(path) / 2 ** 20:.1f} MB")
+        print(f"{'loader':<10}{'peak MB':>10}{'final MB':>10}")
+        for name in LOADERS:
+            subprocess.run(
+                [sys.executable, '-m', 'benchmarks.bench_load_memory', '--measure', name, path],
+                check=True,
+            )
+
+
+if __name__ == '__main__':
+    main()
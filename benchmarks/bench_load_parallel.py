@@ -0,0 +1,81 @@
+"""Load time and peak memory of a .vec text file across numbers of worker processes
+
+Each run loads the file in a fresh process. The increase of its peak RSS
+(ru_maxrss, Linux) beyond the loaded matrix should stay within the parsed
+blocks in flight, 2 * workers ranges of TEXT_RANGE_SIZE bytes of text.
+
+    $ python -m benchmarks.bench_load_parallel --n-vocab 200000 --n-dim 300 --workers 1 2 4 8 16
+"""
+import argparse
+import hashlib
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+from word_embedder.embedders.keyed_vectors import _load_text_file
+from word_embedder.embedders.readers import TEXT_RANGE_SIZE
+
+from .bench_load_text import write_synthetic_vec
+
+
+SLACK = 64 * 2 ** 20  # worker pool and interpreter overhead
+
+
+def _measure(n_workers: int, path: str) -> None:
+    before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    start = time.perf_counter()
+    _, _, vocab_list, word_vectors, _ = _load_text_file(path, n_workers=n_workers)
+    seconds = time.perf_counter() - start
+    peak = (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - before) * 2 ** 10
+    digest = hashlib.sha256('\n'.join(vocab_list).encode('utf8'))
+    digest.update(word_vectors.tobytes())
+    print(seconds, peak, word_vectors.nbytes, digest.hexdigest())
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--n-vocab', type=int, default=200000)
+    parser.add_argument('--n-dim', type=int, default=300)
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4, 8, 16])
+    parser.add_argument('--measure', nargs=2, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.measure:
+        _measure(int(args.measure[0]), args.measure[1])
+        return
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, 'synthetic.vec')
+        write_synthetic_vec(path, n_vocab=args.n_vocab, n_dim=args.n_dim)
+        print(f"{args.n_vocab} x {args.n_dim}, {os.path.getsize(path) / 2 ** 20:.1f} MB, "
+              f"{os.cpu_count()} cpus")
+        print(f"{'workers':<10}{'seconds':>10}{'speedup':>10}{'peak MB':>10}{'final MB':>10}")
+
+        baseline = expected = None
+        for n_workers in args.workers:
+            output = subprocess.run(
+                [sys.executable, '-m', 'benchmarks.bench_load_parallel',
+                 '--measure', str(n_workers), path],
+                check=True,
+                stdout=subprocess.PIPE,
+                universal_newlines=True,
+            ).stdout.split()
+            seconds, (peak, nbytes), digest = float(output[0]), map(int, output[1:3]), output[3]
+            if baseline is None:
+                baseline, expected = seconds, digest
+            else:
+                assert digest == expected, f"{n_workers} workers loaded different rows"
+            print(f"{n_workers:<10}{seconds:>10.2f}{baseline / seconds:>10.2f}"
+                  f"{peak / 2 ** 20:>10.1f}{nbytes / 2 ** 20:>10.1f}")
+            if n_workers > 1:
+                max_peak = nbytes + 2 * n_workers * TEXT_RANGE_SIZE + SLACK
+                assert peak <= max_peak, (
+                    f"peak {peak / 2 ** 20:.1f} MB with {n_workers} workers "
+                    f"exceeds {max_peak / 2 ** 20:.1f} MB"
+                )
+
+
+if __name__ == '__main__':
+    main()
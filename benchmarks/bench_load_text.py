@@ -0,0 +1,62 @@
+"""Load time of a .vec text file
+
+Writes a synthetic fastText-style file and compares the legacy
+line-by-line parser with the block parser used by KeyedVectors.
+
+    $ python -m benchmarks.bench_load_text --n-vocab 100000 --n-dim 300
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from word_embedder.embedders.keyed_vectors import _load_text_file
+
+
+def write_synthetic_vec(path: str, n_vocab: int, n_dim: int, seed: int = 2018):
+    rng = np.random.RandomState(seed)
+    with open(path, 'w', encoding='utf8') as fout:
+        fout.write(f"{n_vocab} {n_dim}\n")
+        for start in range(0, n_vocab, 10000):
+            block = rng.randn(min(10000, n_vocab - start), n_dim).astype(np.float32)
+            for i, row in enumerate(block):
+                fout.write(f"w{start + i} " + ' '.join(['%.4f'] * n_dim) % tuple(row) + ' \n')
+
+
+def _legacy_load_text_file(path: str):
+    with open(path, 'r', encoding='utf-8', newline='\n', errors='ignore') as fin:
+        vocab_size, embedding_size = map(int, fin.readline().split())
+        vocab_list = ['0'] * vocab_size
+        word_vectors = np.random.rand(vocab_size, embedding_size).astype(np.float32)
+        for idx, line in enumerate(fin):
+            tokens = line.rstrip().split(' ')
+            vocab_list[idx] = tokens[0]
+            word_vectors[idx, :] = np.array(list(map(float, tokens[1:]))).astype(np.float32)
+    return embedding_size, vocab_size, vocab_list, word_vectors
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--n-vocab', type=int, default=100000)
+    parser.add_argument('--n-dim', type=int, default=300)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, 'synthetic.vec')
+        write_synthetic_vec(path, n_vocab=args.n_vocab, n_dim=args.n_dim)
+        print(f"{args.n_vocab} x {args.n_dim}, {os.path.getsize(path) / 2 ** 20:.1f} MB")
+
+        results = {}
+        for name, load in [('legacy', _legacy_load_text_file), ('block', _load_text_file)]:
+            start = time.perf_counter()
+            results[name] = load(path)
+            print(f"{name:<8}{time.perf_counter() - start:>8.2f} s")
+
+        assert results['legacy'][2] == results['block'][2]
+        np.testing.assert_array_equal(results['legacy'][3], results['block'][3])
+
+
+if __name__ == '__main__':
+    main()
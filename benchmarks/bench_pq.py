@@ -0,0 +1,69 @@
+"""Memory, reconstruction error and search recall of PQKeyedVectors
+
+Trains product-quantized codes from synthetic clustered vectors and
+compares them with the float32 matrix they replace.
+
+    $ python -m benchmarks.bench_pq --n-vocab 200000 --n-dim 300 --n-subspaces 50
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from word_embedder.embedders import PQKeyedVectors
+from word_embedder.embedders.similarity import normalize_rows, top_k_similar
+
+from .bench_ivf import ArrayEmbedder, synthetic_vectors
+
+
+class VocabArrayEmbedder(ArrayEmbedder):
+
+    @property
+    def vocab(self):
+        return [f"w{i}" for i in range(self.n_vocab)]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--n-vocab', type=int, default=200000)
+    parser.add_argument('--n-dim', type=int, default=300)
+    parser.add_argument('--n-subspaces', type=int, default=50)
+    parser.add_argument('--n-queries', type=int, default=200)
+    args = parser.parse_args()
+
+    vectors = synthetic_vectors(args.n_vocab, args.n_dim)
+    queries = normalize_rows(vectors[np.random.RandomState(0).choice(args.n_vocab, args.n_queries)])
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, 'vectors.wepq')
+        start = time.perf_counter()
+        embedder = PQKeyedVectors(
+            path=path,
+            source=VocabArrayEmbedder(vectors),
+            n_subspaces=args.n_subspaces,
+        )
+        embedder.build()
+        train_time = time.perf_counter() - start
+
+        pq_bytes = embedder._codes.nbytes + embedder._codebooks.nbytes
+        print(f"{args.n_vocab} x {args.n_dim}, {args.n_subspaces} subspaces, "
+              f"trained in {train_time:.1f} s")
+        print(f"float32 {vectors.nbytes / 2 ** 20:.1f} MB, pq {pq_bytes / 2 ** 20:.1f} MB "
+              f"({vectors.nbytes / pq_bytes:.1f}x smaller)")
+        print(f"relative reconstruction error {embedder.reconstruction_error:.4f}")
+
+        exact, _ = top_k_similar(normalize_rows(vectors), queries, topk=10)
+        start = time.perf_counter()
+        found, _ = embedder._search(queries, topk=10, block_size=16384)
+        qps = args.n_queries / (time.perf_counter() - start)
+        recall = np.mean([
+            len(set(row) & set(expected)) / 10
+            for row, expected in zip(found.tolist(), exact.tolist())
+        ])
+        print(f"asymmetric search recall@10 {recall:.3f}, {qps:.0f} QPS")
+
+
+if __name__ == '__main__':
+    main()
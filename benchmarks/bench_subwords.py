@@ -0,0 +1,67 @@
+"""Cost of composing OOV vectors from fastText subword buckets
+
+Writes a synthetic fastText .bin model and times FastTextNgrams.compose
+on batches of random CJK words, with cold and warm n-gram hash caches.
+
+    $ python -m benchmarks.bench_subwords --bucket 2000000 --n-dim 300
+"""
+import argparse
+import os
+import struct
+import tempfile
+import time
+
+import numpy as np
+
+from word_embedder.embedders.subwords import FASTTEXT_MAGIC, FastTextNgrams
+
+
+def write_synthetic_fasttext_bin(path: str, bucket: int, n_dim: int, seed: int = 2018):
+    rng = np.random.RandomState(seed)
+    with open(path, 'wb') as fout:
+        fout.write(struct.pack('<ii', FASTTEXT_MAGIC, 12))
+        fout.write(struct.pack('<12i', n_dim, 5, 5, 1, 5, 1, 2, 2, bucket, 1, 3, 100))
+        fout.write(struct.pack('<d', 1e-4))
+        fout.write(struct.pack('<3i', 1, 1, 0))
+        fout.write(struct.pack('<2q', 1, -1))
+        fout.write(b'</s>\x00' + struct.pack('<qb', 1, 0))
+        fout.write(b'\x00')
+        fout.write(struct.pack('<2q', 1 + bucket, n_dim))
+        for start in range(0, 1 + bucket, 100000):
+            n_rows = min(100000, 1 + bucket - start)
+            fout.write(rng.randn(n_rows, n_dim).astype(np.float32).tobytes())
+
+
+def random_words(n_words: int, seed: int = 2018):
+    rng = np.random.RandomState(seed)
+    lengths = rng.randint(2, 6, size=n_words)
+    return [
+        ''.join(chr(code) for code in rng.randint(0x4e00, 0x9fff, size=length))
+        for length in lengths
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--bucket', type=int, default=2000000)
+    parser.add_argument('--n-dim', type=int, default=300)
+    parser.add_argument('--batch-size', type=int, default=1000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, 'synthetic.bin')
+        write_synthetic_fasttext_bin(path, bucket=args.bucket, n_dim=args.n_dim)
+        print(f"{args.bucket} buckets x {args.n_dim}, {os.path.getsize(path) / 2 ** 20:.1f} MB")
+
+        ngrams = FastTextNgrams(path)
+        words = random_words(args.batch_size)
+        print(f"{'':<8}{'us / word':>10}")
+        for name in ['cold', 'warm']:
+            start = time.perf_counter()
+            ngrams.compose(words)
+            elapsed = time.perf_counter() - start
+            print(f"{name:<8}{elapsed / len(words) * 1e6:>10.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -5,9 +5,14 @@ from dotenv import load_dotenv
 from .library import Library
 
 from .base import Embedder  # noqa
+from .cached_embedder import CachedEmbedder  # noqa
 from .keyed_vectors import KeyedVectors   # noqa
 from .keyed_vectors_light import KeyedVectorsLight   # noqa
 from .keyed_vectors_on_disk import KeyedVectorsOnDisk  # noqa
+from .pq_keyed_vectors import PQKeyedVectors  # noqa
+from .shared_keyed_vectors import SharedKeyedVectors  # noqa
+from .subword_embedder import SubwordEmbedder  # noqa
+from .ivf_index import IVFIndex, load_or_build_ivf_index  # noqa
 
 
 load_dotenv()
@@ -0,0 +1,153 @@
+"""asyncio helpers
+
+Lookups and builds may read from disk, so they run in an executor
+instead of blocking the event loop. Concurrent lookups of an embedder
+are coalesced and grouped into a single lookup_many call per batch.
+"""
+import asyncio
+from typing import List, Tuple
+import weakref
+
+import numpy as np
+
+
+MAX_BATCH = 1024
+MAX_DELAY = 0.001  # seconds a lookup waits for others to join its batch
+
+_BATCHERS = weakref.WeakKeyDictionary()  # embedder -> LookupBatcher
+_BUILDS = weakref.WeakKeyDictionary()  # embedder -> future of a running build
+
+
+class LookupBatcher:
+
+    """Coalesce and micro-batch lookups of an embedder on one event loop
+
+    Indices requested while a batch is pending share its single
+    lookup_many call, an index requested twice is fetched once.
+    The embedder is weakly referenced, a batcher does not keep it alive.
+    """
+
+    def __init__(
+            self,
+            embedder,
+            max_batch: int = MAX_BATCH,
+            max_delay: float = MAX_DELAY,
+            executor=None,
+            loop: asyncio.AbstractEventLoop = None,
+        ):
+        """
+        loop: event loop of the lookups, the running loop of the first lookup by default
+        """
+        self._embedder = weakref.ref(embedder)
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.executor = executor
+        self.loop = loop
+        self._pending = {}  # index -> future of its vector, queued or being fetched
+        self._queue = []  # indices of the next batch
+        self._timer = None
+
+    @property
+    def embedder(self):
+        return self._embedder()
+
+    async def lookup_many(self, indices: List[int]) -> List[np.ndarray]:
+        """Return vectors of in-vocabulary indices"""
+        if self.loop is None:
+            self.loop = asyncio.get_running_loop()
+        futures = []
+        for index in indices:
+            future = self._pending.get(index)
+            if future is None:
+                future = self.loop.create_future()
+                self._pending[index] = future
+                self._queue.append(index)
+                if len(self._queue) >= self.max_batch:
+                    self._flush()
+            futures.append(future)
+
+        if self._queue and self._timer is None:
+            self._timer = self.loop.call_later(self.max_delay, self._flush)
+        # futures are shared with other callers,
+        # cancelling this caller must not cancel them
+        return await asyncio.gather(*[asyncio.shield(future) for future in futures])
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        indices, self._queue = self._queue, []
+        if indices:
+            self.loop.create_task(self._fetch(indices))
+
+    async def _fetch(self, indices: List[int]) -> None:
+        futures = [self._pending[index] for index in indices]
+        embedder = self.embedder
+        try:
+            if embedder is None:
+                raise ReferenceError("the embedder has been garbage collected")
+            vectors = await self.loop.run_in_executor(
+                self.executor,
+                embedder.lookup_many,
+                np.array(indices, dtype=np.int64),
+            )
+        except Exception as e:
+            for future in futures:
+                if not future.done():
+                    future.set_exception(e)
+        else:
+            for future, vector in zip(futures, vectors):
+                if not future.done():
+                    future.set_result(vector)
+        finally:
+            for index, future in zip(indices, futures):
+                if self._pending.get(index) is future:
+                    del self._pending[index]
+
+
+def get_batcher(embedder, **kwargs) -> LookupBatcher:
+    """Return the LookupBatcher of an embedder on the running event loop
+
+        kwargs are passed to LookupBatcher when it is created.
+
+    """
+    loop = asyncio.get_running_loop()
+    batcher = _BATCHERS.get(embedder)
+    if batcher is None or batcher.loop is not loop:
+        batcher = LookupBatcher(embedder, loop=loop, **kwargs)
+        _BATCHERS[embedder] = batcher
+    return batcher
+
+
+async def abuild(embedder, executor=None) -> None:
+    """Build an embedder in an executor, concurrent calls share one build"""
+    if getattr(embedder, '_is_built', False):
+        return
+    loop = asyncio.get_running_loop()
+    running = _BUILDS.get(embedder)
+    if running is None or running[0] is not loop:
+        future = loop.run_in_executor(executor, embedder.build)
+        running = (loop, future)
+        _BUILDS[embedder] = running
+    try:
+        await asyncio.shield(running[1])
+    finally:
+        if _BUILDS.get(embedder) is running and running[1].done():
+            del _BUILDS[embedder]
+
+
+async def aget_vectors_batch(
+        embedder,
+        keys,
+        executor=None,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+    """Async get_vectors_batch, see Embedder.aget_many"""
+    await abuild(embedder, executor=executor)
+    indices = embedder.keys_to_indices(keys)
+    oov_mask = (indices < 0) | (indices >= embedder.n_vocab)
+    out = np.zeros((len(indices), embedder.n_dim), dtype=np.float32)
+    if not oov_mask.all():
+        vectors = await get_batcher(embedder, executor=executor).lookup_many(
+            indices[~oov_mask].tolist())
+        out[~oov_mask] = vectors
+    return out, oov_mask
@@ -1,11 +1,19 @@
 from abc import ABC, abstractmethod, abstractproperty
-from typing import List
+import sys
+from typing import List, Tuple
 
 import numpy as np
 
+from .aio import aget_vectors_batch
+from .not_built_error import NotBuiltError
+from .oov_error import OOVError
+
 
 class Embedder(ABC):
 
+    # attributes set by build(), dropped by release()
+    _BUILT_ATTRS = ()
+
     @abstractmethod
     def __getitem__(self, key) -> np.ndarray:
         """Get a word vector
@@ -43,3 +51,139 @@ class Embedder(ABC):
         """Return word
         """
         raise NotImplementedError
+
+    @property
+    def nbytes(self) -> int:
+        """Approximate memory held by the built embedder in bytes
+
+            Arrays (memory-mapped ones included), lists and dicts
+            such as the vocab index are counted, 0 if not built.
+
+        """
+        if not getattr(self, '_is_built', False):
+            return 0
+        seen = set()
+        return sum(_nbytes(value, seen) for value in vars(self).values())
+
+    def __getattr__(self, name: str):
+        # only called for missing attributes, e.g. dropped by release()
+        if name in type(self)._BUILT_ATTRS:
+            raise NotBuiltError(
+                f"{type(self).__name__} is not built, call build() first "
+                '(a Library releases embedders to fit in max_bytes)',
+            )
+        raise AttributeError(f"'{type(self).__name__}' object has no attribute '{name}'")
+
+    def release(self) -> None:
+        """Free what build() loaded, the next build() loads it again"""
+        for attr in self._BUILT_ATTRS:
+            self.__dict__.pop(attr, None)
+        self._is_built = False
+
+    def get_indices(self, words: List[str]) -> np.ndarray:
+        """Return indices of words, -1 for OOV words
+        """
+        return np.fromiter(
+            (self.get_index(word) for word in words),
+            dtype=np.int64,
+            count=len(words),
+        )
+
+    def lookup_many(self, indices: np.ndarray, out: np.ndarray = None) -> np.ndarray:
+        """Get vectors of in-vocabulary indices
+
+            Rows are written into out if given,
+            otherwise into a new float32 array.
+
+        """
+        indices = np.asarray(indices, dtype=np.int64)
+        if out is None:
+            out = np.empty((len(indices), self.n_dim), dtype=np.float32)
+        for i, index in enumerate(indices.tolist()):
+            out[i, :] = self[index]
+        return out
+
+    def get_vectors_batch(
+            self,
+            keys,
+            out: np.ndarray = None,
+        ) -> Tuple[np.ndarray, np.ndarray]:
+        """Get vectors of a batch of words or indices
+
+            keys should be all str or all int (or an integer array).
+            Return (vectors, oov_mask), rows of OOV keys are filled with zeros.
+
+        """
+        indices = self.keys_to_indices(keys)
+        oov_mask = (indices < 0) | (indices >= self.n_vocab)
+        if out is None:
+            out = np.empty((len(indices), self.n_dim), dtype=np.float32)
+        if not oov_mask.any():
+            self.lookup_many(indices, out=out)
+        else:
+            # OOV keys never reach lookup_many (e.g. a cache),
+            # in-vocabulary rows are still fetched in a single call
+            out[oov_mask] = 0.
+            if not oov_mask.all():
+                out[~oov_mask] = self.lookup_many(indices[~oov_mask])
+        return out, oov_mask
+
+    async def aget(self, key) -> np.ndarray:
+        """Async __getitem__ for asyncio services
+
+            The build and disk reads run in an executor, concurrent lookups
+            are coalesced and batched into one lookup_many call.
+
+        """
+        vectors, oov_mask = await aget_vectors_batch(self, [key])
+        if oov_mask[0]:
+            raise OOVError
+        return vectors[0]
+
+    async def aget_many(self, keys) -> Tuple[np.ndarray, np.ndarray]:
+        """Async get_vectors_batch, return (vectors, oov_mask)"""
+        return await aget_vectors_batch(self, keys)
+
+    def keys_to_indices(self, keys) -> np.ndarray:
+        """Return indices of a batch of words or indices, -1 for OOV words
+
+            keys should be all str or all int (or an integer array),
+            int keys are returned as is, not checked against n_vocab.
+
+        """
+        if isinstance(keys, np.ndarray) and np.issubdtype(keys.dtype, np.integer):
+            return keys.astype(np.int64, copy=False)
+        keys = list(keys)
+        if all(isinstance(key, str) for key in keys):
+            return self.get_indices(keys)
+        if all(isinstance(key, (int, np.integer)) for key in keys):
+            return np.array(keys, dtype=np.int64).reshape(-1)
+        raise TypeError(
+            'Only support a batch of all int or all str type of input',
+        )
+
+
+def _nbytes(value, seen: set) -> int:
+    """Approximate bytes held by value, objects in seen are counted once
+
+        Items of lists and values of dicts are not deduplicated,
+        keys of dicts are not counted (usually words held by the vocab list).
+
+    """
+    if isinstance(value, np.ndarray):
+        while isinstance(value.base, np.ndarray):
+            value = value.base
+    if id(value) in seen:
+        return 0
+    seen.add(id(value))
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if isinstance(value, (list, tuple)):
+        return sys.getsizeof(value) + sum(map(sys.getsizeof, value))
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(map(sys.getsizeof, value.values()))
+    if isinstance(value, Embedder):
+        return value.nbytes
+    if hasattr(value, '__dict__'):
+        return sum(_nbytes(item, seen) for item in vars(value).values())
+    return sys.getsizeof(value)
@@ -0,0 +1,206 @@
+"""Project native binary format
+
+    A file starts with MAGIC, the byte length of a JSON header and
+    the JSON header itself, followed by raw arrays aligned to ALIGNMENT bytes.
+    The header records user metadata and the offset, dtype and shape of each array,
+    so arrays are opened as zero-copy views over a single np.memmap.
+
+"""
+import json
+import os
+import struct
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
+
+
+MAGIC = b'WEMBED\x00\x01'
+ALIGNMENT = 64
+CACHE_SUFFIX = '.wecache'
+
+_LENGTH = struct.Struct('<Q')
+
+
+def _align(offset: int) -> int:
+    return (offset + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+
+def _layout(arrays: Dict[str, np.ndarray], meta: dict = None):
+    """Return the encoded header, the data offset of each array and the total size"""
+    layout = {}
+    offset = 0
+    for name, array in arrays.items():
+        layout[name] = {
+            'offset': offset,
+            'dtype': array.dtype.str,
+            'shape': list(array.shape),
+        }
+        offset = _align(offset + array.nbytes)
+    header = json.dumps({'meta': meta or {}, 'arrays': layout}).encode('utf8')
+    data_start = _align(len(MAGIC) + _LENGTH.size + len(header))
+    return header, layout, data_start, data_start + offset
+
+
+def write_arrays(path: str, arrays: Dict[str, np.ndarray], meta: dict = None) -> None:
+    """Write arrays and metadata into path
+
+        The file is written next to path first and then renamed,
+        so readers never see a partially written file.
+
+    """
+    header, layout, data_start, size = _layout(arrays, meta)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp_path, 'wb') as fout:
+            fout.write(MAGIC + _LENGTH.pack(len(header)) + header)
+            for name, array in arrays.items():
+                fout.seek(data_start + layout[name]['offset'])
+                fout.write(np.ascontiguousarray(array).data)
+            fout.truncate(size)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def arrays_nbytes(arrays: Dict[str, np.ndarray], meta: dict = None) -> int:
+    """Size of the buffer write_arrays_to_buffer needs"""
+    return _layout(arrays, meta)[-1]
+
+
+def write_arrays_to_buffer(buffer, arrays: Dict[str, np.ndarray], meta: dict = None) -> None:
+    """Same as write_arrays but into a writable buffer, e.g. shared memory
+
+        MAGIC is written last, so readers can poll it to know
+        whether the buffer is completely written.
+
+    """
+    header, layout, data_start, size = _layout(arrays, meta)
+    buf = np.frombuffer(buffer, dtype=np.uint8, count=size)
+    prefix = np.frombuffer(_LENGTH.pack(len(header)) + header, dtype=np.uint8)
+    buf[len(MAGIC): len(MAGIC) + len(prefix)] = prefix
+    for name, array in arrays.items():
+        start = data_start + layout[name]['offset']
+        buf[start: start + array.nbytes] = np.ascontiguousarray(array).reshape(-1).view(np.uint8)
+    buf[:len(MAGIC)] = np.frombuffer(MAGIC, dtype=np.uint8)
+
+
+def read_arrays(path: str) -> Tuple[dict, Dict[str, np.ndarray]]:
+    """Open a file written by write_arrays
+
+        Return metadata and read-only arrays backed by a memory map.
+        Raise ValueError if path is not in this format.
+
+    """
+    if os.path.getsize(path) == 0:
+        raise ValueError(f"[{path}] is not a word-embedder cache file")
+    return read_arrays_from_buffer(np.memmap(path, dtype=np.uint8, mode='r'), name=path)
+
+
+def read_arrays_from_buffer(buffer, name: str = 'buffer') -> Tuple[dict, Dict[str, np.ndarray]]:
+    """Return metadata and zero-copy array views of a buffer written in this format
+
+        Raise ValueError if buffer is not (or not yet completely) written.
+
+    """
+    # keep np.memmap buffers as they are, so views stay memmaps
+    buf = buffer if isinstance(buffer, np.ndarray) else np.frombuffer(buffer, dtype=np.uint8)
+    prefix_len = len(MAGIC) + _LENGTH.size
+    if len(buf) < prefix_len or buf[:len(MAGIC)].tobytes() != MAGIC:
+        raise ValueError(f"[{name}] is not a word-embedder cache file")
+    header_len, = _LENGTH.unpack(buf[len(MAGIC): prefix_len].tobytes())
+    if prefix_len + header_len > len(buf):
+        raise ValueError(f"[{name}] is truncated")
+    header = json.loads(buf[prefix_len: prefix_len + header_len].tobytes().decode('utf8'))
+    data_start = _align(prefix_len + header_len)
+
+    arrays = {}
+    for array_name, spec in header['arrays'].items():
+        dtype = np.dtype(spec['dtype'])
+        shape = tuple(spec['shape'])
+        start = data_start + spec['offset']
+        nbytes = dtype.itemsize * int(np.prod(shape))
+        if start + nbytes > len(buf):
+            raise ValueError(f"[{name}] is truncated")
+        arrays[array_name] = buf[start: start + nbytes].view(dtype).reshape(shape)
+    return header['meta'], arrays
+
+
+def pack_vocab(vocab_list: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+    """Pack words into a UTF-8 blob and the byte offset of each word
+
+        Word i is blob[offsets[i]: offsets[i + 1] - 1],
+        words are separated by b'\\n' to allow fast bulk decoding.
+
+    """
+    encoded = [word.encode('utf8') for word in vocab_list]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.uint64)
+    np.cumsum([len(word) + 1 for word in encoded], out=offsets[1:])
+    blob = np.frombuffer(b''.join(word + b'\n' for word in encoded), dtype=np.uint8)
+    return offsets, blob
+
+
+def unpack_vocab(offsets: np.ndarray, blob: np.ndarray) -> List[str]:
+    vocab_size = len(offsets) - 1
+    if vocab_size == 0:
+        return []
+    data = blob.tobytes()
+    vocab_list = data[:-1].decode('utf8').split('\n')
+    if len(vocab_list) != vocab_size:
+        # some words contain b'\n', fall back to slicing by offsets
+        bounds = offsets.tolist()
+        vocab_list = [
+            data[start: end - 1].decode('utf8')
+            for start, end in zip(bounds[:-1], bounds[1:])
+        ]
+    return vocab_list
+
+
+class PackedVocab(Sequence):
+
+    """Read-only list of words packed by pack_vocab, words are decoded on access"""
+
+    def __init__(self, offsets: np.ndarray, blob: np.ndarray):
+        self._offsets = offsets
+        self._blob = blob
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError('vocab index out of range')
+        start, end = int(self._offsets[index]), int(self._offsets[index + 1])
+        return self._blob[start: end - 1].tobytes().decode('utf8')
+
+    def __iter__(self):
+        return iter(unpack_vocab(self._offsets, self._blob))
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, Sequence) or len(other) != len(self):
+            return False
+        return all(a == b for a, b in zip(self, other))
+
+    __hash__ = None
+
+
+def source_stamp(path: str) -> Dict[str, int]:
+    """Size and mtime of a source file, used to detect stale caches"""
+    stat = os.stat(path)
+    return {'source_size': stat.st_size, 'source_mtime_ns': stat.st_mtime_ns}
+
+
+def is_fresh(meta: dict, source_path: str) -> bool:
+    """Whether a cache built from source_path is still valid
+
+        A cache without its source file is trusted as is.
+
+    """
+    if not os.path.isfile(source_path):
+        return True
+    stamp = source_stamp(source_path)
+    return all(meta.get(key) == value for key, value in stamp.items())
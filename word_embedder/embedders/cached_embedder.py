@@ -0,0 +1,176 @@
+from collections import OrderedDict, namedtuple
+import threading
+from typing import List
+
+import numpy as np
+
+from .base import Embedder
+from .oov_error import OOVError
+
+
+CacheInfo = namedtuple('CacheInfo', ['hits', 'misses', 'maxsize', 'currsize'])
+
+POLICIES = ('lru', 'lfu')
+
+
+class CachedEmbedder(Embedder):
+
+    """Keep recently or frequently used vectors of an embedder in memory
+
+    Cached rows are stored in one preallocated float32 slab,
+    which suits disk-backed embedders such as KeyedVectorsLight
+    and KeyedVectorsOnDisk on Zipfian token streams.
+    """
+
+    _BUILT_ATTRS = ('_slab', '_slots', '_slot_indices', '_counts', '_hits', '_misses', '_lock')
+
+    def __init__(
+            self,
+            embedder: Embedder,
+            capacity: int = 10000,
+            capacity_bytes: int = None,
+            policy: str = 'lru',
+        ):
+        """
+        capacity: max number of cached vectors
+        capacity_bytes: max size of the slab in bytes, overrides capacity if given
+        policy: 'lru' evicts the least recently used vector,
+            'lfu' evicts the least frequently used one
+        """
+        if policy not in POLICIES:
+            raise ValueError(f"policy should be one of {POLICIES}, got [{policy}]")
+        self._embedder = embedder
+        self._capacity = capacity
+        self._capacity_bytes = capacity_bytes
+        self._policy = policy
+        self._is_built = False
+
+    def build(self):
+        if not self._is_built:
+            self._embedder.build()
+            row_bytes = 4 * self._embedder.n_dim  # float32
+            if self._capacity_bytes is not None:
+                n_slots = self._capacity_bytes // row_bytes
+            else:
+                n_slots = self._capacity
+            self._slab = np.empty((n_slots, self._embedder.n_dim), dtype=np.float32)
+            # index -> slot, ordered from least to most recently used
+            self._slots = OrderedDict()
+            self._slot_indices = np.full(n_slots, -1, dtype=np.int64)
+            self._counts = np.zeros(n_slots, dtype=np.int64)
+            self._hits = 0
+            self._misses = 0
+            self._lock = threading.Lock()
+            self._is_built = True
+
+    def __getitem__(self, key) -> np.ndarray:
+        """Get a word vector
+
+            If key is an int, return vector by index.
+            If key is a string, return vector by word.
+
+        """
+        if isinstance(key, str):
+            index = self.get_index(word=key)
+        elif isinstance(key, int):
+            index = key
+        else:
+            raise TypeError(
+                'Only support int and str type of input',
+            )
+        if (index < 0) or (index >= self.n_vocab):
+            raise OOVError
+        return self.lookup_many([index])[0]
+
+    @property
+    def n_vocab(self) -> int:
+        return self._embedder.n_vocab
+
+    @property
+    def n_dim(self) -> int:
+        return self._embedder.n_dim
+
+    @property
+    def vocab(self) -> List[str]:
+        return self._embedder.vocab
+
+    def get_index(self, word: str) -> int:
+        return self._embedder.get_index(word)
+
+    def get_indices(self, words: List[str]) -> np.ndarray:
+        return self._embedder.get_indices(words)
+
+    def get_word(self, index: int) -> str:
+        return self._embedder.get_word(index)
+
+    def lookup_many(self, indices: np.ndarray, out: np.ndarray = None) -> np.ndarray:
+        indices = np.asarray(indices, dtype=np.int64).reshape(-1)
+        if out is None:
+            out = np.empty((len(indices), self.n_dim), dtype=np.float32)
+
+        with self._lock:
+            slots = np.array(
+                [self._touch(index) for index in indices.tolist()],
+                dtype=np.int64,
+            ).reshape(-1)
+            hit_mask = slots >= 0
+            out[hit_mask] = self._slab[slots[hit_mask]]
+            n_hits = int(hit_mask.sum())
+            self._hits += n_hits
+            self._misses += len(indices) - n_hits
+
+        if not hit_mask.all():
+            # read misses outside of the lock, so slow disk reads
+            # do not block lookups served from the slab
+            missed_indices, inverse = np.unique(indices[~hit_mask], return_inverse=True)
+            vectors = self._embedder.lookup_many(missed_indices)
+            out[~hit_mask] = vectors[inverse.reshape(-1)]
+            with self._lock:
+                for index, vector in zip(missed_indices.tolist(), vectors):
+                    self._insert(index, vector)
+        return out
+
+    def release(self) -> None:
+        """Free the cache and the wrapped embedder"""
+        super().release()
+        self._embedder.release()
+
+    def cache_info(self) -> CacheInfo:
+        return CacheInfo(
+            hits=self._hits,
+            misses=self._misses,
+            maxsize=len(self._slab),
+            currsize=len(self._slots),
+        )
+
+    def clear_cache(self) -> None:
+        with self._lock:
+            self._slots.clear()
+            self._slot_indices[:] = -1
+            self._counts[:] = 0
+            self._hits = 0
+            self._misses = 0
+
+    def _touch(self, index: int) -> int:
+        """Return the slot of a cached index and mark it used, -1 if not cached"""
+        slot = self._slots.get(index, -1)
+        if slot >= 0:
+            self._slots.move_to_end(index)
+            self._counts[slot] += 1
+        return slot
+
+    def _insert(self, index: int, vector: np.ndarray) -> None:
+        if index in self._slots or len(self._slab) == 0:
+            return
+        if len(self._slots) < len(self._slab):
+            slot = len(self._slots)
+        else:
+            if self._policy == 'lru':
+                _, slot = self._slots.popitem(last=False)
+            else:
+                slot = int(np.argmin(self._counts))
+                del self._slots[int(self._slot_indices[slot])]
+        self._slab[slot] = vector
+        self._slots[index] = slot
+        self._slot_indices[slot] = index
+        self._counts[slot] = 1
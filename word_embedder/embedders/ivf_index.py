@@ -0,0 +1,189 @@
+from os.path import isfile
+from typing import Tuple
+import warnings
+
+import numpy as np
+
+from .base import Embedder
+from .cache import is_fresh, read_arrays, source_stamp, write_arrays
+from .kmeans import assign, kmeans
+from .similarity import BLOCK_SIZE, normalize_blocks, normalize_rows
+
+
+IVF_SUFFIX = '.weivf'
+
+
+class IVFIndex:
+
+    """Approximate cosine nearest-neighbour index (inverted file)
+
+    Vectors are clustered by k-means into n_lists lists. A query only scans
+    the n_probe lists whose centroids are closest to it, so larger n_probe
+    trades speed for recall, n_probe = n_lists is an exact search.
+    """
+
+    def __init__(
+            self,
+            n_lists: int = None,
+            n_probe: int = 8,
+            n_iter: int = 20,
+            train_size: int = 100000,
+            seed: int = 2018,
+        ):
+        """
+        n_lists: number of clusters, 4 * sqrt(n_vocab) if not given
+        n_probe: default number of lists scanned per query
+        n_iter: k-means iterations
+        train_size: number of vectors sampled to train k-means
+        """
+        self.n_lists = n_lists
+        self.n_probe = n_probe
+        self.n_iter = n_iter
+        self.train_size = train_size
+        self.seed = seed
+
+    def fit(self, embedder: Embedder, block_size: int = BLOCK_SIZE) -> 'IVFIndex':
+        """Cluster the vectors of embedder
+
+            The normalized matrix is the only full-size array, rows are
+            written back into it grouped by list in a second blocked pass.
+
+        """
+        embedder.build()
+        vectors = normalize_blocks(
+            lambda start, end: embedder.lookup_many(np.arange(start, end)),
+            n_rows=embedder.n_vocab,
+            out=np.empty((embedder.n_vocab, embedder.n_dim), dtype=np.float32),
+            block_size=block_size,
+        )
+
+        n_lists = self.n_lists
+        if n_lists is None:
+            n_lists = int(4 * np.sqrt(len(vectors)))
+        n_lists = max(1, min(n_lists, len(vectors)))
+        centroids = kmeans(
+            vectors,
+            n_clusters=n_lists,
+            n_iter=self.n_iter,
+            sample_size=max(self.train_size, n_lists),
+            seed=self.seed,
+        )
+        labels = assign(vectors, centroids)
+
+        # store vectors grouped by list, so each list is a contiguous slice,
+        # labels are known, so vectors can be overwritten
+        order = np.argsort(labels, kind='stable')
+        self._centroids = normalize_rows(centroids)
+        self._ids = order
+        self._vectors = normalize_blocks(
+            lambda start, end: embedder.lookup_many(order[start: end]),
+            n_rows=len(order),
+            out=vectors,
+            block_size=block_size,
+        )
+        self._list_offsets = np.zeros(n_lists + 1, dtype=np.int64)
+        np.cumsum(np.bincount(labels, minlength=n_lists), out=self._list_offsets[1:])
+        return self
+
+    @property
+    def n_vocab(self) -> int:
+        return len(self._ids)
+
+    def search(
+            self,
+            queries: np.ndarray,
+            topk: int = 10,
+            n_probe: int = None,
+        ) -> Tuple[np.ndarray, np.ndarray]:
+        """Search the topk most similar vectors of each query
+
+            queries: a vector or a 2D array of vectors, normalized internally
+            Return indices and cosine similarities with shape (n_queries, topk),
+            best first. Slots without candidates have index -1 and score -inf.
+
+        """
+        queries = normalize_rows(np.atleast_2d(queries))
+        n_probe = min(n_probe or self.n_probe, len(self._centroids))
+
+        coarse = queries @ self._centroids.T
+        probes = np.argpartition(-coarse, n_probe - 1, axis=1)[:, :n_probe]
+
+        indices = np.full((len(queries), topk), -1, dtype=np.int64)
+        scores = np.full((len(queries), topk), -np.inf, dtype=np.float32)
+        for i, (query, lists) in enumerate(zip(queries, probes)):
+            candidates = np.concatenate([
+                np.arange(self._list_offsets[list_id], self._list_offsets[list_id + 1])
+                for list_id in lists
+            ])
+            candidate_scores = self._vectors[candidates] @ query
+            k = min(topk, len(candidates))
+            if k == 0:
+                continue
+            best = np.argpartition(-candidate_scores, k - 1)[:k]
+            best = best[np.argsort(-candidate_scores[best], kind='stable')]
+            indices[i, :k] = self._ids[candidates[best]]
+            scores[i, :k] = candidate_scores[best]
+        return indices, scores
+
+    def save(self, path: str, source_path: str = None) -> None:
+        """Save the index, source_path is the embedding file it is built from"""
+        meta = {'n_probe': self.n_probe}
+        if source_path is not None and isfile(source_path):
+            meta.update(source_stamp(source_path))
+        write_arrays(
+            path,
+            arrays={
+                'centroids': self._centroids,
+                'ids': self._ids,
+                'vectors': self._vectors,
+                'list_offsets': self._list_offsets,
+            },
+            meta=meta,
+        )
+
+    @classmethod
+    def load(cls, path: str) -> 'IVFIndex':
+        """Load an index saved by save, arrays are memory-mapped"""
+        return cls._from_arrays(*read_arrays(path))
+
+    @classmethod
+    def _from_arrays(cls, meta: dict, arrays: dict) -> 'IVFIndex':
+        index = cls(n_lists=len(arrays['centroids']), n_probe=meta['n_probe'])
+        index._centroids = arrays['centroids']
+        index._ids = arrays['ids']
+        index._vectors = arrays['vectors']
+        index._list_offsets = arrays['list_offsets']
+        return index
+
+
+def load_or_build_ivf_index(
+        embedder: Embedder,
+        path: str = None,
+        **kwargs,
+    ) -> IVFIndex:
+    """Load the IVF index of an embedder, build and save it if missing or stale
+
+        path defaults to the embedding file path + '.weivf'.
+        kwargs are passed to IVFIndex when building.
+
+    """
+    source_path = getattr(embedder, '_path', None)
+    if path is None:
+        if source_path is None:
+            raise ValueError('path is required for embedders without a file path')
+        path = source_path + IVF_SUFFIX
+
+    if isfile(path):
+        try:
+            meta, arrays = read_arrays(path)
+            if source_path is None or is_fresh(meta, source_path):
+                return IVFIndex._from_arrays(meta, arrays)
+        except (OSError, ValueError) as e:
+            warnings.warn(f"ignore broken index [{path}]: {e}", RuntimeWarning)
+
+    index = IVFIndex(**kwargs).fit(embedder)
+    try:
+        index.save(path, source_path=source_path)
+    except OSError as e:
+        warnings.warn(f"fail to write index [{path}]: {e}", RuntimeWarning)
+    return index
@@ -1,103 +1,276 @@
-import io
+import collections
+import hashlib
+import itertools
+import multiprocessing
 import warnings
-from os.path import isfile, basename
+from os.path import isfile, basename, getmtime
 import os
-from typing import List
+from typing import Callable, Iterable, Iterator, List, Tuple
 
 import numpy as np
 
 from .base import Embedder
+from .cache import (
+    CACHE_SUFFIX,
+    is_fresh,
+    pack_vocab,
+    read_arrays,
+    source_stamp,
+    unpack_vocab,
+    write_arrays,
+)
 from .oov_error import OOVError
-from .utils import download_data, extract_gz
+from .quantization import check_storage_dtype, dequantize, quantize
+from .readers import (
+    TEXT_RANGE_SIZE,
+    iter_bin_records,
+    iter_line_blocks,
+    parse_text_block,
+    parse_text_range,
+    split_line_ranges,
+)
+from .similarity import BLOCK_SIZE, normalize_blocks, normalize_rows, top_k_similar
+from .utils import fetch_file, open_url
+from .vocab_index import build_vocab_index
 
 
-def _load_text_file(path: str):
-    fin = io.open(
-        path, 'r',
-        encoding='utf-8',
-        newline='\n',
-        errors='ignore',
-    )
+def _read_text_stream(fin, **kwargs):
     vocab_size, embedding_size = map(int, fin.readline().split())
+    blocks = (
+        parse_text_block(block, n_dim=embedding_size)
+        for block in iter_line_blocks(fin)
+    )
+    return _fill_rows(blocks, vocab_size, embedding_size, **kwargs)
 
-    vocab_list = ['0'] * vocab_size
-    word_vectors = np.random.rand(
-        vocab_size, embedding_size).astype(np.float32)
 
-    for idx, line in enumerate(fin):
-        tokens = line.rstrip().split(' ')
-        vocab_list[idx] = tokens[0]
-        vector = list(map(float, tokens[1:]))
-        word_vectors[idx, :] = np.array(vector).astype(np.float32)
-    fin.close()
-    return embedding_size, vocab_size, vocab_list, word_vectors
+def _load_text_file(path: str, n_workers: int = 1, **kwargs):
+    with open(path, 'rb') as fin:
+        if n_workers <= 1:
+            return _read_text_stream(fin, **kwargs)
+        vocab_size, embedding_size = map(int, fin.readline().split())
 
+        # parse ranges of whole lines in worker processes,
+        # parsed ranges are written into the final matrix in file order
+        ranges = split_line_ranges(
+            fin,
+            start=fin.tell(),
+            end=os.fstat(fin.fileno()).st_size,
+            range_size=TEXT_RANGE_SIZE,
+        )
+    with multiprocessing.Pool(n_workers) as pool:
+        blocks = _imap_bounded(
+            pool,
+            parse_text_range,
+            [(path, start, end, embedding_size) for start, end in ranges],
+            max_in_flight=2 * n_workers,
+        )
+        return _fill_rows(blocks, vocab_size, embedding_size, **kwargs)
 
-def _load_bin_file(path: str):
-    # load .bin file
-    # Note that float in this file should be float32
+
+def _imap_bounded(pool, func: Callable, args_list: List[tuple], max_in_flight: int) -> Iterator:
+    """Like pool.imap, but at most max_in_flight calls are submitted and not yet consumed
+
+        pool.imap keeps submitting, parsed blocks would pile up in this process
+        whenever the workers parse faster than the blocks are consumed.
+
+    """
+    pending = collections.deque()
+    args_iter = iter(args_list)
+    for args in itertools.islice(args_iter, max_in_flight):
+        pending.append(pool.apply_async(func, args))
+    while pending:
+        result = pending.popleft().get()
+        for args in itertools.islice(args_iter, 1):
+            pending.append(pool.apply_async(func, args))
+        yield result
+
+
+def _read_bin_stream(fin, **kwargs):
+    # Note that float in .bin file should be float32
     # float64 is not allowed
-    fin = open(path, 'rb')
-    header = fin.readline().decode('utf8')
-    vocab_size, embedding_size = (int(x) for x in header.split())
-
-    # init vocab list
-    vocab_list = ['0'] * vocab_size
-    word_vectors = np.random.rand(
-        vocab_size, embedding_size).astype(np.float32)
-
-    binary_len = 4 * embedding_size  # float32
-    for idx in range(vocab_size):
-        # mixed text and binary: read text first, then binary
-        word = []
-        while True:
-            ch = fin.read(1)
-            if ch == b' ':
-                break
-            if ch == b'':
-                raise EOFError(
-                    "unexpected end of input; is count incorrect or file otherwise damaged?")
-            # ignore newlines in front of words (some binary files have)
-            if ch != b'\n':
-                word.append(ch)
-
-        vocab_list[idx] = b''.join(word).decode('utf8')
-        word_vectors[idx, :] = np.frombuffer(
-            fin.read(binary_len),
-            dtype='float32',
-        )
-    fin.close()
-    return embedding_size, vocab_size, vocab_list, word_vectors
+    header = fin.readline()
+    vocab_size, embedding_size = (int(x) for x in header.decode('utf8').split())
+    blocks = (
+        (words, vectors)
+        for words, vectors, _ in iter_bin_records(
+            fin, vocab_size=vocab_size, n_dim=embedding_size, start=len(header))
+    )
+    return _fill_rows(blocks, vocab_size, embedding_size, **kwargs)
+
+
+def _load_bin_file(path: str, **kwargs):
+    # load .bin file
+    with open(path, 'rb') as fin:
+        return _read_bin_stream(fin, **kwargs)
+
+
+def _fill_rows(
+        blocks: Iterator[Tuple[List[str], np.ndarray]],
+        vocab_size: int,
+        embedding_size: int,
+        max_vocab: int = None,
+        keep_words: Iterable[str] = None,
+        storage_dtype: str = 'float32',
+    ):
+    """Write parsed (words, vectors) blocks straight into the final matrix
+
+        If keep_words is given, only the first occurrence of those words is kept,
+        and reading stops once max_vocab rows are kept. Rows are converted
+        into storage_dtype block by block, so the only full-size allocation
+        is the returned matrix.
+
+    """
+    n_rows = vocab_size if max_vocab is None else min(vocab_size, max_vocab)
+    if keep_words is not None:
+        keep_words = set(keep_words)
+        n_rows = min(n_rows, len(keep_words))
+
+    vocab_list = []
+    word_vectors = np.empty((n_rows, embedding_size), dtype=storage_dtype)
+    scales = np.empty(n_rows, dtype=np.float32) if storage_dtype == 'int8' else None
+    for words, vectors in blocks:
+        if keep_words is not None:
+            rows = []
+            for row, word in enumerate(words):
+                if word in keep_words:
+                    keep_words.discard(word)
+                    rows.append(row)
+            words = [words[row] for row in rows]
+            vectors = vectors[rows]
+        idx = len(vocab_list)
+        n = min(len(words), n_rows - idx)
+        word_vectors[idx: idx + n], block_scales = quantize(vectors[:n], storage_dtype)
+        if scales is not None:
+            scales[idx: idx + n] = block_scales
+        vocab_list.extend(words[:n])
+        if len(vocab_list) == n_rows:
+            break
+
+    if len(vocab_list) < n_rows:
+        # fewer rows than expected (missing keep_words or a short file)
+        word_vectors = word_vectors[:len(vocab_list)].copy()
+        scales = None if scales is None else scales[:len(vocab_list)].copy()
+    return embedding_size, len(vocab_list), vocab_list, word_vectors, scales
 
 
 class KeyedVectors(Embedder):
 
-    def __init__(self, path: str, binary: bool = False):
+    _BUILT_ATTRS = (
+        '_embedding_size',
+        '_vocab_size',
+        '_vocab_list',
+        '_word_vectors',
+        '_scales',
+        '_vocab_index',
+        '_normed_vectors',
+    )
+
+    def __init__(
+            self,
+            path: str,
+            binary: bool = False,
+            index_type: str = 'hash',
+            cache: bool = True,
+            storage_dtype: str = 'float32',
+            max_vocab: int = None,
+            keep_words: Iterable[str] = None,
+            progress: Callable[[int, int], None] = None,
+        ):
+        """
+        index_type: how words are mapped to indices,
+            'hash' (dict, fastest) or 'sorted' (bisect, smaller memory footprint)
+        cache: convert the file into a native format at path + '.wecache'
+            on first build and memory-map it on later builds
+        storage_dtype: how vectors are held in memory and in the cache,
+            'float32', 'float16' (half size) or 'int8' with a scale per row
+            (quarter size). Lookups always return float32.
+        max_vocab: only load the first max_vocab rows,
+            rows of fastText files are sorted by word frequency
+        keep_words: only load rows of these words
+        progress: called with (bytes read, total bytes or None)
+            while a missing path is downloaded, e.g. utils.print_progress
+        """
+        check_storage_dtype(storage_dtype)
         self._path = path
         self._binary = binary
+        self._index_type = index_type
+        self._cache = cache
+        self._storage_dtype = storage_dtype
+        self._max_vocab = max_vocab
+        self._keep_words = keep_words
+        self._progress = progress
         self._is_built = False
 
-    def build(self):
+    def build(self, n_workers: int = 1):
+        """
+        n_workers: number of processes parsing a text file in parallel
+        """
         if not self._is_built:
-            if not isfile(self._path):
-                # if data is not at self._path
-                # download it through url in .env
-                download_data(
-                    url=os.getenv(basename(self._path)),
-                    output_path=self._path + '.gz',
-                )
-                extract_gz(self._path + '.gz')
+            # normalized vectors of previously loaded rows are stale
+            self.__dict__.pop('_normed_vectors', None)
             (
                 self._embedding_size,
                 self._vocab_size,
                 self._vocab_list,
                 self._word_vectors,
-            ) = self._load_data(
-                path=self._path,
-                binary=self._binary,
+                self._scales,
+            ) = self._load_vectors(n_workers=n_workers)
+            self._vocab_index = build_vocab_index(
+                self._vocab_list,
+                index_type=self._index_type,
             )
             self._is_built = True
 
+    def _load_vectors(self, n_workers: int = 1):
+        """Return (embedding_size, vocab_size, vocab_list, word_vectors, scales)
+        from the cache, or from path (downloaded if missing)
+        """
+        data = self._load_cache() if self._cache else None
+        if data is None:
+            kwargs = dict(
+                max_vocab=self._max_vocab,
+                keep_words=self._keep_words,
+                storage_dtype=self._storage_dtype,
+            )
+            if isfile(self._path):
+                data = self._load_data(
+                    path=self._path,
+                    binary=self._binary,
+                    n_workers=n_workers,
+                    **kwargs,
+                )
+            elif n_workers > 1 and not self._binary:
+                # parallel parsing needs the whole file on disk
+                fetch_file(**self._download_kwargs())
+                data = self._load_data(path=self._path, n_workers=n_workers, **kwargs)
+            else:
+                # download, decompress and parse in one pass
+                with open_url(**self._download_kwargs()) as fin:
+                    data = self._read_data(fin, binary=self._binary, **kwargs)
+            if self._cache:
+                self._write_cache(*data)
+        return data
+
+    def _download_kwargs(self) -> dict:
+        """Where to download path from if it is missing
+
+            The url is read from the environment variable (or .env) named
+            after basename(path), its sha256 from basename(path) + '.sha256'.
+
+        """
+        name = basename(self._path)
+        url = os.getenv(name)
+        if url is None:
+            raise FileNotFoundError(
+                f"[{self._path}] does not exist and no url is set as [{name}] in .env",
+            )
+        return dict(
+            url=url,
+            path=self._path,
+            sha256=os.getenv(name + '.sha256'),
+            progress=self._progress,
+        )
+
     def __getitem__(self, key) -> np.ndarray:
         """Get a word vector
 
@@ -131,11 +304,10 @@ class KeyedVectors(Embedder):
         return self._vocab_list
 
     def get_index(self, word: str) -> int:
-        try:
-            index = self._vocab_list.index(word)
-        except ValueError:
-            index = -1
-        return index
+        return self._vocab_index.get(word)
+
+    def get_indices(self, words: List[str]) -> np.ndarray:
+        return self._vocab_index.get_many(words)
 
     def get_word(self, index: int) -> str:
         word = None
@@ -148,15 +320,197 @@ class KeyedVectors(Embedder):
             )
         return word
 
+    def init_sims(self, path: str = None, block_size: int = BLOCK_SIZE) -> None:
+        """Precompute L2-normalized vectors for similarity queries
+
+            If path is given, normalized vectors are written there as a .npy file
+            and memory-mapped. The file is reused as long as it is newer than
+            the embedding file.
+
+        """
+        if '_normed_vectors' in self.__dict__:
+            return
+        shape = (self._vocab_size, self._embedding_size)
+        has_source = self._path is not None and isfile(self._path)
+        if path is not None and isfile(path) and (
+                not has_source or getmtime(path) >= getmtime(self._path)):
+            normed_vectors = np.load(path, mmap_mode='r')
+            if normed_vectors.shape == shape:
+                self._normed_vectors = normed_vectors
+                return
+
+        if path is None:
+            normed_vectors = np.empty(shape, dtype=np.float32)
+        else:
+            normed_vectors = np.lib.format.open_memmap(
+                path, mode='w+', dtype=np.float32, shape=shape)
+        normalize_blocks(
+            lambda start, end: self.lookup_many(np.arange(start, end)),
+            n_rows=self._vocab_size,
+            out=normed_vectors,
+            block_size=block_size,
+        )
+        if path is not None:
+            normed_vectors.flush()
+            normed_vectors = np.load(path, mmap_mode='r')
+        self._normed_vectors = normed_vectors
+
+    def similarity(self, a, b) -> float:
+        """Cosine similarity of two words, indices or vectors"""
+        vectors = normalize_rows(np.stack([self._as_vector(a), self._as_vector(b)]))
+        return float(vectors[0] @ vectors[1])
+
+    def most_similar(
+            self,
+            query,
+            topk: int = 10,
+            block_size: int = BLOCK_SIZE,
+        ):
+        """Find the topk most similar words by cosine similarity
+
+            query is a word, an index or a vector, or a list / 2D array of them.
+            Return a list of (word, similarity), or a list of such lists
+            for a batch of queries. Words of the query are excluded from its results.
+
+        """
+        is_batch = isinstance(query, (list, tuple)) or (
+            isinstance(query, np.ndarray) and query.ndim == 2)
+        queries = list(query) if is_batch else [query]
+
+        excluded = [self._query_index(q) for q in queries]
+        vectors = normalize_rows(np.stack([self._as_vector(q) for q in queries]))
+        indices, scores = self._search(vectors, topk=topk + 1, block_size=block_size)
+
+        results = []
+        for row_indices, row_scores, exclude in zip(indices, scores, excluded):
+            result = [
+                (self._vocab_list[index], float(score))
+                for index, score in zip(row_indices.tolist(), row_scores.tolist())
+                if index != exclude
+            ]
+            results.append(result[:topk])
+        return results if is_batch else results[0]
+
+    def _search(self, queries: np.ndarray, topk: int, block_size: int):
+        """Return indices and cosine similarities of the topk rows for normalized queries"""
+        self.init_sims()
+        return top_k_similar(
+            self._normed_vectors,
+            queries,
+            topk=topk,
+            block_size=block_size,
+        )
+
+    def _query_index(self, key) -> int:
+        if isinstance(key, str):
+            return self.get_index(key)
+        if isinstance(key, (int, np.integer)):
+            return int(key)
+        return -1
+
+    def _as_vector(self, key) -> np.ndarray:
+        if isinstance(key, (str, int, np.integer)):
+            return self[key if isinstance(key, str) else int(key)]
+        vector = np.asarray(key, dtype=np.float32)
+        if vector.shape != (self._embedding_size,):
+            raise ValueError(
+                f"Expect a vector with shape ({self._embedding_size},), got {vector.shape}",
+            )
+        return vector
+
     def _get_vector(self, index: int) -> np.ndarray:
         if (index >= 0) and (index < self._vocab_size):
-            return self._word_vectors[index, :]
+            if self._storage_dtype == 'float32':
+                return self._word_vectors[index, :]
+            return dequantize(
+                self._word_vectors[index, :],
+                None if self._scales is None else self._scales[index],
+            )
         else:
             raise OOVError
 
+    def lookup_many(self, indices: np.ndarray, out: np.ndarray = None) -> np.ndarray:
+        indices = np.asarray(indices, dtype=np.int64)
+        self._check_indices(indices)
+        if self._storage_dtype != 'float32':
+            return dequantize(
+                self._word_vectors[indices],
+                None if self._scales is None else self._scales[indices],
+                out=out,
+            )
+        if out is None:
+            return self._word_vectors[indices].astype(np.float32, copy=False)
+        if out.dtype == self._word_vectors.dtype:
+            return np.take(self._word_vectors, indices, axis=0, out=out)
+        out[:] = self._word_vectors[indices]
+        return out
+
+    def _check_indices(self, indices: np.ndarray) -> None:
+        if indices.size > 0 and (
+                indices.min() < 0 or indices.max() >= self._vocab_size):
+            raise OOVError
+
+    @property
+    def _cache_path(self) -> str:
+        return self._path + CACHE_SUFFIX
+
+    def _cache_options(self) -> dict:
+        """Build options a cache should be written with to be reused"""
+        keep_words = None
+        if self._keep_words is not None:
+            keep_words = hashlib.sha1(
+                '\n'.join(sorted(set(self._keep_words))).encode('utf8')).hexdigest()
+        return {
+            'storage_dtype': self._storage_dtype,
+            'max_vocab': self._max_vocab,
+            'keep_words': keep_words,
+        }
+
+    def _load_cache(self):
+        if not isfile(self._cache_path):
+            return None
+        try:
+            meta, arrays = read_arrays(self._cache_path)
+        except (OSError, ValueError) as e:
+            warnings.warn(f"ignore broken cache [{self._cache_path}]: {e}", RuntimeWarning)
+            return None
+        if not is_fresh(meta, self._path) or any(
+                meta.get(key) != value for key, value in self._cache_options().items()):
+            return None
+        word_vectors = arrays['word_vectors']
+        vocab_list = unpack_vocab(arrays['vocab_offsets'], arrays['vocab_blob'])
+        vocab_size, embedding_size = word_vectors.shape
+        return embedding_size, vocab_size, vocab_list, word_vectors, arrays.get('scales')
+
+    def _write_cache(self, embedding_size, vocab_size, vocab_list, word_vectors, scales):
+        vocab_offsets, vocab_blob = pack_vocab(vocab_list)
+        arrays = {
+            'word_vectors': word_vectors,
+            'vocab_offsets': vocab_offsets,
+            'vocab_blob': vocab_blob,
+        }
+        if scales is not None:
+            arrays['scales'] = scales
+        try:
+            write_arrays(
+                self._cache_path,
+                arrays=arrays,
+                meta=dict(source_stamp(self._path), **self._cache_options()),
+            )
+        except OSError as e:
+            warnings.warn(f"fail to write cache [{self._cache_path}]: {e}", RuntimeWarning)
+
+    @staticmethod
+    def _load_data(path: str, binary: bool = False, n_workers: int = 1, **kwargs):
+        if binary:
+            # reading binary records is a memcpy, not worth parallelizing
+            return _load_bin_file(path=path, **kwargs)
+        else:
+            return _load_text_file(path=path, n_workers=n_workers, **kwargs)
+
     @staticmethod
-    def _load_data(path: str, binary: bool = False):
+    def _read_data(fin, binary: bool = False, **kwargs):
         if binary:
-            return _load_bin_file(path=path)
+            return _read_bin_stream(fin, **kwargs)
         else:
-            return _load_text_file(path=path)
+            return _read_text_stream(fin, **kwargs)
@@ -1,99 +1,174 @@
-from typing import List
-import io
-from os.path import isfile, basename
+from typing import Callable, List
+import mmap
+import threading
+import warnings
+from os.path import isfile
 import os
 
 import numpy as np
 
+from .cache import (
+    is_fresh,
+    pack_vocab,
+    read_arrays,
+    source_stamp,
+    unpack_vocab,
+    write_arrays,
+)
 from .keyed_vectors import KeyedVectors
 from .oov_error import OOVError
-from .utils import download_data, extract_gz
+from .quantization import dequantize, quantize
+from .readers import iter_line_blocks, read_bin_records
+from .similarity import normalize_rows, top_k_from_blocks
+from .utils import open_url
+from .vocab_index import build_vocab_index
 
 
-def _load_text_file(path: str):
-    """Load .vec file"""
-    fin = io.open(path, 'rb')
-    first_line = fin.readline().decode('utf8')
-    vocab_size, embedding_size = map(int, first_line.split())
+INDEX_SUFFIX = '.weindex'
+
+_HAS_PREAD = hasattr(os, 'pread')
+
+
+def _read_text_stream(fin):
+    """Read vocab and the offset of each line of a .vec stream"""
+    first_line = fin.readline()
+    vocab_size, embedding_size = map(int, first_line.decode('utf8').split())
 
     # init vocab list
     vocab_list = ['0'] * vocab_size
 
     # record start position of each line in file
-    byte_pos = [0] * (vocab_size + 1)
-    byte_pos[0] = fin.tell()
-
-    for idx in range(vocab_size):
-        line = fin.readline()
-        tokens = line.rstrip().split(b' ')
-        vocab_list[idx] = tokens[0].decode('utf8')
-        byte_pos[idx + 1] = fin.tell()
-    fin.close()
+    byte_pos = np.zeros(vocab_size + 1, dtype=np.int64)
+    byte_pos[0] = len(first_line)
+
+    idx = 0
+    end = len(first_line)  # offset of the end of what is read
+    for block in iter_line_blocks(fin):
+        end += len(block)
+        lines = block.split(b'\n')
+        if not lines[-1]:
+            # block ends with a newline
+            lines.pop()
+        lines = lines[:vocab_size - idx]
+        vocab_list[idx: idx + len(lines)] = [
+            line.rstrip().partition(b' ')[0].decode('utf8') for line in lines
+        ]
+        line_ends = np.cumsum([len(line) + 1 for line in lines]) + byte_pos[idx]
+        byte_pos[idx + 1: idx + len(lines) + 1] = line_ends
+        idx += len(lines)
+    # the last line may have no newline
+    byte_pos[idx] = min(byte_pos[idx], end)
     return embedding_size, vocab_size, vocab_list, byte_pos
 
 
-def _load_bin_file(path: str):
-    # load .bin file
-    # Note that float in this file should be float32
+def _read_bin_stream(fin):
+    # Note that float in .bin file should be float32
     # float64 is not allowed
-    fin = open(path, 'rb')
-    header = fin.readline().decode('utf8')
-    vocab_size, embedding_size = (int(x) for x in header.split())
+    header = fin.readline()
+    vocab_size, embedding_size = (int(x) for x in header.decode('utf8').split())
+
+    # record start position of each vector in file
+    byte_pos = np.empty(vocab_size, dtype=np.int64)
+    vocab_list = read_bin_records(
+        fin,
+        vocab_size=vocab_size,
+        n_dim=embedding_size,
+        byte_pos=byte_pos,
+        start=len(header),
+    )
+    return embedding_size, vocab_size, vocab_list, byte_pos
 
-    # init vocab list
-    vocab_list = ['0'] * vocab_size
 
-    # record start position of each line in file
-    byte_pos = [0] * vocab_size
-
-    binary_len = 4 * embedding_size  # 4: because of float32
-    for idx in range(vocab_size):
-        # mixed text and binary: read text first, then binary
-        word = []
-        while True:
-            ch = fin.read(1)
-            if ch == b' ':
-                break
-            if ch == b'':
-                raise EOFError(
-                    "unexpected end of input; is count incorrect or file otherwise damaged?")
-            # ignore newlines in front of words (some binary files have)
-            if ch != b'\n':
-                word.append(ch)
-
-        byte_pos[idx] = fin.tell()
-        vocab_list[idx] = b''.join(word).decode('utf8')
-        fin.read(binary_len)
-    fin.close()
-    return embedding_size, vocab_size, vocab_list, byte_pos
+def _load_text_file(path: str):
+    """Load .vec file"""
+    with open(path, 'rb') as fin:
+        return _read_text_stream(fin)
+
+
+def _load_bin_file(path: str):
+    # load .bin file
+    with open(path, 'rb') as fin:
+        return _read_bin_stream(fin)
 
 
 class KeyedVectorsLight(KeyedVectors):
 
-    def __init__(self, path: str, binary: bool = False):
-        super().__init__(path=path, binary=binary)
+    _BUILT_ATTRS = (
+        '_embedding_size',
+        '_vocab_size',
+        '_vocab_list',
+        '_vocab_index',
+        '_byte_pos',
+        '_vloader',
+        '_hot_vectors',
+        '_hot_scales',
+        '_hot_slots',
+        '_normed_vectors',
+    )
+
+    def __init__(
+            self,
+            path: str,
+            binary: bool = False,
+            index_type: str = 'hash',
+            cache: bool = True,
+            hot_size: int = 0,
+            hot_words: List[str] = None,
+            storage_dtype: str = 'float32',
+            progress: Callable[[int, int], None] = None,
+        ):
+        """
+        cache: save vocab and byte offsets to path + '.weindex'
+            on first build and reuse them on later builds
+        hot_size: number of leading rows loaded into memory on build,
+            rows of fastText .vec files are sorted by word frequency
+        hot_words: extra words loaded into memory on build
+        storage_dtype: how hot rows are held in memory,
+            'float32', 'float16' or 'int8' with a scale per row
+        progress: see KeyedVectors
+        """
+        super().__init__(
+            path=path,
+            binary=binary,
+            index_type=index_type,
+            cache=cache,
+            storage_dtype=storage_dtype,
+            progress=progress,
+        )
+        self._hot_size = hot_size
+        self._hot_words = hot_words
 
     def build(self):
         if self._is_built:
-            pass
-
-        if not isfile(self._path):
+            return
+        self.__dict__.pop('_normed_vectors', None)
+
+        if isfile(self._path):
+            data = self._load_cache() if self._cache else None
+            if data is None:
+                data = self._load_data(
+                    path=self._path,
+                    binary=self._binary,
+                )
+                if self._cache:
+                    self._write_cache(*data)
+        else:
             # if data is not at self._path
-            # download it through url in .env
-            download_data(
-                url=os.getenv(basename(self._path)),
-                output_path=self._path + '.gz',
-            )
-            extract_gz(self._path + '.gz')
-
+            # download it through url in .env, vocab and offsets
+            # are read while it is downloaded and decompressed
+            with open_url(**self._download_kwargs()) as fin:
+                data = self._read_data(fin, binary=self._binary)
+            if self._cache:
+                self._write_cache(*data)
         (
             self._embedding_size,
             self._vocab_size,
             self._vocab_list,
             self._byte_pos,
-        ) = self._load_data(
-            path=self._path,
-            binary=self._binary,
+        ) = data
+        self._vocab_index = build_vocab_index(
+            self._vocab_list,
+            index_type=self._index_type,
         )
 
         self._vloader = LowMemoryVecLoader(
@@ -101,14 +176,121 @@ class KeyedVectorsLight(KeyedVectors):
             byte_pos=self._byte_pos,
             binary=self._binary,
         )
+        self._load_hot_vectors()
         self._is_built = True
 
+    def _load_hot_vectors(self):
+        """Load the leading hot_size rows and rows of hot_words into memory
+
+            Row i of _hot_vectors is vector i for i < hot_size,
+            _hot_slots maps indices of other hot words to their rows.
+
+        """
+        hot_size = min(self._hot_size, self._vocab_size)
+        hot_indices = np.arange(hot_size, dtype=np.int64)
+        if self._hot_words:
+            word_indices = self.get_indices(list(self._hot_words))
+            word_indices = np.unique(word_indices[word_indices >= hot_size])
+            hot_indices = np.concatenate([hot_indices, word_indices])
+        self._hot_slots = {
+            index: slot for slot, index in enumerate(hot_indices[hot_size:].tolist(), hot_size)
+        }
+        self._hot_vectors, self._hot_scales = quantize(
+            self._vloader.get_many(hot_indices),
+            self._storage_dtype,
+        )
+
+    def _hot_rows(self, slots: np.ndarray) -> np.ndarray:
+        if self._storage_dtype == 'float32':
+            return self._hot_vectors[slots]
+        return dequantize(
+            self._hot_vectors[slots],
+            None if self._hot_scales is None else self._hot_scales[slots],
+        )
+
+    def _hot_slot(self, index: int) -> int:
+        # index is always checked against vocab size before
+        if index < self._hot_size:
+            return index
+        return self._hot_slots.get(index, -1)
+
     def _get_vector(self, index: int) -> np.ndarray:
         if (index >= 0) and (index < self._vocab_size):
+            slot = self._hot_slot(index)
+            if slot >= 0:
+                return self._hot_rows(slot)
             return self._vloader[index]
         else:
             raise OOVError
 
+    def lookup_many(self, indices: np.ndarray, out: np.ndarray = None) -> np.ndarray:
+        indices = np.asarray(indices, dtype=np.int64)
+        self._check_indices(indices)
+        if out is None:
+            out = np.empty((len(indices), self._embedding_size), dtype=np.float32)
+        slots = np.fromiter(
+            map(self._hot_slot, indices.tolist()),
+            dtype=np.int64,
+            count=len(indices),
+        )
+        hot_mask = slots >= 0
+        out[hot_mask] = self._hot_rows(slots[hot_mask])
+        if not hot_mask.all():
+            out[~hot_mask] = self._vloader.get_many(indices[~hot_mask])
+        return out
+
+    def _search(self, queries: np.ndarray, topk: int, block_size: int):
+        """Score rows block by block as they are read from the file
+
+            Unlike KeyedVectors, no normalized copy of the whole vocabulary
+            is kept in memory, unless init_sims() is called explicitly.
+
+        """
+        if '_normed_vectors' in self.__dict__:
+            return super()._search(queries, topk=topk, block_size=block_size)
+        return top_k_from_blocks(
+            lambda start, end: queries @ normalize_rows(
+                self.lookup_many(np.arange(start, end))).T,
+            n_rows=self._vocab_size,
+            n_queries=len(queries),
+            topk=topk,
+            block_size=block_size,
+        )
+
+    @property
+    def _cache_path(self) -> str:
+        return self._path + INDEX_SUFFIX
+
+    def _load_cache(self):
+        if not isfile(self._cache_path):
+            return None
+        try:
+            meta, arrays = read_arrays(self._cache_path)
+        except (OSError, ValueError) as e:
+            warnings.warn(f"ignore broken index [{self._cache_path}]: {e}", RuntimeWarning)
+            return None
+        if meta.get('binary') != self._binary or not is_fresh(meta, self._path):
+            return None
+        vocab_list = unpack_vocab(arrays['vocab_offsets'], arrays['vocab_blob'])
+        return meta['embedding_size'], len(vocab_list), vocab_list, arrays['byte_pos']
+
+    def _write_cache(self, embedding_size, vocab_size, vocab_list, byte_pos):
+        vocab_offsets, vocab_blob = pack_vocab(vocab_list)
+        meta = source_stamp(self._path)
+        meta.update(binary=self._binary, embedding_size=embedding_size)
+        try:
+            write_arrays(
+                self._cache_path,
+                arrays={
+                    'byte_pos': byte_pos,
+                    'vocab_offsets': vocab_offsets,
+                    'vocab_blob': vocab_blob,
+                },
+                meta=meta,
+            )
+        except OSError as e:
+            warnings.warn(f"fail to write index [{self._cache_path}]: {e}", RuntimeWarning)
+
     @staticmethod
     def _load_data(path: str, binary: bool = False):
         if binary:
@@ -116,6 +298,13 @@ class KeyedVectorsLight(KeyedVectors):
         else:
             return _load_text_file(path=path)
 
+    @staticmethod
+    def _read_data(fin, binary: bool = False):
+        if binary:
+            return _read_bin_stream(fin)
+        else:
+            return _read_text_stream(fin)
+
     def __del__(self):
         if '_vloader' in self.__dict__:
             del self._vloader
@@ -128,7 +317,12 @@ class LowMemoryVecLoader:
             path: str,
             byte_pos: List[int],
             binary: bool = False,
+            use_mmap: bool = True,
         ):
+        """
+        use_mmap: map the file into memory, binary vectors are then returned
+            as zero-copy read-only views and no seek is needed per lookup
+        """
         self._byte_pos = byte_pos
         self._binary = binary
 
@@ -136,16 +330,28 @@ class LowMemoryVecLoader:
         header = self.fin.readline().decode('utf8')
         self._vocab_size, self._embedding_size = map(int, header.split())
 
+        self._lock = threading.Lock()
+        self._mmap = None
+        if use_mmap:
+            self._mmap = mmap.mmap(self.fin.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def _read(self, start_pos: int, length: int) -> bytes:
+        # neither slicing the map nor pread moves the shared file position,
+        # so concurrent lookups from many threads are safe
+        if self._mmap is not None:
+            return self._mmap[start_pos: start_pos + length]
+        if _HAS_PREAD:
+            return os.pread(self.fin.fileno(), length, start_pos)
+        with self._lock:
+            self.fin.seek(start_pos, 0)
+            return self.fin.read(length)
+
     def _get_vector_from_text(self, index: int) -> np.ndarray:
         # get start end position from _byte_pos
-        start_pos = self._byte_pos[index]
-        end_pos = self._byte_pos[index + 1]
+        start_pos = int(self._byte_pos[index])
+        end_pos = int(self._byte_pos[index + 1])
 
-        #
-        diff = end_pos - start_pos
-
-        self.fin.seek(start_pos, 0)
-        line = self.fin.read(diff).decode('utf8')
+        line = self._read(start_pos, end_pos - start_pos).decode('utf8')
 
         tokens = line.rstrip().split(' ')
         vector = list(map(float, tokens[1:]))
@@ -154,26 +360,59 @@ class LowMemoryVecLoader:
     def _get_vector_from_bin(self, index: int) -> np.ndarray:
         binary_len = 4 * self._embedding_size  # 4: because of float32
 
-        start_pos = self._byte_pos[index]
+        start_pos = int(self._byte_pos[index])
 
-        self.fin.seek(start_pos, 0)
+        if self._mmap is not None:
+            # view over the mapped file, nothing is copied
+            return np.frombuffer(
+                self._mmap,
+                dtype='float32',
+                count=self._embedding_size,
+                offset=start_pos,
+            )
 
         vector = np.frombuffer(
-            self.fin.read(binary_len),
+            self._read(start_pos, binary_len),
             dtype='float32',
         )
         return vector
 
+    def _get_vector(self, index: int) -> np.ndarray:
+        if self._binary:
+            return self._get_vector_from_bin(index=index)
+        return self._get_vector_from_text(index=index)
+
     def __getitem__(self, index: int) -> np.ndarray:
-        if (index < 0) or (index > self._vocab_size):
+        if (index < 0) or (index >= self._vocab_size):
             raise ValueError('Out of index')
+        return self._get_vector(index)
 
-        if self._binary:
-            vector = self._get_vector_from_bin(index=index)
-        else:
-            vector = self._get_vector_from_text(index=index)
-        return vector
+    def get_many(self, indices: np.ndarray, out: np.ndarray = None) -> np.ndarray:
+        """Get vectors of many indices
+
+            Each distinct index is read once, in file order.
+
+        """
+        indices = np.asarray(indices, dtype=np.int64)
+        if indices.size > 0 and (indices.min() < 0 or indices.max() >= self._vocab_size):
+            raise ValueError('Out of index')
+        if out is None:
+            out = np.empty((len(indices), self._embedding_size), dtype=np.float32)
+
+        unique_indices, inverse = np.unique(indices, return_inverse=True)
+        vectors = np.empty((len(unique_indices), self._embedding_size), dtype=np.float32)
+        for i, index in enumerate(unique_indices.tolist()):
+            vectors[i, :] = self._get_vector(index)
+        out[:] = vectors[inverse.reshape(-1)]
+        return out
 
     def __del__(self):
+        if self._mmap is not None:
+            try:
+                self._mmap.close()
+            except BufferError:
+                # vectors returned as views still refer to the map,
+                # it is released once they are garbage collected
+                pass
         self.fin.close()
         del self.fin
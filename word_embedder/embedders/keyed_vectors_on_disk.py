@@ -1,7 +1,14 @@
+from os.path import isfile
+import warnings
+
 import numpy as np
 import pickle as pkl
 
+from .cache import CACHE_SUFFIX, is_fresh, read_arrays, source_stamp, write_arrays
 from .keyed_vectors import KeyedVectors
+from .quantization import quantize
+from .similarity import BLOCK_SIZE
+from .vocab_index import build_vocab_index
 
 
 class KeyedVectorsOnDisk(KeyedVectors):
@@ -26,13 +33,25 @@ class KeyedVectorsOnDisk(KeyedVectors):
             self,
             path: str,
             array_path: str = None,
+            index_type: str = 'hash',
+            storage_dtype: str = 'float32',
         ):
-        self._path = path
+        """
+        storage_dtype: 'float32' maps the array file as it is,
+            'float16' or 'int8' convert it once into
+            array file + '.<storage_dtype>.wecache' and map that instead
+        """
+        super().__init__(
+            path=path,
+            index_type=index_type,
+            cache=False,
+            storage_dtype=storage_dtype,
+        )
         self._array_path = array_path
-        self._is_built = False
 
     def build(self):
         if not self._is_built:
+            self.__dict__.pop('_normed_vectors', None)
             (
                 self._embedding_size,
                 self._vocab_size,
@@ -42,8 +61,50 @@ class KeyedVectorsOnDisk(KeyedVectors):
                 path=self._path,
                 array_path=self._array_path,
             )
+            self._scales = None
+            if self._storage_dtype != 'float32':
+                self._word_vectors, self._scales = self._load_quantized(self._word_vectors)
+            self._vocab_index = build_vocab_index(
+                self._vocab_list,
+                index_type=self._index_type,
+            )
             self._is_built = True
 
+    def _load_quantized(self, word_vectors: np.memmap):
+        vector_path = word_vectors.filename
+        path = f"{vector_path}.{self._storage_dtype}{CACHE_SUFFIX}"
+        if isfile(path):
+            try:
+                meta, arrays = read_arrays(path)
+                if is_fresh(meta, vector_path) and \
+                        arrays['word_vectors'].shape == word_vectors.shape:
+                    return arrays['word_vectors'], arrays.get('scales')
+            except (OSError, ValueError) as e:
+                warnings.warn(f"ignore broken cache [{path}]: {e}", RuntimeWarning)
+
+        # convert block by block, the float array is never fully loaded
+        data = np.empty(word_vectors.shape, dtype=self._storage_dtype)
+        scales = np.empty(len(word_vectors), dtype=np.float32) \
+            if self._storage_dtype == 'int8' else None
+        for start in range(0, len(word_vectors), BLOCK_SIZE):
+            end = min(start + BLOCK_SIZE, len(word_vectors))
+            data[start: end], block_scales = quantize(
+                np.asarray(word_vectors[start: end]), self._storage_dtype)
+            if scales is not None:
+                scales[start: end] = block_scales
+        arrays = {'word_vectors': data}
+        if scales is not None:
+            arrays['scales'] = scales
+        try:
+            write_arrays(
+                path,
+                arrays=arrays,
+                meta=dict(source_stamp(vector_path), storage_dtype=self._storage_dtype),
+            )
+        except OSError as e:
+            warnings.warn(f"fail to write cache [{path}]: {e}", RuntimeWarning)
+        return data, scales
+
     @staticmethod
     def _load_data(path: str, array_path: str = None):
         with open(path, 'rb') as f:
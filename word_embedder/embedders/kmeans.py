@@ -0,0 +1,56 @@
+import numpy as np
+
+
+BLOCK_SIZE = 16384
+
+
+def assign(data: np.ndarray, centroids: np.ndarray, block_size: int = BLOCK_SIZE) -> np.ndarray:
+    """Index of the nearest centroid (L2) of each row, computed block by block"""
+    centroid_norms = (centroids ** 2).sum(axis=1)
+    labels = np.empty(len(data), dtype=np.int64)
+    for start in range(0, len(data), block_size):
+        block = np.asarray(data[start: start + block_size], dtype=np.float32)
+        # ||x - c||^2 = ||x||^2 - 2 x.c + ||c||^2, ||x||^2 does not change the argmin
+        distances = centroid_norms - 2 * block @ centroids.T
+        labels[start: start + len(block)] = distances.argmin(axis=1)
+    return labels
+
+
+def kmeans(
+        data: np.ndarray,
+        n_clusters: int,
+        n_iter: int = 20,
+        sample_size: int = None,
+        seed: int = 2018,
+    ) -> np.ndarray:
+    """Lloyd's k-means, return centroids with shape (n_clusters, n_dim)
+
+        If sample_size is given, centroids are trained on
+        a random sample of that many rows to bound training time.
+
+    """
+    rand_state = np.random.RandomState(seed)
+    if sample_size is not None and sample_size < len(data):
+        sample = np.sort(rand_state.choice(len(data), sample_size, replace=False))
+        data = data[sample]
+    data = np.asarray(data, dtype=np.float32)
+    if n_clusters > len(data):
+        raise ValueError(
+            f"n_clusters [{n_clusters}] should not exceed number of samples [{len(data)}]",
+        )
+
+    centroids = data[rand_state.choice(len(data), n_clusters, replace=False)].copy()
+    for _ in range(n_iter):
+        labels = assign(data, centroids)
+        counts = np.bincount(labels, minlength=n_clusters)
+        sums = np.stack(
+            [np.bincount(labels, weights=column, minlength=n_clusters) for column in data.T],
+            axis=1,
+        )
+        non_empty = counts > 0
+        centroids[non_empty] = sums[non_empty] / counts[non_empty, None]
+        # restart empty clusters from random points
+        n_empty = int((~non_empty).sum())
+        if n_empty > 0:
+            centroids[~non_empty] = data[rand_state.choice(len(data), n_empty, replace=False)]
+    return centroids
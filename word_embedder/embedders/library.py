@@ -1,11 +1,49 @@
-from typing import List
-from collections import OrderedDict
+import asyncio
+from concurrent.futures import Future, ThreadPoolExecutor
+import threading
+import time
+from typing import Dict, Iterable, List
+from collections import OrderedDict, namedtuple
+
+
+MemoryInfo = namedtuple(
+    'MemoryInfo',
+    ['max_bytes', 'currbytes', 'n_built', 'evictions', 'evicted_bytes', 'rebuilds'],
+)
 
 
 class Library:
 
-    def __init__(self):
+    """Registry of embedders, each built once on first use
+
+    Embedders can be prefetched, i.e. built in background threads while
+    the service starts up. A lookup waits for its running build instead
+    of starting another one.
+
+    With max_bytes, least recently used embedders are released when the
+    built ones exceed the budget, and built again on their next lookup.
+    Get embedders from the library on use rather than keeping them,
+    a released embedder raises NotBuiltError until it is built again.
+    """
+
+    def __init__(self, max_workers: int = None, max_bytes: int = None):
+        """
+        max_workers: max number of embedders prefetched at the same time
+        max_bytes: memory budget of built embedders, see Embedder.nbytes,
+            evicted embedders are released even if callers still hold them
+        """
         self.library = OrderedDict()
+        self.max_workers = max_workers
+        self.max_bytes = max_bytes
+        self._executor = None
+        self._futures = {}  # name -> future of its build
+        self._build_times = {}  # name -> [start, end]
+        self._nbytes = OrderedDict()  # name -> nbytes of built ones, least recently used first
+        self._evicted = set()
+        self._evictions = 0
+        self._evicted_bytes = 0
+        self._rebuilds = 0
+        self._lock = threading.Lock()
 
     def register(
             self,
@@ -21,8 +59,166 @@ class Library:
         return list(self.library.keys())
 
     def __getitem__(self, name: str):
+        return self.get(name)
+
+    def get(self, name: str, timeout: float = None):
+        """Return the embedder, build it in this thread if no build is running
+
+            timeout: max seconds to wait for a running build,
+                raise concurrent.futures.TimeoutError if exceeded
+
+        """
+        while True:
+            future, owner = self._get_future(name)
+            if owner:
+                self._build(name, future)
+            embedder = future.result(timeout=timeout)
+            if self._touch(name, future):
+                return embedder
+
+    def prefetch(self, names: Iterable[str] = None) -> Dict[str, Future]:
+        """Build embedders in background threads, all of them if names is not given
+
+            Return {name: future of the built embedder}.
+
+        """
+        if names is None:
+            names = self.list_all()
+        futures = OrderedDict()
+        for name in names:
+            future, owner = self._get_future(name)
+            if owner:
+                self._get_executor().submit(self._build, name, future)
+            futures[name] = future
+        return futures
+
+    async def aget(self, name: str):
+        """Async __getitem__, the embedder is built in a background thread"""
+        while True:
+            future = self.prefetch([name])[name]
+            embedder = await asyncio.wrap_future(future)
+            if self._touch(name, future):
+                return embedder
+
+    def status(self) -> Dict[str, dict]:
+        """Return {name: {'state': state, 'seconds': build time so far, 'nbytes': size}}
+
+            state is one of 'registered', 'queued', 'building', 'built',
+            'failed' and 'evicted'.
+
+        """
+        status = OrderedDict()
+        now = time.monotonic()
+        for name, embedder in self.library.items():
+            future = self._futures.get(name)
+            start, end = self._build_times.get(name, (None, None))
+            if future is None and name in self._evicted:
+                state = 'evicted'
+            elif future is None:
+                state = 'built' if getattr(embedder, '_is_built', False) else 'registered'
+            elif _failed(future):
+                state = 'failed'
+            elif start is None:
+                state = 'queued'
+            else:
+                state = 'built' if future.done() else 'building'
+            seconds = None if start is None else (now if end is None else end) - start
+            status[name] = {
+                'state': state,
+                'seconds': seconds,
+                'nbytes': self._nbytes.get(name, 0),
+            }
+        return status
+
+    def memory_info(self) -> MemoryInfo:
+        with self._lock:
+            return MemoryInfo(
+                max_bytes=self.max_bytes,
+                currbytes=sum(self._nbytes.values()),
+                n_built=len(self._nbytes),
+                evictions=self._evictions,
+                evicted_bytes=self._evicted_bytes,
+                rebuilds=self._rebuilds,
+            )
+
+    def _get_future(self, name: str):
+        """Return (future of the build, whether the caller should run it)
+
+            A failed build is retried.
+
+        """
         if name not in self.library:
-            KeyError('Embedder [{}] is not found'.format(name))
+            raise KeyError('Embedder [{}] is not found'.format(name))
+        with self._lock:
+            future = self._futures.get(name)
+            if future is not None and not _failed(future):
+                return future, False
+            future = Future()
+            self._futures[name] = future
+            self._build_times.pop(name, None)
+            return future, True
+
+    def _build(self, name: str, future: Future) -> None:
+        if not future.set_running_or_notify_cancel():
+            return
+        build_time = self._build_times[name] = [time.monotonic(), None]
+        embedder = self.library[name]
+        try:
+            embedder.build()
+        except BaseException as e:
+            build_time[1] = time.monotonic()
+            future.set_exception(e)
         else:
-            self.library[name].build()
-            return self.library[name]
+            build_time[1] = time.monotonic()
+            self._add_built(name, embedder)
+            future.set_result(embedder)
+
+    def _add_built(self, name: str, embedder) -> None:
+        """Account a built embedder and evict others to fit in max_bytes"""
+        nbytes = getattr(embedder, 'nbytes', 0)
+        with self._lock:
+            if name in self._evicted:
+                self._evicted.discard(name)
+                self._rebuilds += 1
+            self._nbytes[name] = nbytes
+            self._nbytes.move_to_end(name)
+            if self.max_bytes is None:
+                return
+            currbytes = sum(self._nbytes.values())
+            for victim in list(self._nbytes):
+                if currbytes <= self.max_bytes:
+                    break
+                if victim == name or not hasattr(self.library[victim], 'release'):
+                    continue
+                self.library[victim].release()
+                self._futures.pop(victim, None)
+                self._build_times.pop(victim, None)
+                victim_bytes = self._nbytes.pop(victim)
+                currbytes -= victim_bytes
+                self._evicted.add(victim)
+                self._evictions += 1
+                self._evicted_bytes += victim_bytes
+
+    def _touch(self, name: str, future: Future) -> bool:
+        """Mark a built embedder as most recently used
+
+            Return False if it was evicted since future was done,
+            the caller should build it again.
+
+        """
+        with self._lock:
+            if self._futures.get(name) is not future:
+                return False
+            if name in self._nbytes:
+                self._nbytes.move_to_end(name)
+            return True
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers)
+            return self._executor
+
+
+def _failed(future: Future) -> bool:
+    return future.done() and (future.cancelled() or future.exception() is not None)
@@ -0,0 +1,6 @@
+class NotBuiltError(RuntimeError, AttributeError):
+    """embedder used before build() or after release()
+
+    Also an AttributeError, so hasattr and getattr with a default
+    keep working on embedders that are not built.
+    """
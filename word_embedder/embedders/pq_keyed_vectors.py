@@ -0,0 +1,246 @@
+from os.path import abspath, isfile
+import warnings
+
+import numpy as np
+
+from .base import Embedder
+from .cache import (
+    is_fresh,
+    pack_vocab,
+    read_arrays,
+    source_stamp,
+    unpack_vocab,
+    write_arrays,
+)
+from .keyed_vectors import KeyedVectors
+from .kmeans import assign, kmeans
+from .oov_error import OOVError
+from .similarity import BLOCK_SIZE, top_k_from_blocks
+from .vocab_index import build_vocab_index
+
+
+class PQKeyedVectors(KeyedVectors):
+
+    """Product-quantized word vectors
+
+    Each vector is split into n_subspaces sub-vectors, and each sub-vector is
+    stored as the uint8 id of its nearest centroid in the codebook of its subspace,
+    e.g. 300 float32 dims -> 50 uint8 codes, 24x smaller than float32.
+    Vectors are reconstructed from the codebooks on lookup,
+    similarity search scores codes directly (asymmetric distance computation).
+
+    Codes and codebooks are stored at path. If path does not exist,
+    they are trained from source, an already available embedder, and saved there.
+    The file records the path and mtime of the source file and the training
+    parameters, a file trained from another source or with other parameters
+    is trained again.
+    """
+
+    _BUILT_ATTRS = (
+        '_embedding_size',
+        '_vocab_size',
+        '_vocab_list',
+        '_vocab_index',
+        '_codebooks',
+        '_codes',
+        '_norms',
+        '_reconstruction_error',
+    )
+
+    def __init__(
+            self,
+            path: str,
+            source: Embedder = None,
+            n_subspaces: int = 50,
+            n_centroids: int = 256,
+            n_iter: int = 20,
+            train_size: int = 100000,
+            index_type: str = 'hash',
+        ):
+        if n_centroids > 256:
+            raise ValueError(f"n_centroids [{n_centroids}] should fit in uint8 (<= 256)")
+        super().__init__(path=path, index_type=index_type, cache=False)
+        self._source = source
+        self._n_subspaces = n_subspaces
+        self._n_centroids = n_centroids
+        self._n_iter = n_iter
+        self._train_size = train_size
+
+    def build(self):
+        if not self._is_built:
+            meta, arrays = self._load_or_train()
+            self._codebooks = arrays['codebooks']
+            self._codes = arrays['codes']
+            self._vocab_list = unpack_vocab(arrays['vocab_offsets'], arrays['vocab_blob'])
+            self._vocab_size = self._codes.shape[0]
+            self._embedding_size = self._codebooks.shape[0] * self._codebooks.shape[2]
+            self._reconstruction_error = meta['reconstruction_error']
+            self._vocab_index = build_vocab_index(
+                self._vocab_list,
+                index_type=self._index_type,
+            )
+            self._norms = self._compute_norms()
+            self._is_built = True
+
+    def _load_or_train(self):
+        if isfile(self._path):
+            meta, arrays = read_arrays(self._path)
+            if not self._is_stale(meta):
+                return meta, arrays
+            if self._source is None:
+                raise ValueError(
+                    f"[{self._path}] is stale, give its source embedder to train it again",
+                )
+        elif self._source is None:
+            raise FileNotFoundError(
+                f"[{self._path}] does not exist and no source embedder is given to train from",
+            )
+        meta, arrays = self._train()
+        try:
+            write_arrays(self._path, arrays=arrays, meta=meta)
+        except OSError as e:
+            warnings.warn(f"fail to write [{self._path}]: {e}", RuntimeWarning)
+        return meta, arrays
+
+    def _source_path(self) -> str:
+        path = getattr(self._source, '_path', None)
+        return None if path is None else abspath(path)
+
+    def _train_options(self) -> dict:
+        """Options a trained file should have been written with to be reused"""
+        return {
+            'source_path': self._source_path(),
+            'n_subspaces': self._n_subspaces,
+            'n_centroids': self._n_centroids,
+        }
+
+    def _is_stale(self, meta: dict) -> bool:
+        """Whether the file at path no longer matches its source or the training options
+
+            Without a source, the file is only checked against the source file it records.
+
+        """
+        source_path = meta.get('source_path')
+        if source_path is not None and not is_fresh(meta, source_path):
+            return True
+        if self._source is None:
+            return False
+        return any(meta.get(key) != value for key, value in self._train_options().items())
+
+    def _compute_norms(self) -> np.ndarray:
+        # subspaces are orthogonal, so ||x||^2 is the sum of squared norms of centroids,
+        # gathered block by block to keep temporaries small next to the codes
+        centroid_norms = (self._codebooks ** 2).sum(axis=2)
+        subspaces = np.arange(self._codes.shape[1])
+        norms = np.empty(self._vocab_size, dtype=np.float32)
+        for start in range(0, self._vocab_size, BLOCK_SIZE):
+            end = min(start + BLOCK_SIZE, self._vocab_size)
+            norms[start: end] = centroid_norms[subspaces, self._codes[start: end]].sum(axis=1)
+        return np.sqrt(norms, out=norms)
+
+    @property
+    def reconstruction_error(self) -> float:
+        """Squared reconstruction error relative to squared norm, measured on training vectors"""
+        return self._reconstruction_error
+
+    def _train(self):
+        source = self._source
+        source.build()
+        n_vocab, n_dim = source.n_vocab, source.n_dim
+        if n_dim % self._n_subspaces != 0:
+            raise ValueError(
+                f"n_dim [{n_dim}] should be divisible by n_subspaces [{self._n_subspaces}]",
+            )
+
+        rand_state = np.random.RandomState(2018)
+        sample = np.sort(rand_state.choice(
+            n_vocab, min(self._train_size, n_vocab), replace=False))
+        train = np.asarray(source.lookup_many(sample), dtype=np.float32)
+
+        sub_dim = n_dim // self._n_subspaces
+        n_centroids = min(self._n_centroids, len(train))
+        codebooks = np.stack([
+            kmeans(
+                train[:, j * sub_dim: (j + 1) * sub_dim],
+                n_clusters=n_centroids,
+                n_iter=self._n_iter,
+            )
+            for j in range(self._n_subspaces)
+        ])
+
+        codes = np.empty((n_vocab, self._n_subspaces), dtype=np.uint8)
+        for start in range(0, n_vocab, BLOCK_SIZE):
+            end = min(start + BLOCK_SIZE, n_vocab)
+            codes[start: end] = _encode(source.lookup_many(np.arange(start, end)), codebooks)
+
+        residual = train - _decode(_encode(train, codebooks), codebooks)
+        reconstruction_error = float((residual ** 2).sum() / max((train ** 2).sum(), 1e-12))
+
+        vocab_offsets, vocab_blob = pack_vocab(list(source.vocab))
+        arrays = {
+            'codebooks': codebooks,
+            'codes': codes,
+            'vocab_offsets': vocab_offsets,
+            'vocab_blob': vocab_blob,
+        }
+        meta = dict(self._train_options(), reconstruction_error=reconstruction_error)
+        if meta['source_path'] is not None and isfile(meta['source_path']):
+            meta.update(source_stamp(meta['source_path']))
+        return meta, arrays
+
+    def _get_vector(self, index: int) -> np.ndarray:
+        if (index >= 0) and (index < self._vocab_size):
+            return _decode(self._codes[index: index + 1], self._codebooks)[0]
+        else:
+            raise OOVError
+
+    def lookup_many(self, indices: np.ndarray, out: np.ndarray = None) -> np.ndarray:
+        indices = np.asarray(indices, dtype=np.int64)
+        self._check_indices(indices)
+        vectors = _decode(self._codes[indices], self._codebooks)
+        if out is None:
+            return vectors
+        out[:] = vectors
+        return out
+
+    def _search(self, queries: np.ndarray, topk: int, block_size: int):
+        n_subspaces, _, sub_dim = self._codebooks.shape
+        # inner products of every query sub-vector with every centroid
+        tables = np.einsum(
+            'qmd,mkd->qmk',
+            queries.reshape(len(queries), n_subspaces, sub_dim),
+            self._codebooks,
+        )
+        norms = np.where(self._norms == 0, 1., self._norms)
+
+        def score_block(start, end):
+            # accumulate one subspace at a time, a (n_queries, block, n_subspaces)
+            # gather would take far more memory than the codes it scores
+            codes = np.asarray(self._codes[start: end])
+            scores = np.zeros((len(queries), end - start), dtype=np.float32)
+            for j in range(n_subspaces):
+                scores += tables[:, j].take(codes[:, j], axis=1)
+            return scores / norms[start: end]
+
+        return top_k_from_blocks(
+            score_block,
+            n_rows=self._vocab_size,
+            n_queries=len(queries),
+            topk=topk,
+            block_size=block_size,
+        )
+
+
+def _encode(vectors: np.ndarray, codebooks: np.ndarray) -> np.ndarray:
+    n_subspaces, _, sub_dim = codebooks.shape
+    vectors = np.asarray(vectors, dtype=np.float32)
+    codes = np.empty((len(vectors), n_subspaces), dtype=np.uint8)
+    for j in range(n_subspaces):
+        codes[:, j] = assign(vectors[:, j * sub_dim: (j + 1) * sub_dim], codebooks[j])
+    return codes
+
+
+def _decode(codes: np.ndarray, codebooks: np.ndarray) -> np.ndarray:
+    n_subspaces, _, sub_dim = codebooks.shape
+    vectors = codebooks[np.arange(n_subspaces), codes]  # (n, n_subspaces, sub_dim)
+    return vectors.reshape(len(codes), n_subspaces * sub_dim)
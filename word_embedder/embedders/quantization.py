@@ -0,0 +1,44 @@
+from typing import Tuple
+
+import numpy as np
+
+
+STORAGE_DTYPES = ('float32', 'float16', 'int8')
+
+INT8_MAX = 127
+
+
+def check_storage_dtype(storage_dtype: str) -> None:
+    if storage_dtype not in STORAGE_DTYPES:
+        raise ValueError(
+            f"storage_dtype should be one of {STORAGE_DTYPES}, got [{storage_dtype}]",
+        )
+
+
+def quantize(vectors: np.ndarray, storage_dtype: str = 'float32') -> Tuple[np.ndarray, np.ndarray]:
+    """Convert rows into storage_dtype, return (data, scales)
+
+        float32 and float16 are plain casts and scales is None.
+        int8 stores each row as round(row / scale) with a float32 scale
+        per row, scale = max(abs(row)) / 127, so the largest element is exact.
+
+    """
+    check_storage_dtype(storage_dtype)
+    if storage_dtype != 'int8':
+        return vectors.astype(storage_dtype, copy=False), None
+
+    vectors = np.asarray(vectors, dtype=np.float32)
+    scales = (np.abs(vectors).max(axis=1) / INT8_MAX).astype(np.float32)
+    safe_scales = np.where(scales == 0, 1., scales)[:, None]
+    data = np.rint(vectors / safe_scales).astype(np.int8)
+    return data, scales
+
+
+def dequantize(data: np.ndarray, scales: np.ndarray = None, out: np.ndarray = None) -> np.ndarray:
+    """Inverse of quantize, rows are returned as float32 (or written into out)"""
+    if out is None:
+        out = np.empty(data.shape, dtype=np.float32)
+    out[...] = data
+    if scales is not None:
+        out *= np.asarray(scales)[..., None]
+    return out
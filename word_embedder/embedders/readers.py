@@ -0,0 +1,204 @@
+from typing import BinaryIO, Iterator, List, Tuple
+
+import numpy as np
+from numpy.lib import NumpyVersion
+
+
+TEXT_CHUNK_SIZE = 1 << 22  # 4 MB
+TEXT_RANGE_SIZE = 1 << 24  # 16 MB, unit of work of parallel text parsing
+BIN_CHUNK_SIZE = 1 << 22  # 4 MB
+
+# np.loadtxt is implemented in C since numpy 1.23,
+# np.fromstring is the fastest bulk parser before that
+_FAST_LOADTXT = NumpyVersion(np.__version__) >= '1.23.0'
+
+
+def iter_line_blocks(
+        fin: BinaryIO,
+        chunk_size: int = TEXT_CHUNK_SIZE,
+    ) -> Iterator[bytes]:
+    """Read a binary stream in large chunks and yield blocks of complete lines"""
+    remainder = b''
+    while True:
+        chunk = fin.read(chunk_size)
+        if not chunk:
+            break
+        chunk = remainder + chunk
+        end = chunk.rfind(b'\n') + 1
+        remainder = chunk[end:]
+        if end > 0:
+            yield chunk[:end]
+    if remainder.strip():
+        yield remainder
+
+
+def parse_text_block(block: bytes, n_dim: int) -> Tuple[List[str], np.ndarray]:
+    """Parse a block of `word v_1 v_2 ... v_n` lines
+
+        Return words and a float32 matrix with shape (n_lines, n_dim),
+        all numbers of the block are converted in a single numpy call.
+
+    """
+    words = []
+    values = []
+    for line in block.split(b'\n'):
+        # only strip the right side, a leading space is an empty word
+        line = line.rstrip(b'\r\n ')
+        if not line:
+            continue
+        word, _, value = line.partition(b' ')
+        words.append(word.decode('utf8', errors='ignore'))
+        values.append(value)
+    if not words:
+        return words, np.empty((0, n_dim), dtype=np.float32)
+
+    if _FAST_LOADTXT:
+        vectors = np.loadtxt(
+            values,
+            dtype=np.float32,
+            encoding='latin1',
+            ndmin=2,
+        )
+    else:
+        vectors = np.fromstring(b' '.join(values), dtype=np.float32, sep=' ')
+    if vectors.size != len(words) * n_dim:
+        raise ValueError(
+            f"Expect {n_dim} numbers per line, got {vectors.size} numbers in {len(words)} lines",
+        )
+    return words, vectors.reshape(len(words), n_dim)
+
+
+def iter_bin_records(
+        fin: BinaryIO,
+        vocab_size: int,
+        n_dim: int,
+        with_vectors: bool = True,
+        chunk_size: int = BIN_CHUNK_SIZE,
+        start: int = None,
+    ) -> Iterator[Tuple[List[str], np.ndarray, List[int]]]:
+    """Scan `vocab_size` word2vec binary records `word<space><n_dim float32>`
+
+        fin should be positioned right after the header line.
+        Yield (words, vectors, vector offsets) for each chunk read,
+        vectors is a new float32 array with shape (len(words), n_dim),
+        or None if with_vectors is False.
+
+        start: offset of the current position of fin,
+            fin.tell() by default, give it for streams that cannot tell
+
+    """
+    binary_len = 4 * n_dim  # float32
+    chunk_size = max(chunk_size, binary_len + 1)
+
+    buf_start = fin.tell() if start is None else start  # file offset of buf[0]
+    buf = b''
+    idx = 0
+    while idx < vocab_size:
+        chunk = fin.read(chunk_size)
+        if not chunk:
+            raise EOFError(
+                "unexpected end of input; is count incorrect or file otherwise damaged?")
+        buf += chunk
+        view = memoryview(buf)
+
+        words = []
+        vector_starts = []
+        if with_vectors:
+            vectors = np.empty((len(buf) // (binary_len + 1), n_dim), dtype=np.float32)
+            # raw bytes of the destination, rows are filled by memcpy
+            dest = memoryview(vectors).cast('B')
+
+        # mixed text and binary: a word ends at the first space,
+        # then exactly binary_len bytes of vector follow
+        pos = 0
+        while idx < vocab_size:
+            space = buf.find(b' ', pos)
+            if space == -1 or len(buf) - space - 1 < binary_len:
+                break
+            # ignore newlines in front of words (some binary files have)
+            words.append(buf[pos: space].lstrip(b'\n').decode('utf8'))
+            pos = space + 1 + binary_len
+            if with_vectors:
+                row = len(vector_starts)
+                dest[row * binary_len: (row + 1) * binary_len] = view[space + 1: pos]
+            vector_starts.append(buf_start + space + 1)
+            idx += 1
+        view.release()
+
+        if words:
+            if with_vectors:
+                dest.release()
+            yield words, vectors[:len(words)] if with_vectors else None, vector_starts
+        buf_start += pos
+        buf = buf[pos:]
+
+
+def split_line_ranges(
+        fin: BinaryIO,
+        start: int,
+        end: int,
+        range_size: int = TEXT_RANGE_SIZE,
+    ) -> List[Tuple[int, int]]:
+    """Split bytes [start, end) of a text file into ranges of whole lines
+
+        Each range ends right after a newline (or at end),
+        so ranges can be parsed independently.
+
+    """
+    bounds = [start]
+    for pos in range(start + range_size, end, range_size):
+        if pos <= bounds[-1]:
+            continue
+        # a line starting exactly at pos is kept in the next range
+        fin.seek(pos - 1)
+        fin.readline()
+        bound = min(fin.tell(), end)
+        if bound > bounds[-1]:
+            bounds.append(bound)
+    if bounds[-1] < end:
+        bounds.append(end)
+    return list(zip(bounds[:-1], bounds[1:]))
+
+
+def parse_text_range(path: str, start: int, end: int, n_dim: int) -> Tuple[List[str], np.ndarray]:
+    """Parse the lines in bytes [start, end) of a text file, see split_line_ranges"""
+    with open(path, 'rb') as fin:
+        fin.seek(start)
+        return parse_text_block(fin.read(end - start), n_dim=n_dim)
+
+
+def read_bin_records(
+        fin: BinaryIO,
+        vocab_size: int,
+        n_dim: int,
+        word_vectors: np.ndarray = None,
+        byte_pos: np.ndarray = None,
+        chunk_size: int = BIN_CHUNK_SIZE,
+        start: int = None,
+    ) -> List[str]:
+    """Scan `vocab_size` word2vec binary records `word<space><n_dim float32>`
+
+        fin should be positioned right after the header line.
+        Vectors are copied into word_vectors and the file offset of each vector
+        is written into byte_pos if they are given.
+        Return the vocab list.
+
+        start: offset of the current position of fin, see iter_bin_records
+
+    """
+    vocab_list = []
+    for words, vectors, vector_starts in iter_bin_records(
+            fin,
+            vocab_size=vocab_size,
+            n_dim=n_dim,
+            with_vectors=word_vectors is not None,
+            chunk_size=chunk_size,
+            start=start,
+        ):
+        idx = len(vocab_list)
+        if word_vectors is not None:
+            word_vectors[idx: idx + len(words)] = vectors
+        if byte_pos is not None:
+            byte_pos[idx: idx + len(words)] = vector_starts
+        vocab_list.extend(words)
+    return vocab_list
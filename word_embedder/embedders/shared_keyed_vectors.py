@@ -0,0 +1,224 @@
+import sys
+import time
+from typing import Iterable
+import warnings
+
+try:
+    from multiprocessing import resource_tracker, shared_memory
+except ImportError:  # python < 3.8
+    resource_tracker = shared_memory = None
+
+from .cache import (
+    PackedVocab,
+    arrays_nbytes,
+    pack_vocab,
+    read_arrays_from_buffer,
+    write_arrays_to_buffer,
+)
+from .keyed_vectors import KeyedVectors
+from .vocab_index import PackedVocabIndex, build_packed_table
+
+
+# segments created by this process, they stay registered to its resource tracker
+_CREATED_NAMES = set()
+
+
+class SharedKeyedVectors(KeyedVectors):
+
+    """KeyedVectors shared by processes through a named shared memory segment
+
+    The first process to build it loads path like KeyedVectors does
+    (the .wecache included) and publishes the vectors and a packed
+    vocab index into the segment `name`. Other processes attach to
+    the segment by name, vectors and vocab are read in place, not copied.
+
+    Build it in the master process before forking workers
+    (e.g. gunicorn --preload), or let workers race: one of them creates
+    the segment and the others wait until it is completely written.
+    The creating process owns the segment and should unlink() it on shutdown.
+    """
+
+    def __init__(
+            self,
+            name: str,
+            path: str = None,
+            binary: bool = False,
+            cache: bool = True,
+            storage_dtype: str = 'float32',
+            max_vocab: int = None,
+            keep_words: Iterable[str] = None,
+            timeout: float = 60.,
+        ):
+        """
+        name: name of the shared memory segment
+        path: embedding file used to create the segment if it does not exist,
+            only attach to an existing segment if not given
+        timeout: max seconds to wait for another process to finish writing the segment
+        """
+        if shared_memory is None:
+            raise RuntimeError('SharedKeyedVectors requires python >= 3.8')
+        super().__init__(
+            path=path,
+            binary=binary,
+            cache=cache,
+            storage_dtype=storage_dtype,
+            max_vocab=max_vocab,
+            keep_words=keep_words,
+        )
+        self._name = name
+        self._timeout = timeout
+
+    def build(self, n_workers: int = 1):
+        if self._is_built:
+            return
+        self.__dict__.pop('_normed_vectors', None)
+        shm, owner = _attach(self._name, timeout=self._timeout), False
+        if shm is None:
+            if self._path is None:
+                raise FileNotFoundError(
+                    f"shared memory [{self._name}] does not exist "
+                    'and no path is given to create it',
+                )
+            shm, owner = self._create(n_workers=n_workers)
+        try:
+            meta, arrays = self._wait_until_written(shm)
+        except BaseException:
+            shm.close()
+            raise
+
+        self._shm = shm
+        self._owner = owner
+        self._embedding_size = meta['embedding_size']
+        self._storage_dtype = meta['storage_dtype']
+        self._word_vectors = arrays['word_vectors']
+        self._scales = arrays.get('scales')
+        self._vocab_size = len(self._word_vectors)
+        self._vocab_list = PackedVocab(arrays['vocab_offsets'], arrays['vocab_blob'])
+        self._vocab_index = PackedVocabIndex(
+            arrays['vocab_offsets'], arrays['vocab_blob'], arrays['vocab_table'])
+        self._is_built = True
+
+    def _create(self, n_workers: int = 1):
+        """Load vectors and write them into a new segment
+
+            Return (segment, True), or (segment, False) if another process
+            created the segment in the meantime.
+
+        """
+        embedding_size, _, vocab_list, word_vectors, scales = self._load_vectors(
+            n_workers=n_workers)
+        vocab_offsets, vocab_blob = pack_vocab(vocab_list)
+        arrays = {
+            'word_vectors': word_vectors,
+            'vocab_offsets': vocab_offsets,
+            'vocab_blob': vocab_blob,
+            'vocab_table': build_packed_table(vocab_offsets, vocab_blob),
+        }
+        if scales is not None:
+            arrays['scales'] = scales
+        meta = {'embedding_size': embedding_size, 'storage_dtype': self._storage_dtype}
+
+        try:
+            shm = shared_memory.SharedMemory(
+                name=self._name,
+                create=True,
+                size=arrays_nbytes(arrays, meta),
+            )
+        except FileExistsError:
+            return _attach(self._name, timeout=self._timeout), False
+        _CREATED_NAMES.add(shm._name)
+        write_arrays_to_buffer(shm.buf, arrays, meta)
+        return shm, True
+
+    def _wait_until_written(self, shm):
+        deadline = time.monotonic() + self._timeout
+        while True:
+            try:
+                return read_arrays_from_buffer(shm.buf, name=self._name)
+            except ValueError:
+                if time.monotonic() > deadline:
+                    raise TimeoutError(
+                        f"shared memory [{self._name}] is not written in {self._timeout} seconds",
+                    )
+                time.sleep(0.01)
+
+    @property
+    def name(self) -> str:
+        return self._name
+
+    def close(self) -> None:
+        """Detach from the segment, the segment itself stays for other processes"""
+        if not self._is_built:
+            return
+        self._vocab_index.release()
+        for attr in ['_word_vectors', '_scales', '_vocab_list', '_vocab_index', '_normed_vectors']:
+            self.__dict__.pop(attr, None)
+        self._is_built = False
+        try:
+            self._shm.close()
+        except BufferError:
+            warnings.warn(
+                f"vectors of shared memory [{self._name}] are still referenced, "
+                'the segment is detached when they are garbage collected',
+                RuntimeWarning,
+            )
+
+    def release(self) -> None:
+        self.close()
+
+    def unlink(self) -> None:
+        """Destroy the segment once every process has detached"""
+        shm = self.__dict__.get('_shm')
+        if shm is None:
+            shm = _attach(self._name)
+            if shm is None:
+                return
+            shm.close()
+        if not self.__dict__.get('_owner', False) and sys.version_info < (3, 13):
+            # SharedMemory.unlink unregisters the segment from the resource tracker
+            resource_tracker.register(shm._name, 'shared_memory')
+        shm.unlink()
+        _CREATED_NAMES.discard(shm._name)
+
+    def __enter__(self) -> 'SharedKeyedVectors':
+        self.build()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+def _attach(name: str, timeout: float = 1.):
+    """Attach to an existing segment, None if it does not exist
+
+        Only the creating process registers the segment to the resource tracker,
+        otherwise the tracker of an attaching process would destroy the segment
+        when that process exits.
+
+        A segment is empty between its creation and its resize by the creating
+        process, attaching to it is retried until timeout.
+
+    """
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            return _open(name)
+        except FileNotFoundError:
+            return None
+        except ValueError:  # cannot mmap an empty file
+            if time.monotonic() > deadline:
+                raise
+            time.sleep(0.001)
+
+
+def _open(name: str):
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name=name, track=False)
+    shm = shared_memory.SharedMemory(name=name)
+    # before python 3.13 attaching registers the segment too,
+    # the resource tracker would destroy it when this process exits.
+    # A segment created by this process keeps its registration,
+    # unlink() of the owner unregisters it.
+    if shm._name not in _CREATED_NAMES:
+        resource_tracker.unregister(shm._name, 'shared_memory')
+    return shm
@@ -0,0 +1,86 @@
+from typing import Callable, Tuple
+
+import numpy as np
+
+
+BLOCK_SIZE = 16384
+
+
+def normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    """L2-normalize rows into a float32 array, zero rows are kept as zeros"""
+    matrix = np.asarray(matrix, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.
+    return matrix / norms
+
+
+def normalize_blocks(
+        get_rows: Callable[[int, int], np.ndarray],
+        n_rows: int,
+        out: np.ndarray,
+        block_size: int = BLOCK_SIZE,
+    ) -> np.ndarray:
+    """Fill out with normalized rows, fetching get_rows(start, end) block by block"""
+    for start in range(0, n_rows, block_size):
+        end = min(start + block_size, n_rows)
+        out[start: end] = normalize_rows(get_rows(start, end))
+    return out
+
+
+def top_k_similar(
+        normed_vectors: np.ndarray,
+        queries: np.ndarray,
+        topk: int,
+        block_size: int = BLOCK_SIZE,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+    """Exact top-k cosine similarity search
+
+        normed_vectors: (n_vocab, n_dim) L2-normalized rows
+        queries: (n_queries, n_dim) L2-normalized rows
+
+        Scores are computed one block of rows at a time, so the extra memory is
+        bounded by block_size x n_queries whatever the vocabulary size.
+        Return indices and scores with shape (n_queries, topk), best first.
+
+    """
+    return top_k_from_blocks(
+        lambda start, end: queries @ np.asarray(normed_vectors[start: end]).T,
+        n_rows=normed_vectors.shape[0],
+        n_queries=queries.shape[0],
+        topk=topk,
+        block_size=block_size,
+    )
+
+
+def top_k_from_blocks(
+        score_block: Callable[[int, int], np.ndarray],
+        n_rows: int,
+        n_queries: int,
+        topk: int,
+        block_size: int = BLOCK_SIZE,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+    """Keep the topk scoring rows, score_block(start, end) returns (n_queries, end - start) scores
+    """
+    topk = min(topk, n_rows)
+    best_indices = np.empty((n_queries, 0), dtype=np.int64)
+    best_scores = np.empty((n_queries, 0), dtype=np.float32)
+
+    for start in range(0, n_rows, block_size):
+        end = min(start + block_size, n_rows)
+        scores = score_block(start, end)
+        indices = np.broadcast_to(np.arange(start, end), scores.shape)
+
+        # merge candidates of this block with the best ones so far
+        scores = np.concatenate([best_scores, scores], axis=1)
+        indices = np.concatenate([best_indices, indices], axis=1)
+        if scores.shape[1] > topk:
+            part = np.argpartition(-scores, topk - 1, axis=1)[:, :topk]
+            scores = np.take_along_axis(scores, part, axis=1)
+            indices = np.take_along_axis(indices, part, axis=1)
+        best_scores, best_indices = scores, indices
+
+    order = np.argsort(-best_scores, axis=1, kind='stable')
+    return (
+        np.take_along_axis(best_indices, order, axis=1),
+        np.take_along_axis(best_scores, order, axis=1),
+    )
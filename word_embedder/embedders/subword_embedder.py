@@ -0,0 +1,125 @@
+from typing import List, Tuple
+
+import numpy as np
+
+from .base import Embedder
+from .oov_error import OOVError
+from .subwords import FastTextNgrams, VocabNgrams
+
+
+class SubwordEmbedder(Embedder):
+
+    """Compose vectors of OOV words from their character n-grams
+
+    In-vocabulary words are looked up from the wrapped embedder.
+    An OOV word is the mean of vectors of its n-grams, which come from
+    the subword buckets of a fastText .bin model if fasttext_path is given,
+    otherwise from n-grams that are words of the wrapped embedder.
+    Only words without any known n-gram are still OOV.
+    """
+
+    _BUILT_ATTRS = ('_ngrams',)
+
+    def __init__(
+            self,
+            embedder: Embedder,
+            fasttext_path: str = None,
+            minn: int = 1,
+            maxn: int = 3,
+        ):
+        """
+        fasttext_path: fastText .bin model trained with subwords,
+            its minn and maxn are used
+        minn, maxn: lengths of n-grams looked up in the vocabulary
+            if fasttext_path is not given
+        """
+        self._embedder = embedder
+        self._fasttext_path = fasttext_path
+        self._minn = minn
+        self._maxn = maxn
+        self._is_built = False
+
+    def build(self):
+        if not self._is_built:
+            self._embedder.build()
+            if self._fasttext_path is not None:
+                self._ngrams = FastTextNgrams(self._fasttext_path)
+                if self._ngrams.n_dim != self._embedder.n_dim:
+                    raise ValueError(
+                        f"fastText model has {self._ngrams.n_dim} dimensions, "
+                        f"the embedder has {self._embedder.n_dim}",
+                    )
+            else:
+                self._ngrams = VocabNgrams(self._embedder, minn=self._minn, maxn=self._maxn)
+            self._is_built = True
+
+    def __getitem__(self, key) -> np.ndarray:
+        """Get a word vector
+
+            If key is an int, return vector by index.
+            If key is a string, return vector by word,
+            composed from its n-grams if it is OOV.
+
+        """
+        if not isinstance(key, str):
+            return self._embedder[key]
+        index = self.get_index(key)
+        if index >= 0:
+            return self._embedder[index]
+        vectors, found_mask = self.compose([key])
+        if not found_mask[0]:
+            raise OOVError
+        return vectors[0]
+
+    @property
+    def n_vocab(self) -> int:
+        return self._embedder.n_vocab
+
+    @property
+    def n_dim(self) -> int:
+        return self._embedder.n_dim
+
+    @property
+    def vocab(self) -> List[str]:
+        return self._embedder.vocab
+
+    def get_index(self, word: str) -> int:
+        return self._embedder.get_index(word)
+
+    def get_indices(self, words: List[str]) -> np.ndarray:
+        return self._embedder.get_indices(words)
+
+    def get_word(self, index: int) -> str:
+        return self._embedder.get_word(index)
+
+    def lookup_many(self, indices: np.ndarray, out: np.ndarray = None) -> np.ndarray:
+        return self._embedder.lookup_many(indices, out=out)
+
+    def get_vectors_batch(
+            self,
+            keys,
+            out: np.ndarray = None,
+        ) -> Tuple[np.ndarray, np.ndarray]:
+        """Get vectors of a batch of words or indices
+
+            OOV words are composed from their n-grams in a single batch,
+            oov_mask is True only for words without any known n-gram.
+
+        """
+        if not isinstance(keys, np.ndarray):
+            keys = list(keys)
+        out, oov_mask = self._embedder.get_vectors_batch(keys, out=out)
+        if oov_mask.any() and all(isinstance(key, str) for key in keys):
+            oov_rows = np.flatnonzero(oov_mask)
+            vectors, found_mask = self.compose([keys[row] for row in oov_rows])
+            out[oov_rows[found_mask]] = vectors[found_mask]
+            oov_mask[oov_rows[found_mask]] = False
+        return out, oov_mask
+
+    def compose(self, words: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+        """Compose vectors of words from their n-grams, see NgramTable.compose"""
+        return self._ngrams.compose(words)
+
+    def release(self) -> None:
+        super().release()
+        self._embedder.release()
@@ -0,0 +1,227 @@
+"""Character n-grams of out-of-vocabulary words
+
+A vector of an OOV word is composed as the mean of vectors of its
+character n-grams, taken either from the bucket matrix of a fastText
+.bin model (trained subword vectors) or from n-grams that happen to be
+words of the embedder themselves (e.g. single Chinese characters).
+"""
+from abc import ABC, abstractmethod, abstractproperty
+from functools import lru_cache
+import struct
+from typing import BinaryIO, List, Tuple
+
+import numpy as np
+
+from .base import Embedder
+
+
+FASTTEXT_MAGIC = 793712314
+FASTTEXT_VERSION = 12
+NGRAM_CACHE_SIZE = 1 << 18
+
+_FNV_OFFSET = 2166136261
+_FNV_PRIME = 16777619
+
+
+def char_ngrams(
+        word: str,
+        minn: int,
+        maxn: int,
+        bow: str = '',
+        eow: str = '',
+    ) -> List[str]:
+    """Return n-grams of word with minn <= n <= maxn characters
+
+        bow and eow are added around word first, fastText uses '<' and '>',
+        and then single boundary characters are not n-grams.
+
+    """
+    word = bow + word + eow
+    ngrams = []
+    for start in range(len(word)):
+        for n in range(minn, min(maxn, len(word) - start) + 1):
+            if n == 1 and ((bow and start == 0) or (eow and start == len(word) - 1)):
+                continue
+            ngrams.append(word[start:start + n])
+    return ngrams
+
+
+def fasttext_hash(data: bytes) -> int:
+    """32-bit FNV-1a hash as implemented by fastText
+
+        fastText xors bytes as signed chars, so bytes >= 0x80 (non-ASCII)
+        are sign-extended and hash differently from the reference FNV-1a.
+
+    """
+    h = _FNV_OFFSET
+    for byte in data:
+        if byte >= 0x80:
+            byte |= 0xffffff00
+        h = ((h ^ byte) * _FNV_PRIME) & 0xffffffff
+    return h
+
+
+class NgramTable(ABC):
+
+    """Map OOV words to rows of an n-gram matrix and compose their vectors"""
+
+    @abstractproperty
+    def n_dim(self) -> int:
+        raise NotImplementedError
+
+    @abstractmethod
+    def ngram_ids(self, word: str) -> List[int]:
+        """Return rows of n-grams of word, may be empty"""
+        raise NotImplementedError
+
+    @abstractmethod
+    def lookup_many(self, ids: np.ndarray) -> np.ndarray:
+        """Return float32 rows of n-gram ids"""
+        raise NotImplementedError
+
+    def compose(self, words: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+        """Compose vectors of a batch of words
+
+            Rows of every n-gram of the batch are fetched in a single lookup.
+            Return (vectors, found_mask), rows of words without any known
+            n-gram are zeros and their found_mask is False.
+
+        """
+        ids_per_word = [self.ngram_ids(word) for word in words]
+        counts = np.fromiter(map(len, ids_per_word), dtype=np.int64, count=len(words))
+        vectors = np.zeros((len(words), self.n_dim), dtype=np.float32)
+        found_mask = counts > 0
+        if not found_mask.any():
+            return vectors, found_mask
+
+        flat_ids = np.fromiter(
+            (ngram_id for ids in ids_per_word for ngram_id in ids),
+            dtype=np.int64,
+            count=int(counts.sum()),
+        )
+        unique_ids, inverse = np.unique(flat_ids, return_inverse=True)
+        rows = self.lookup_many(unique_ids)[inverse.reshape(-1)]
+        starts = np.cumsum(counts[found_mask]) - counts[found_mask]
+        vectors[found_mask] = np.add.reduceat(rows, starts, axis=0)
+        vectors[found_mask] /= counts[found_mask, None]
+        return vectors, found_mask
+
+
+class FastTextNgrams(NgramTable):
+
+    """Subword (bucket) vectors of a fastText .bin model
+
+    The input matrix is memory-mapped, only the n-gram rows used
+    by OOV words are read from disk.
+    """
+
+    def __init__(self, path: str):
+        with open(path, 'rb') as fin:
+            args, n_words, pruned, offset = _read_fasttext_header(fin)
+        n_rows, n_dim = np.memmap(path, dtype=np.int64, mode='r', offset=offset, shape=(2,))
+        self.path = path
+        self.minn = args['minn']
+        self.maxn = args['maxn']
+        self.bucket = args['bucket']
+        self._n_words = n_words
+        self._pruned = pruned
+        self._matrix = np.memmap(
+            path,
+            dtype=np.float32,
+            mode='r',
+            offset=offset + 16,
+            shape=(int(n_rows), int(n_dim)),
+        )
+        self._ngram_id = lru_cache(maxsize=NGRAM_CACHE_SIZE)(self._ngram_id)
+
+    @property
+    def n_dim(self) -> int:
+        return self._matrix.shape[1]
+
+    def ngram_ids(self, word: str) -> List[int]:
+        if self.maxn <= 0:
+            return []
+        ids = map(self._ngram_id, char_ngrams(word, self.minn, self.maxn, bow='<', eow='>'))
+        return [ngram_id for ngram_id in ids if ngram_id >= 0]
+
+    def _ngram_id(self, ngram: str) -> int:
+        bucket_id = fasttext_hash(ngram.encode('utf8')) % self.bucket
+        if self._pruned is not None:
+            bucket_id = self._pruned.get(bucket_id, -1)
+            if bucket_id < 0:
+                return -1
+        return self._n_words + bucket_id
+
+    def lookup_many(self, ids: np.ndarray) -> np.ndarray:
+        return np.asarray(self._matrix[ids], dtype=np.float32)
+
+
+class VocabNgrams(NgramTable):
+
+    """n-grams of OOV words that are words of the embedder
+
+    e.g. with minn=1, an unknown Chinese word is the mean of
+    vectors of its characters found in the vocabulary.
+    """
+
+    def __init__(self, embedder: Embedder, minn: int = 1, maxn: int = 3):
+        self.embedder = embedder
+        self.minn = minn
+        self.maxn = maxn
+
+    @property
+    def n_dim(self) -> int:
+        return self.embedder.n_dim
+
+    def ngram_ids(self, word: str) -> List[int]:
+        ngrams = char_ngrams(word, self.minn, self.maxn)
+        # the word itself is OOV
+        ngrams = [ngram for ngram in ngrams if len(ngram) < len(word)]
+        indices = self.embedder.get_indices(ngrams)
+        return indices[indices >= 0].tolist()
+
+    def lookup_many(self, ids: np.ndarray) -> np.ndarray:
+        return self.embedder.lookup_many(ids)
+
+
+def _read_fasttext_header(fin: BinaryIO):
+    """Return (args, n_words, pruned bucket ids or None, offset of the input matrix)"""
+    magic, version = struct.unpack('<ii', fin.read(8))
+    if magic != FASTTEXT_MAGIC:
+        raise ValueError(f"[{fin.name}] is not a fastText .bin model")
+    if version > FASTTEXT_VERSION:
+        raise ValueError(f"fastText model version {version} is not supported")
+    names = [
+        'dim', 'ws', 'epoch', 'min_count', 'neg', 'word_ngrams', 'loss',
+        'model', 'bucket', 'minn', 'maxn', 'lr_update_rate',
+    ]
+    args = dict(zip(names, struct.unpack('<12i', fin.read(48))))
+    fin.read(8)  # sampling threshold t
+
+    n_entries, n_words, _ = struct.unpack('<3i', fin.read(12))
+    _, n_pruned = struct.unpack('<2q', fin.read(16))
+    _skip_entries(fin, n_entries)
+    pruned = None  # -1 if not pruned
+    if n_pruned >= 0:
+        pairs = np.frombuffer(fin.read(8 * n_pruned), dtype='<i4').reshape(-1, 2)
+        pruned = dict(pairs.tolist())
+    if fin.read(1) != b'\x00':
+        raise ValueError('quantized fastText models (.ftz) are not supported')
+    return args, n_words, pruned, fin.tell()
+
+
+def _skip_entries(fin: BinaryIO, n_entries: int, chunk_size: int = 1 << 20) -> None:
+    """Skip dictionary entries: word + b'\\0', int64 count, int8 type"""
+    buffer = b''
+    pos = 0
+    for _ in range(n_entries):
+        end = buffer.find(b'\x00', pos)
+        while end < 0 or end + 10 > len(buffer):
+            chunk = fin.read(chunk_size)
+            if not chunk:
+                raise ValueError('truncated fastText dictionary')
+            buffer = buffer[pos:] + chunk
+            pos = 0
+            end = buffer.find(b'\x00')
+        pos = end + 10
+    fin.seek(pos - len(buffer), 1)
@@ -1,5 +1,7 @@
 from os.path import abspath, dirname
 
+import numpy as np
+
 from ..oov_error import OOVError
 
 
@@ -35,7 +37,8 @@ class KeyedVectorsTestTemplate:
 
     def test_correctly_create_instance(self):
         self.assertEqual(
-            set(['_path', '_binary', '_is_built']),
+            set(['_path', '_binary', '_index_type', '_cache', '_storage_dtype',
+                 '_max_vocab', '_keep_words', '_progress', '_is_built']),
             set(self.embedder.__dict__.keys()),
         )
         # initialize an embedder should be not built
@@ -45,9 +48,10 @@ class KeyedVectorsTestTemplate:
         self.embedder.build()
         self.assertTrue(self.embedder._is_built)
         self.assertEqual(
-            set(['_path', '_binary', '_is_built',
+            set(['_path', '_binary', '_index_type', '_cache', '_storage_dtype',
+                 '_max_vocab', '_keep_words', '_progress', '_is_built',
                  '_embedding_size', '_vocab_size',
-                 '_word_vectors', '_vocab_list']),
+                 '_word_vectors', '_scales', '_vocab_list', '_vocab_index']),
             set(self.embedder.__dict__.keys()),
         )
         self.assertEqual(
@@ -59,6 +63,22 @@ class KeyedVectorsTestTemplate:
             self.embedder._word_vectors.tolist(),
         )
 
+    def test_release(self):
+        self.assertEqual(0, self.embedder.nbytes)
+        self.embedder.build()
+        self.assertGreater(self.embedder.nbytes, 0)
+        self.embedder.release()
+        self.assertFalse(self.embedder._is_built)
+        self.assertEqual(0, self.embedder.nbytes)
+        self.assertFalse(
+            {'_word_vectors', '_vocab_list', '_vocab_index'} & set(self.embedder.__dict__),
+        )
+        self.embedder.build()
+        self.assertEqual(
+            self.vectors[2].tolist(),
+            self.embedder[self.words[2]].tolist(),
+        )
+
     def test_vocab_size(self):
         self.embedder.build()
         self.assertEqual(len(self.words), self.embedder.n_vocab)
@@ -131,3 +151,118 @@ class KeyedVectorsTestTemplate:
         with self.assertRaises(TypeError):
             self.embedder[12.3]
             self.embedder[[123]]
+
+    def test_get_indices(self):
+        self.embedder.build()
+        indices = self.embedder.get_indices(self.words + ['haha'])
+        self.assertEqual(
+            list(range(len(self.words))) + [-1],
+            indices.tolist(),
+        )
+
+    def test_lookup_many(self):
+        self.embedder.build()
+        indices = np.array([4, 0, 2, 0])
+        self.assertEqual(
+            self.vectors[indices].tolist(),
+            self.embedder.lookup_many(indices).tolist(),
+        )
+
+    def test_lookup_many_into_out(self):
+        self.embedder.build()
+        out = np.zeros((2, self.vectors.shape[1]), dtype=np.float32)
+        output = self.embedder.lookup_many([3, 1], out=out)
+        self.assertIs(out, output)
+        self.assertEqual(self.vectors[[3, 1]].tolist(), out.tolist())
+
+    def test_lookup_many_oov(self):
+        self.embedder.build()
+        with self.assertRaises(OOVError):
+            self.embedder.lookup_many([0, 100])
+
+    def test_get_vectors_batch_string(self):
+        self.embedder.build()
+        vectors, oov_mask = self.embedder.get_vectors_batch(
+            [self.words[2], 'kerker', self.words[0]])
+        self.assertEqual([False, True, False], oov_mask.tolist())
+        self.assertEqual(np.float32, vectors.dtype)
+        self.assertEqual(
+            [
+                self.vectors[2].tolist(),
+                [0.] * self.vectors.shape[1],
+                self.vectors[0].tolist(),
+            ],
+            vectors.tolist(),
+        )
+
+    def test_get_vectors_batch_int(self):
+        self.embedder.build()
+        for keys in [[1, 100, 4, -3], np.array([1, 100, 4, -3])]:
+            with self.subTest(keys=keys):
+                vectors, oov_mask = self.embedder.get_vectors_batch(keys)
+                self.assertEqual([False, True, False, True], oov_mask.tolist())
+                self.assertEqual(self.vectors[1].tolist(), vectors[0].tolist())
+                self.assertEqual(self.vectors[4].tolist(), vectors[2].tolist())
+                self.assertFalse(vectors[[1, 3]].any())
+
+    def test_get_vectors_batch_all_oov(self):
+        self.embedder.build()
+        vectors, oov_mask = self.embedder.get_vectors_batch(['kerker', 'haha'])
+        self.assertTrue(oov_mask.all())
+        self.assertEqual((2, self.vectors.shape[1]), vectors.shape)
+        self.assertFalse(vectors.any())
+
+    def test_get_vectors_batch_wrong_type(self):
+        self.embedder.build()
+        with self.assertRaises(TypeError):
+            self.embedder.get_vectors_batch([self.words[0], 1])
+
+    def _assert_most_similar(self, query_vector, result, topk, exclude=-1):
+        normed = self.vectors / np.linalg.norm(self.vectors, axis=1, keepdims=True)
+        scores = normed @ (query_vector / np.linalg.norm(query_vector))
+        expected = sorted(
+            [score for i, score in enumerate(scores.tolist()) if i != exclude],
+            reverse=True,
+        )[:topk]
+        self.assertEqual(len(expected), len(result))
+        for (word, score), expected_score in zip(result, expected):
+            self.assertNotEqual(exclude, self.words.index(word))
+            self.assertAlmostEqual(expected_score, score, places=5)
+            self.assertAlmostEqual(scores[self.words.index(word)], score, places=5)
+
+    def test_similarity(self):
+        self.embedder.build()
+        a, b = self.vectors[0], self.vectors[3]
+        expected = a @ b / np.linalg.norm(a) / np.linalg.norm(b)
+        self.assertAlmostEqual(
+            expected, self.embedder.similarity(self.words[0], self.words[3]), places=5)
+        self.assertAlmostEqual(expected, self.embedder.similarity(0, b), places=5)
+        self.assertAlmostEqual(
+            1., self.embedder.similarity(self.words[1], self.words[1]), places=5)
+
+    def test_most_similar_word(self):
+        self.embedder.build()
+        result = self.embedder.most_similar(self.words[1], topk=3)
+        self._assert_most_similar(self.vectors[1], result, topk=3, exclude=1)
+
+    def test_most_similar_vector(self):
+        self.embedder.build()
+        vector = np.array([1., 0., -1.], dtype=np.float32)
+        result = self.embedder.most_similar(vector, topk=10)
+        self._assert_most_similar(vector, result, topk=10)
+
+    def test_most_similar_batch(self):
+        self.embedder.build()
+        result = self.embedder.most_similar(
+            [self.words[0], 4, self.vectors[2]], topk=2, block_size=2)
+        self.assertEqual(3, len(result))
+        self._assert_most_similar(self.vectors[0], result[0], topk=2, exclude=0)
+        self._assert_most_similar(self.vectors[4], result[1], topk=2, exclude=4)
+        self._assert_most_similar(self.vectors[2], result[2], topk=2)
+
+    def test_most_similar_oov(self):
+        self.embedder.build()
+        with self.assertRaises(OOVError):
+            self.embedder.most_similar('kerker')
+        with self.assertRaises(ValueError):
+            self.embedder.most_similar(np.ones(100))
@@ -0,0 +1,168 @@
+import asyncio
+import gc
+from unittest import TestCase
+from unittest.mock import patch
+from os.path import abspath, dirname, join
+import warnings
+import weakref
+
+import numpy as np
+
+from ..aio import LookupBatcher
+from ..keyed_vectors import KeyedVectors
+from ..library import Library
+from ..oov_error import OOVError
+
+
+ROOT_DIR = dirname(abspath(__file__))
+
+
+class AioTestCase(TestCase):
+
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        self.embedder = KeyedVectors(
+            path=join(ROOT_DIR, 'data/example.vec'),
+            cache=False,
+        )
+        self.words = ['薄餡', '隼興', 'gb', 'en', 'Alvin']
+        self.vectors = np.array(
+            [
+                [0.1, 0.2, 0.3],
+                [0.4, 0.5, 0.6],
+                [0.7, 0.8, 0.9],
+                [0.11, 0.12, 0.13],
+                [0.14, 0.15, 0.16],
+            ],
+        ).astype(np.float32)
+
+    def tearDown(self):
+        self.loop.close()
+        asyncio.set_event_loop(None)
+
+    def run_async(self, coro):
+        return self.loop.run_until_complete(coro)
+
+    def test_aget(self):
+        for i, word in enumerate(self.words):
+            with self.subTest(i=i):
+                self.assertEqual(
+                    self.vectors[i].tolist(),
+                    self.run_async(self.embedder.aget(word)).tolist(),
+                )
+                self.assertEqual(
+                    self.vectors[i].tolist(),
+                    self.run_async(self.embedder.aget(i)).tolist(),
+                )
+
+    def test_aget_oov(self):
+        with self.assertRaises(OOVError):
+            self.run_async(self.embedder.aget('隼興興'))
+        with self.assertRaises(OOVError):
+            self.run_async(self.embedder.aget(10))
+
+    def test_aget_many(self):
+        vectors, oov_mask = self.run_async(self.embedder.aget_many(['gb', 'oov', '薄餡']))
+        self.assertEqual([False, True, False], oov_mask.tolist())
+        self.assertEqual(self.vectors[2].tolist(), vectors[0].tolist())
+        self.assertEqual([0., 0., 0.], vectors[1].tolist())
+        self.assertEqual(self.vectors[0].tolist(), vectors[2].tolist())
+
+    def test_concurrent_lookups_are_batched(self):
+        self.embedder.build()
+        with patch.object(
+                self.embedder,
+                'lookup_many',
+                wraps=self.embedder.lookup_many,
+            ) as lookup_many:
+            results = self.run_async(asyncio.gather(
+                *[self.embedder.aget(word) for word in self.words + ['gb', 'gb']]))
+        lookup_many.assert_called_once()
+        self.assertEqual([0, 1, 2, 3, 4], lookup_many.call_args[0][0].tolist())
+        self.assertEqual(
+            self.vectors.tolist() + [self.vectors[2].tolist()] * 2,
+            [vector.tolist() for vector in results],
+        )
+
+    def test_max_batch(self):
+        self.embedder.build()
+        batcher = LookupBatcher(self.embedder, max_batch=2, max_delay=10.)
+        with patch.object(
+                self.embedder,
+                'lookup_many',
+                wraps=self.embedder.lookup_many,
+            ) as lookup_many:
+            results = self.run_async(batcher.lookup_many([0, 1, 2, 3]))
+        self.assertEqual(
+            [[0, 1], [2, 3]],
+            [call[0][0].tolist() for call in lookup_many.call_args_list],
+        )
+        self.assertEqual(self.vectors[:4].tolist(), [vector.tolist() for vector in results])
+
+    def test_lookup_error(self):
+        self.embedder.build()
+        with patch.object(self.embedder, 'lookup_many', side_effect=OSError):
+            with self.assertRaises(OSError):
+                self.run_async(self.embedder.aget('gb'))
+        self.assertEqual(
+            self.vectors[2].tolist(),
+            self.run_async(self.embedder.aget('gb')).tolist(),
+        )
+
+    def test_cancel_one_of_coalesced_lookups(self):
+        self.embedder.build()
+
+        async def main():
+            first = self.loop.create_task(self.embedder.aget('薄餡'))
+            second = self.loop.create_task(self.embedder.aget('薄餡'))
+            await asyncio.sleep(0)  # both wait on the same pending lookup
+            first.cancel()
+            return await second
+
+        self.assertEqual(self.vectors[0].tolist(), self.run_async(main()).tolist())
+
+    def test_lookups_on_successive_loops(self):
+        with warnings.catch_warnings():
+            warnings.simplefilter('error', DeprecationWarning)
+            for _ in range(2):
+                self.assertEqual(
+                    self.vectors[2].tolist(),
+                    asyncio.run(self.embedder.aget('gb')).tolist(),
+                )
+
+    def test_embedder_is_garbage_collected(self):
+        self.run_async(self.embedder.aget('gb'))
+        ref = weakref.ref(self.embedder)
+        del self.embedder
+        gc.collect()
+        self.assertIsNone(ref())
+
+
+class LibraryAioTestCase(TestCase):
+
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        self.embedder = KeyedVectors(
+            path=join(ROOT_DIR, 'data/example.vec'),
+            cache=False,
+        )
+        self.library = Library()
+        self.library.register('example', self.embedder)
+
+    def tearDown(self):
+        self.loop.close()
+        asyncio.set_event_loop(None)
+
+    def test_aget(self):
+        with patch.object(self.embedder, 'build', wraps=self.embedder.build) as build:
+            embedders = self.loop.run_until_complete(asyncio.gather(
+                *[self.library.aget('example') for _ in range(3)]))
+        build.assert_called_once()
+        self.assertTrue(self.embedder._is_built)
+        self.assertEqual([self.embedder] * 3, embedders)
+
+    def test_aget_not_found(self):
+        with self.assertRaises(KeyError):
+            self.loop.run_until_complete(self.library.aget('not-found'))
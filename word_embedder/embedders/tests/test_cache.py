@@ -0,0 +1,127 @@
+from unittest import TestCase
+from os.path import join
+import os
+import shutil
+import tempfile
+
+import numpy as np
+
+from ..cache import (
+    arrays_nbytes,
+    is_fresh,
+    pack_vocab,
+    PackedVocab,
+    read_arrays,
+    read_arrays_from_buffer,
+    source_stamp,
+    unpack_vocab,
+    write_arrays,
+    write_arrays_to_buffer,
+)
+
+
+class ArraysTestCase(TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.path = join(self.tmp_dir, 'arrays.wecache')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_write_read(self):
+        arrays = {
+            'matrix': np.arange(15, dtype=np.float32).reshape(5, 3),
+            'offsets': np.array([0, 3, 7], dtype=np.uint64),
+            'empty': np.empty((0, 3), dtype=np.float16),
+        }
+        write_arrays(self.path, arrays, meta={'a': 1})
+        meta, output = read_arrays(self.path)
+        self.assertEqual({'a': 1}, meta)
+        self.assertEqual(set(arrays), set(output))
+        for name, array in arrays.items():
+            with self.subTest(name=name):
+                self.assertEqual(array.dtype, output[name].dtype)
+                np.testing.assert_array_equal(array, output[name])
+                self.assertEqual(
+                    0, output[name].__array_interface__['data'][0] % 64)
+
+    def test_read_not_cache_file(self):
+        with open(self.path, 'wb') as fout:
+            fout.write(b'5 3\n')
+        with self.assertRaises(ValueError):
+            read_arrays(self.path)
+
+    def test_read_truncated(self):
+        write_arrays(self.path, {'matrix': np.ones((100, 3))})
+        with open(self.path, 'r+b') as fout:
+            fout.truncate(os.path.getsize(self.path) - 100)
+        with self.assertRaises(ValueError):
+            read_arrays(self.path)
+
+    def test_write_read_buffer(self):
+        arrays = {
+            'matrix': np.arange(15, dtype=np.float32).reshape(5, 3),
+            'offsets': np.array([0, 3, 7], dtype=np.uint64),
+        }
+        buffer = bytearray(arrays_nbytes(arrays, meta={'a': 1}))
+        write_arrays_to_buffer(buffer, arrays, meta={'a': 1})
+        write_arrays(self.path, arrays, meta={'a': 1})
+        with open(self.path, 'rb') as fin:
+            self.assertEqual(fin.read(), bytes(buffer))
+
+        meta, output = read_arrays_from_buffer(buffer)
+        self.assertEqual({'a': 1}, meta)
+        np.testing.assert_array_equal(arrays['matrix'], output['matrix'])
+        # views, not copies
+        output['matrix'][0, 0] = 100.
+        self.assertEqual(100., read_arrays_from_buffer(buffer)[1]['matrix'][0, 0])
+
+    def test_read_buffer_not_written(self):
+        with self.assertRaises(ValueError):
+            read_arrays_from_buffer(bytearray(128))
+
+    def test_is_fresh(self):
+        source_path = join(self.tmp_dir, 'source.vec')
+        with open(source_path, 'w') as fout:
+            fout.write('1 1\na 1\n')
+        meta = source_stamp(source_path)
+        self.assertTrue(is_fresh(meta, source_path))
+        with open(source_path, 'a') as fout:
+            fout.write('b 2\n')
+        self.assertFalse(is_fresh(meta, source_path))
+        os.remove(source_path)
+        self.assertTrue(is_fresh(meta, source_path))
+
+
+class VocabTestCase(TestCase):
+
+    def test_pack_unpack(self):
+        for vocab_list in [
+                ['薄餡', '隼興', 'gb', 'en', 'Alvin'],
+                ['a\nb', '', 'c'],
+                [],
+        ]:
+            with self.subTest(vocab_list=vocab_list):
+                offsets, blob = pack_vocab(vocab_list)
+                self.assertEqual(len(vocab_list) + 1, len(offsets))
+                self.assertEqual(np.uint8, blob.dtype)
+                self.assertEqual(vocab_list, unpack_vocab(offsets, blob))
+
+    def test_offsets(self):
+        offsets, blob = pack_vocab(['薄餡', 'gb'])
+        self.assertEqual([0, 7, 10], offsets.tolist())
+        self.assertEqual('gb', blob[7: 9].tobytes().decode('utf8'))
+
+    def test_packed_vocab(self):
+        vocab_list = ['薄餡', 'a\nb', '', 'gb']
+        vocab = PackedVocab(*pack_vocab(vocab_list))
+        self.assertEqual(4, len(vocab))
+        self.assertEqual('gb', vocab[3])
+        self.assertEqual('gb', vocab[-1])
+        self.assertEqual(['a\nb', ''], vocab[1:3])
+        self.assertEqual(vocab_list, list(vocab))
+        self.assertEqual(vocab_list, vocab)
+        self.assertNotEqual(vocab_list[:3], vocab)
+        with self.assertRaises(IndexError):
+            vocab[4]
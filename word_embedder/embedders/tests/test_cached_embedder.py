@@ -0,0 +1,147 @@
+from unittest import TestCase
+from os.path import abspath, dirname, join
+
+import numpy as np
+
+from ..cached_embedder import CachedEmbedder
+from ..keyed_vectors_light import KeyedVectorsLight
+from ..oov_error import OOVError
+
+
+ROOT_DIR = dirname(abspath(__file__))
+
+
+class CachedEmbedderTestCase(TestCase):
+
+    def setUp(self):
+        self.inner = KeyedVectorsLight(
+            path=join(ROOT_DIR, 'data/example.vec'),
+            cache=False,
+        )
+        self.embedder = CachedEmbedder(self.inner, capacity=2)
+        self.words = ['薄餡', '隼興', 'gb', 'en', 'Alvin']
+        self.vectors = np.array(
+            [
+                [0.1, 0.2, 0.3],
+                [0.4, 0.5, 0.6],
+                [0.7, 0.8, 0.9],
+                [0.11, 0.12, 0.13],
+                [0.14, 0.15, 0.16],
+            ],
+        ).astype(np.float32)
+
+    def test_wrong_policy(self):
+        with self.assertRaises(ValueError):
+            CachedEmbedder(self.inner, policy='fifo')
+
+    def test_build(self):
+        self.embedder.build()
+        self.assertTrue(self.inner._is_built)
+        self.assertEqual((2, 3), self.embedder._slab.shape)
+        self.assertEqual(np.float32, self.embedder._slab.dtype)
+        self.assertEqual(self.words, self.embedder.vocab)
+        self.assertEqual(5, self.embedder.n_vocab)
+        self.assertEqual(3, self.embedder.n_dim)
+
+    def test_capacity_bytes(self):
+        embedder = CachedEmbedder(self.inner, capacity_bytes=40)
+        embedder.build()
+        self.assertEqual((3, 3), embedder._slab.shape)
+
+    def test_getitem(self):
+        self.embedder.build()
+        for i, word in enumerate(self.words):
+            with self.subTest(i=i):
+                self.assertEqual(self.vectors[i].tolist(), self.embedder[word].tolist())
+                self.assertEqual(self.vectors[i].tolist(), self.embedder[i].tolist())
+
+    def test_getitem_oov(self):
+        self.embedder.build()
+        with self.assertRaises(OOVError):
+            self.embedder['kerker']
+        with self.assertRaises(OOVError):
+            self.embedder[100]
+        with self.assertRaises(TypeError):
+            self.embedder[1.2]
+
+    def test_hits_and_misses(self):
+        self.embedder.build()
+        self.embedder['gb']
+        self.embedder['gb']
+        self.embedder[2]
+        self.embedder['en']
+        self.assertEqual((2, 2, 2, 2), tuple(self.embedder.cache_info()))
+
+    def test_returned_vector_is_not_evicted(self):
+        self.embedder.build()
+        vector = self.embedder[0]
+        for i in range(1, 5):
+            self.embedder[i]
+        self.assertEqual(self.vectors[0].tolist(), vector.tolist())
+
+    def test_lru_eviction(self):
+        self.embedder.build()
+        self.embedder[0]
+        self.embedder[1]
+        self.embedder[0]
+        self.embedder[2]  # evicts 1
+        self.assertEqual([0, 2], sorted(self.embedder._slots))
+
+    def test_lfu_eviction(self):
+        embedder = CachedEmbedder(self.inner, capacity=2, policy='lfu')
+        embedder.build()
+        for index in [0, 0, 0, 1, 1, 2]:  # 2 evicts 1
+            embedder[index]
+        self.assertEqual([0, 2], sorted(embedder._slots))
+        for index in [2, 2, 2, 3]:  # 3 evicts 0
+            embedder[index]
+        self.assertEqual([2, 3], sorted(embedder._slots))
+        self.assertEqual(self.vectors[3].tolist(), embedder[3].tolist())
+
+    def test_lookup_many(self):
+        self.embedder.build()
+        indices = [4, 0, 4, 2, 0]
+        self.assertEqual(
+            self.vectors[indices].tolist(),
+            self.embedder.lookup_many(indices).tolist(),
+        )
+        self.assertEqual(
+            self.vectors[indices].tolist(),
+            self.embedder.lookup_many(indices).tolist(),
+        )
+
+    def test_get_vectors_batch(self):
+        self.embedder.build()
+        vectors, oov_mask = self.embedder.get_vectors_batch(['gb', 'kerker', 'en'])
+        self.assertEqual([False, True, False], oov_mask.tolist())
+        self.assertEqual(self.vectors[[2, 3]].tolist(), vectors[[0, 2]].tolist())
+        self.assertEqual([0., 0., 0.], vectors[1].tolist())
+
+    def test_get_vectors_batch_oov_not_cached(self):
+        self.embedder.build()
+        self.embedder.get_vectors_batch(['kerker', 'gb', 'kerker'])
+        self.embedder.get_vectors_batch([10, -1])
+        self.assertEqual([2], sorted(self.embedder._slots))
+        self.assertEqual((0, 1), tuple(self.embedder.cache_info())[:2])
+
+    def test_zero_capacity(self):
+        embedder = CachedEmbedder(self.inner, capacity=0)
+        embedder.build()
+        self.assertEqual(self.vectors[1].tolist(), embedder[1].tolist())
+        self.assertEqual(0, embedder.cache_info().currsize)
+
+    def test_clear_cache(self):
+        self.embedder.build()
+        self.embedder[0]
+        self.embedder.clear_cache()
+        self.assertEqual((0, 0, 2, 0), tuple(self.embedder.cache_info()))
+
+    def test_release(self):
+        self.embedder.build()
+        self.assertGreaterEqual(self.embedder.nbytes, self.inner.nbytes + 24)
+        self.embedder.release()
+        self.assertFalse(self.embedder._is_built)
+        self.assertFalse(self.inner._is_built)
+        self.assertNotIn('_slab', self.embedder.__dict__)
+        self.embedder.build()
+        self.assertEqual(self.vectors[1].tolist(), self.embedder[1].tolist())
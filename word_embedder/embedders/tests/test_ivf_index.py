@@ -0,0 +1,85 @@
+from unittest import TestCase
+from os.path import exists, join
+import shutil
+import tempfile
+
+import numpy as np
+
+from ..ivf_index import IVFIndex, IVF_SUFFIX, load_or_build_ivf_index
+from ..keyed_vectors import KeyedVectors
+from ..similarity import normalize_rows, top_k_similar
+
+
+class IVFIndexTestCase(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.tmp_dir = tempfile.mkdtemp()
+        rand_state = np.random.RandomState(2018)
+        centers = rand_state.randn(20, 16)
+        cls.vectors = (
+            centers[rand_state.randint(0, 20, size=2000)] + 0.3 * rand_state.randn(2000, 16)
+        ).astype(np.float32)
+        cls.path = join(cls.tmp_dir, 'random.vec')
+        with open(cls.path, 'w', encoding='utf8') as fout:
+            fout.write('2000 16\n')
+            for i, vector in enumerate(cls.vectors):
+                fout.write(f"w{i} " + ' '.join(map(repr, vector.tolist())) + '\n')
+        cls.embedder = KeyedVectors(path=cls.path, cache=False)
+        cls.embedder.build()
+        cls.queries = normalize_rows(cls.vectors[:50] + 0.1 * rand_state.randn(50, 16))
+        cls.exact_indices, cls.exact_scores = top_k_similar(
+            normalize_rows(cls.vectors), cls.queries, topk=10)
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.tmp_dir)
+
+    def test_fit(self):
+        index = IVFIndex(n_lists=16, n_iter=5).fit(self.embedder)
+        self.assertEqual(2000, index.n_vocab)
+        self.assertEqual((16, 16), index._centroids.shape)
+        self.assertEqual(2000, index._list_offsets[-1])
+        self.assertEqual(list(range(2000)), sorted(index._ids.tolist()))
+
+    def test_fit_rows_in_list_order(self):
+        index = IVFIndex(n_lists=16, n_iter=5).fit(self.embedder, block_size=300)
+        np.testing.assert_allclose(
+            normalize_rows(self.vectors)[index._ids], index._vectors, rtol=1e-5, atol=1e-6)
+
+    def test_search_all_lists_is_exact(self):
+        index = IVFIndex(n_lists=16, n_iter=5).fit(self.embedder)
+        indices, scores = index.search(self.queries, topk=10, n_probe=16)
+        np.testing.assert_array_equal(self.exact_indices, indices)
+        np.testing.assert_allclose(self.exact_scores, scores, rtol=1e-5)
+
+    def test_search_recall(self):
+        index = IVFIndex(n_lists=16, n_probe=4, n_iter=5).fit(self.embedder)
+        indices, _ = index.search(self.queries, topk=10)
+        recall = np.mean([
+            len(set(found) & set(exact)) / 10
+            for found, exact in zip(indices.tolist(), self.exact_indices.tolist())
+        ])
+        self.assertGreater(recall, 0.9)
+
+    def test_search_single_vector(self):
+        index = IVFIndex(n_lists=16, n_iter=5).fit(self.embedder)
+        indices, scores = index.search(self.vectors[3], topk=1)
+        self.assertEqual([[3]], indices.tolist())
+        self.assertAlmostEqual(1., scores[0, 0], places=5)
+
+    def test_save_load(self):
+        path = join(self.tmp_dir, 'index.weivf')
+        index = IVFIndex(n_lists=16, n_probe=3, n_iter=5).fit(self.embedder)
+        index.save(path)
+        loaded = IVFIndex.load(path)
+        self.assertEqual(3, loaded.n_probe)
+        for expected, output in zip(index.search(self.queries), loaded.search(self.queries)):
+            np.testing.assert_array_equal(expected, output)
+
+    def test_load_or_build(self):
+        index = load_or_build_ivf_index(self.embedder, n_lists=16, n_iter=5)
+        self.assertTrue(exists(self.path + IVF_SUFFIX))
+        loaded = load_or_build_ivf_index(self.embedder, n_lists=4)
+        self.assertEqual(16, len(loaded._centroids))
+        np.testing.assert_array_equal(index._ids, loaded._ids)
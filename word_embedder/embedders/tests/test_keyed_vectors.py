@@ -1,16 +1,34 @@
 from unittest import TestCase
-from os.path import abspath, dirname, join
+from unittest.mock import Mock, patch
+from os.path import abspath, dirname, join, exists
+import copy
+import gzip
+import os
+import pathlib
+import pickle
+import shutil
+import tempfile
 
 import numpy as np
 
-from ..keyed_vectors import KeyedVectors
+from ..cache import CACHE_SUFFIX
+from ..keyed_vectors import KeyedVectors, _imap_bounded
+from ..not_built_error import NotBuiltError
 from .keyed_vectors_test_template import KeyedVectorsTestTemplate
 
 
 ROOT_DIR = dirname(abspath(__file__))
 
 
-class KeyedVectorsTestCase(KeyedVectorsTestTemplate, TestCase):
+class RemoveCacheMixin:
+
+    def tearDown(self):
+        cache_path = self.embedder._path + CACHE_SUFFIX
+        if exists(cache_path):
+            os.remove(cache_path)
+
+
+class KeyedVectorsTestCase(RemoveCacheMixin, KeyedVectorsTestTemplate, TestCase):
 
     def setUp(self):
         self.embedder = KeyedVectors(
@@ -35,8 +53,17 @@ class KeyedVectorsTestCase(KeyedVectorsTestTemplate, TestCase):
             self.embedder._path,
         )
 
+    def test_not_built(self):
+        self.assertFalse(hasattr(self.embedder, '_word_vectors'))
+        self.assertIsNone(getattr(self.embedder, '_vocab_index', None))
+        with self.assertRaises(NotBuiltError):
+            self.embedder['gb']
+        for clone in [copy.copy(self.embedder), pickle.loads(pickle.dumps(self.embedder))]:
+            clone.build()
+            self.assertEqual(self.vectors[2].tolist(), clone['gb'].tolist())
+
 
-class KeyedVectorsBinTestCase(KeyedVectorsTestTemplate, TestCase):
+class KeyedVectorsBinTestCase(RemoveCacheMixin, KeyedVectorsTestTemplate, TestCase):
 
     def setUp(self):
         self.embedder = KeyedVectors(
@@ -62,3 +89,327 @@ class KeyedVectorsBinTestCase(KeyedVectorsTestTemplate, TestCase):
             join(ROOT_DIR, 'data/example.bin'),
             self.embedder._path,
         )
+
+
+class KeyedVectorsSortedIndexTestCase(
+        RemoveCacheMixin, KeyedVectorsTestTemplate, TestCase):
+
+    def setUp(self):
+        self.embedder = KeyedVectors(
+            path=join(ROOT_DIR, 'data/example.vec'),
+            index_type='sorted',
+        )
+        self.words = ['薄餡', '隼興', 'gb', 'en', 'Alvin']
+        self.vectors = np.array(
+            [
+                [0.1, 0.2, 0.3],
+                [0.4, 0.5, 0.6],
+                [0.7, 0.8, 0.9],
+                [0.11, 0.12, 0.13],
+                [0.14, 0.15, 0.16],
+            ],
+        ).astype(np.float32)
+
+    def test_index_type(self):
+        self.assertEqual('sorted', self.embedder._index_type)
+
+
+class KeyedVectorsCacheTestCase(TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.path = join(self.tmp_dir, 'example.vec')
+        shutil.copy(join(ROOT_DIR, 'data/example.vec'), self.path)
+        self.cache_path = self.path + CACHE_SUFFIX
+        self.words = ['薄餡', '隼興', 'gb', 'en', 'Alvin']
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_write_cache_on_first_build(self):
+        embedder = KeyedVectors(path=self.path)
+        embedder.build()
+        self.assertTrue(exists(self.cache_path))
+        self.assertNotIsInstance(embedder._word_vectors, np.memmap)
+
+    def test_load_cache_on_later_build(self):
+        KeyedVectors(path=self.path).build()
+        embedder = KeyedVectors(path=self.path)
+        embedder.build()
+        self.assertIsInstance(embedder._word_vectors, np.memmap)
+        self.assertEqual(self.words, embedder.vocab)
+        self.assertEqual((5, 3), embedder._word_vectors.shape)
+        self.assertEqual(
+            np.array([0.7, 0.8, 0.9], dtype=np.float32).tolist(),
+            embedder['gb'].tolist(),
+        )
+
+    def test_load_cache_without_source(self):
+        KeyedVectors(path=self.path).build()
+        os.remove(self.path)
+        embedder = KeyedVectors(path=self.path)
+        embedder.build()
+        self.assertEqual(self.words, embedder.vocab)
+
+    def test_rebuild_stale_cache(self):
+        KeyedVectors(path=self.path).build()
+        with open(self.path, 'w', encoding='utf8') as fout:
+            fout.write('1 3\nkerker 1 2 3\n')
+        embedder = KeyedVectors(path=self.path)
+        embedder.build()
+        self.assertEqual(['kerker'], embedder.vocab)
+        self.assertEqual([1., 2., 3.], embedder['kerker'].tolist())
+
+    def test_ignore_broken_cache(self):
+        with open(self.cache_path, 'wb') as fout:
+            fout.write(b'broken')
+        embedder = KeyedVectors(path=self.path)
+        with self.assertWarns(RuntimeWarning):
+            embedder.build()
+        self.assertEqual(self.words, embedder.vocab)
+
+    def test_no_cache(self):
+        embedder = KeyedVectors(path=self.path, cache=False)
+        embedder.build()
+        self.assertFalse(exists(self.cache_path))
+
+
+class KeyedVectorsDownloadTestCase(TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.words = ['薄餡', '隼興', 'gb', 'en', 'Alvin']
+        self.urls = {}
+        for filename in ['example.vec', 'example.bin']:
+            gz_path = join(self.tmp_dir, filename + '.gz')
+            with open(join(ROOT_DIR, 'data', filename), 'rb') as fin:
+                with gzip.open(gz_path, 'wb') as fout:
+                    shutil.copyfileobj(fin, fout)
+            self.urls[filename] = pathlib.Path(gz_path).as_uri()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_build_missing_path(self):
+        for filename, binary in [('example.vec', False), ('example.bin', True)]:
+            with self.subTest(binary=binary):
+                path = join(self.tmp_dir, 'models', filename)
+                with patch.dict(os.environ, {filename: self.urls[filename]}):
+                    progress = Mock()
+                    embedder = KeyedVectors(
+                        path=path, binary=binary, max_vocab=2, progress=progress)
+                    embedder.build()
+                self.assertEqual(self.words[:2], embedder.vocab)
+                # the whole file is saved, not only the rows read
+                with open(path, 'rb') as fin, open(join(ROOT_DIR, 'data', filename), 'rb') as f:
+                    self.assertEqual(f.read(), fin.read())
+                self.assertTrue(exists(path + CACHE_SUFFIX))
+                self.assertTrue(progress.called)
+
+    def test_build_missing_path_parallel(self):
+        path = join(self.tmp_dir, 'models', 'example.vec')
+        with patch.dict(os.environ, {'example.vec': self.urls['example.vec']}):
+            embedder = KeyedVectors(path=path, cache=False)
+            embedder.build(n_workers=2)
+        self.assertEqual(self.words, embedder.vocab)
+        self.assertTrue(exists(path))
+
+    def test_no_url(self):
+        embedder = KeyedVectors(path=join(self.tmp_dir, 'missing.vec'))
+        with self.assertRaises(FileNotFoundError):
+            embedder.build()
+
+
+class KeyedVectorsInitSimsTestCase(TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.embedder = KeyedVectors(
+            path=join(ROOT_DIR, 'data/example.vec'), cache=False)
+        self.embedder.build()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_init_sims(self):
+        self.embedder.init_sims()
+        np.testing.assert_allclose(
+            np.ones(5), np.linalg.norm(self.embedder._normed_vectors, axis=1), rtol=1e-6)
+
+    def test_init_sims_memmap(self):
+        path = join(self.tmp_dir, 'normed.npy')
+        self.embedder.init_sims(path=path, block_size=2)
+        self.assertIsInstance(self.embedder._normed_vectors, np.memmap)
+        expected = self.embedder._normed_vectors.tolist()
+
+        embedder = KeyedVectors(
+            path=join(ROOT_DIR, 'data/example.vec'), cache=False)
+        embedder.build()
+        embedder.init_sims(path=path)
+        self.assertIsInstance(embedder._normed_vectors, np.memmap)
+        self.assertEqual(expected, embedder._normed_vectors.tolist())
+        self.assertEqual('隼興', embedder.most_similar('薄餡', topk=1)[0][0])
+
+    def test_release_and_build_clear_sims(self):
+        self.embedder.init_sims()
+        self.embedder.release()
+        self.assertNotIn('_normed_vectors', self.embedder.__dict__)
+
+        self.embedder.build()
+        self.embedder.init_sims()
+        self.embedder._is_built = False
+        self.embedder.build()
+        self.assertNotIn('_normed_vectors', self.embedder.__dict__)
+
+
+class KeyedVectorsStorageDtypeTestCase(TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.path = join(self.tmp_dir, 'example.vec')
+        shutil.copy(join(ROOT_DIR, 'data/example.vec'), self.path)
+        self.vectors = np.array(
+            [
+                [0.1, 0.2, 0.3],
+                [0.4, 0.5, 0.6],
+                [0.7, 0.8, 0.9],
+                [0.11, 0.12, 0.13],
+                [0.14, 0.15, 0.16],
+            ],
+        ).astype(np.float32)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_storage_dtype(self):
+        for storage_dtype, rtol in [('float16', 1e-3), ('int8', 1e-2)]:
+            with self.subTest(storage_dtype=storage_dtype):
+                embedder = KeyedVectors(path=self.path, storage_dtype=storage_dtype)
+                embedder.build()
+                self.assertEqual(np.dtype(storage_dtype), embedder._word_vectors.dtype)
+                self.assertEqual(np.float32, embedder['gb'].dtype)
+                np.testing.assert_allclose(self.vectors[2], embedder['gb'], rtol=rtol)
+                vectors = embedder.lookup_many([4, 0])
+                self.assertEqual(np.float32, vectors.dtype)
+                np.testing.assert_allclose(self.vectors[[4, 0]], vectors, rtol=rtol)
+                vectors, oov_mask = embedder.get_vectors_batch(['en', 'kerker'])
+                np.testing.assert_allclose(self.vectors[3], vectors[0], rtol=rtol)
+                self.assertEqual([False, True], oov_mask.tolist())
+
+    def test_cache_keeps_storage_dtype(self):
+        KeyedVectors(path=self.path, storage_dtype='int8').build()
+        embedder = KeyedVectors(path=self.path, storage_dtype='int8')
+        embedder.build()
+        self.assertIsInstance(embedder._word_vectors, np.memmap)
+        self.assertEqual(np.int8, embedder._word_vectors.dtype)
+        self.assertEqual((5,), embedder._scales.shape)
+
+        # a cache of another storage dtype is rebuilt
+        embedder = KeyedVectors(path=self.path, storage_dtype='float16')
+        embedder.build()
+        self.assertEqual(np.float16, embedder._word_vectors.dtype)
+        self.assertIsNone(embedder._scales)
+
+    def test_unknown_storage_dtype(self):
+        with self.assertRaises(ValueError):
+            KeyedVectors(path=self.path, storage_dtype='float64')
+
+
+class KeyedVectorsFilterTestCase(TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.words = ['薄餡', '隼興', 'gb', 'en', 'Alvin']
+        self.vectors = np.array(
+            [
+                [0.1, 0.2, 0.3],
+                [0.4, 0.5, 0.6],
+                [0.7, 0.8, 0.9],
+                [0.11, 0.12, 0.13],
+                [0.14, 0.15, 0.16],
+            ],
+        ).astype(np.float32)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def _build(self, **kwargs):
+        for filename, binary in [('example.vec', False), ('example.bin', True)]:
+            with self.subTest(binary=binary):
+                embedder = KeyedVectors(
+                    path=join(ROOT_DIR, 'data', filename),
+                    binary=binary,
+                    cache=False,
+                    **kwargs,
+                )
+                embedder.build()
+                yield embedder
+
+    def test_max_vocab(self):
+        for embedder in self._build(max_vocab=2):
+            self.assertEqual(self.words[:2], embedder.vocab)
+            self.assertEqual(2, embedder.n_vocab)
+            self.assertEqual(self.vectors[:2].tolist(), embedder._word_vectors.tolist())
+            self.assertEqual(-1, embedder.get_index('gb'))
+
+    def test_keep_words(self):
+        for embedder in self._build(keep_words=['Alvin', 'gb', 'kerker']):
+            self.assertEqual(['gb', 'Alvin'], embedder.vocab)
+            self.assertEqual(self.vectors[[2, 4]].tolist(), embedder._word_vectors.tolist())
+            self.assertEqual(self.vectors[4].tolist(), embedder['Alvin'].tolist())
+
+    def test_parallel_text(self):
+        path = join(ROOT_DIR, 'data/example.vec')
+        expected = KeyedVectors(path=path, cache=False)
+        expected.build()
+        with patch('word_embedder.embedders.keyed_vectors.TEXT_RANGE_SIZE', 20):
+            for kwargs in [{}, {'max_vocab': 3}, {'keep_words': ['Alvin', 'gb']}]:
+                with self.subTest(**kwargs):
+                    embedder = KeyedVectors(path=path, cache=False, **kwargs)
+                    embedder.build(n_workers=2)
+                    self.assertEqual(
+                        [word for word in expected.vocab if embedder.get_index(word) >= 0],
+                        embedder.vocab,
+                    )
+                    self.assertEqual(
+                        expected.lookup_many(expected.get_indices(embedder.vocab)).tolist(),
+                        embedder._word_vectors.tolist(),
+                    )
+
+    def test_imap_bounded(self):
+        submitted = []
+
+        def apply_async(func, args):
+            submitted.append(args)
+            return Mock(get=Mock(return_value=func(*args)))
+
+        results = _imap_bounded(
+            Mock(apply_async=apply_async), pow, [(i, 2) for i in range(10)], max_in_flight=3)
+        self.assertEqual([], submitted)
+        for i, result in enumerate(results):
+            self.assertEqual(i ** 2, result)
+            # the consumed call and at most 3 others
+            self.assertLessEqual(len(submitted), i + 4)
+        self.assertEqual(10, len(submitted))
+
+    def test_max_vocab_and_keep_words(self):
+        for embedder in self._build(max_vocab=1, keep_words=['Alvin', 'gb'], storage_dtype='int8'):
+            self.assertEqual(['gb'], embedder.vocab)
+            self.assertEqual((1,), embedder._scales.shape)
+            np.testing.assert_allclose(self.vectors[2], embedder['gb'], rtol=1e-2)
+
+    def test_cache_keeps_filter(self):
+        path = join(self.tmp_dir, 'example.vec')
+        shutil.copy(join(ROOT_DIR, 'data/example.vec'), path)
+        KeyedVectors(path=path, max_vocab=2).build()
+
+        embedder = KeyedVectors(path=path, max_vocab=2)
+        embedder.build()
+        self.assertIsInstance(embedder._word_vectors, np.memmap)
+        self.assertEqual(self.words[:2], embedder.vocab)
+
+        # a cache built with other options is rebuilt
+        embedder = KeyedVectors(path=path, keep_words=['en'])
+        embedder.build()
+        self.assertNotIsInstance(embedder._word_vectors, np.memmap)
+        self.assertEqual(['en'], embedder.vocab)
@@ -1,15 +1,30 @@
 from unittest import TestCase
-from os.path import abspath, dirname, join
+from unittest.mock import patch
+from os.path import abspath, dirname, join, exists
+import gzip
+import os
+import pathlib
+import shutil
+import tempfile
 
 import numpy as np
 
-from ..keyed_vectors_light import KeyedVectorsLight
+from ..keyed_vectors_light import KeyedVectorsLight, LowMemoryVecLoader, INDEX_SUFFIX
+from ..oov_error import OOVError
 from .keyed_vectors_test_template import KeyedVectorsTestTemplate
 
 ROOT_DIR = dirname(abspath(__file__))
 
 
-class KeyedVectorsLightTestCase(KeyedVectorsTestTemplate, TestCase):
+class RemoveIndexMixin:
+
+    def tearDown(self):
+        index_path = self.embedder._path + INDEX_SUFFIX
+        if exists(index_path):
+            os.remove(index_path)
+
+
+class KeyedVectorsLightTestCase(RemoveIndexMixin, KeyedVectorsTestTemplate, TestCase):
 
     def setUp(self):
         self.embedder = KeyedVectorsLight(
@@ -27,7 +42,9 @@ class KeyedVectorsLightTestCase(KeyedVectorsTestTemplate, TestCase):
 
     def test_correctly_create_instance(self):
         self.assertEqual(
-            set(['_path', '_binary', '_is_built']),
+            set(['_path', '_binary', '_index_type', '_cache', '_storage_dtype',
+                 '_max_vocab', '_keep_words', '_progress', '_is_built',
+                 '_hot_size', '_hot_words']),
             set(self.embedder.__dict__.keys()),
         )
         self.assertEqual(
@@ -41,10 +58,12 @@ class KeyedVectorsLightTestCase(KeyedVectorsTestTemplate, TestCase):
         self.embedder.build()
         self.assertTrue(self.embedder._is_built)
         self.assertEqual(
-            set(['_path', '_binary', '_is_built',
+            set(['_path', '_binary', '_index_type', '_cache', '_storage_dtype',
+                 '_max_vocab', '_keep_words', '_progress', '_is_built',
+                 '_hot_size', '_hot_words',
                  '_embedding_size', '_vocab_size',
-                 '_vocab_list', '_byte_pos',
-                 '_vloader']),
+                 '_vocab_list', '_vocab_index', '_byte_pos',
+                 '_vloader', '_hot_vectors', '_hot_scales', '_hot_slots']),
             set(self.embedder.__dict__.keys()),
         )
         self.assertEqual(
@@ -52,8 +71,26 @@ class KeyedVectorsLightTestCase(KeyedVectorsTestTemplate, TestCase):
             self.embedder._vocab_list,
         )
 
+    def test_most_similar_by_blocks(self):
+        self.embedder.build()
+        with patch.object(
+                self.embedder, 'lookup_many', wraps=self.embedder.lookup_many) as lookup_many:
+            result = self.embedder.most_similar(self.words[1], topk=3, block_size=2)
+        self._assert_most_similar(self.vectors[1], result, topk=3, exclude=1)
+        self.assertNotIn('_normed_vectors', self.embedder.__dict__)
+        # rows are read two at a time
+        self.assertEqual(3, lookup_many.call_count)
+
+    def test_release_init_sims(self):
+        self.embedder.build()
+        self.embedder.init_sims()
+        self.assertIn('_normed_vectors', self.embedder.__dict__)
+        self.embedder.release()
+        self.assertNotIn('_normed_vectors', self.embedder.__dict__)
+
 
-class KeyedVectorsLightBinTestCase(KeyedVectorsTestTemplate, TestCase):
+class KeyedVectorsLightBinTestCase(
+        RemoveIndexMixin, KeyedVectorsTestTemplate, TestCase):
 
     def setUp(self):
         self.embedder = KeyedVectorsLight(
@@ -73,7 +110,9 @@ class KeyedVectorsLightBinTestCase(KeyedVectorsTestTemplate, TestCase):
 
     def test_correctly_create_instance(self):
         self.assertEqual(
-            set(['_path', '_binary', '_is_built']),
+            set(['_path', '_binary', '_index_type', '_cache', '_storage_dtype',
+                 '_max_vocab', '_keep_words', '_progress', '_is_built',
+                 '_hot_size', '_hot_words']),
             set(self.embedder.__dict__.keys()),
         )
         self.assertEqual(
@@ -87,13 +126,176 @@ class KeyedVectorsLightBinTestCase(KeyedVectorsTestTemplate, TestCase):
         self.embedder.build()
         self.assertTrue(self.embedder._is_built)
         self.assertEqual(
-            set(['_path', '_binary', '_is_built',
+            set(['_path', '_binary', '_index_type', '_cache', '_storage_dtype',
+                 '_max_vocab', '_keep_words', '_progress', '_is_built',
+                 '_hot_size', '_hot_words',
                  '_embedding_size', '_vocab_size',
-                 '_vocab_list', '_byte_pos',
-                 '_vloader']),
+                 '_vocab_list', '_vocab_index', '_byte_pos',
+                 '_vloader', '_hot_vectors', '_hot_scales', '_hot_slots']),
             set(self.embedder.__dict__.keys()),
         )
         self.assertEqual(
             ['薄餡', '隼興', 'gb', 'en', 'Alvin'],
             self.embedder._vocab_list,
         )
+
+
+class KeyedVectorsLightHotTestCase(KeyedVectorsLightTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.embedder = KeyedVectorsLight(
+            path=join(ROOT_DIR, 'data/example.vec'),
+            hot_size=2,
+            hot_words=['en', '薄餡', 'kerker'],
+        )
+
+    def test_hot_vectors(self):
+        self.embedder.build()
+        self.assertEqual(self.vectors[[0, 1, 3]].tolist(), self.embedder._hot_vectors.tolist())
+        self.assertEqual({3: 2}, self.embedder._hot_slots)
+
+    def test_hot_vectors_served_from_memory(self):
+        self.embedder.build()
+        with patch.object(
+                self.embedder._vloader, 'get_many',
+                side_effect=AssertionError('should not read from disk')), \
+                patch.object(
+                    LowMemoryVecLoader, '__getitem__',
+                    side_effect=AssertionError('should not read from disk')):
+            for index in [0, 1, 3]:
+                self.assertEqual(self.vectors[index].tolist(), self.embedder[index].tolist())
+            self.assertEqual(
+                self.vectors[[3, 0, 1]].tolist(),
+                self.embedder.lookup_many([3, 0, 1]).tolist(),
+            )
+
+    def test_lookup_many_mixed(self):
+        self.embedder.build()
+        indices = [4, 0, 2, 3, 4]
+        self.assertEqual(
+            self.vectors[indices].tolist(),
+            self.embedder.lookup_many(indices).tolist(),
+        )
+
+    def test_hot_size_larger_than_vocab(self):
+        embedder = KeyedVectorsLight(
+            path=join(ROOT_DIR, 'data/example.vec'), hot_size=100)
+        embedder.build()
+        self.assertEqual(self.vectors.tolist(), embedder._hot_vectors.tolist())
+        self.assertEqual(self.vectors[4].tolist(), embedder[4].tolist())
+        with self.assertRaises(OOVError):
+            embedder[5]
+
+
+class KeyedVectorsLightInt8HotTestCase(RemoveIndexMixin, TestCase):
+
+    def setUp(self):
+        self.embedder = KeyedVectorsLight(
+            path=join(ROOT_DIR, 'data/example.vec'),
+            hot_size=2,
+            storage_dtype='int8',
+        )
+        self.vectors = np.array(
+            [
+                [0.1, 0.2, 0.3],
+                [0.4, 0.5, 0.6],
+                [0.7, 0.8, 0.9],
+                [0.11, 0.12, 0.13],
+                [0.14, 0.15, 0.16],
+            ],
+        ).astype(np.float32)
+
+    def test_hot_vectors(self):
+        self.embedder.build()
+        self.assertEqual(np.int8, self.embedder._hot_vectors.dtype)
+        self.assertEqual((2,), self.embedder._hot_scales.shape)
+        self.assertEqual(np.float32, self.embedder[0].dtype)
+        np.testing.assert_allclose(self.vectors[0], self.embedder[0], rtol=1e-2)
+        # cold rows are read from the file as they are
+        self.assertEqual(self.vectors[3].tolist(), self.embedder[3].tolist())
+        np.testing.assert_allclose(
+            self.vectors[[3, 1]], self.embedder.lookup_many([3, 1]), rtol=1e-2)
+
+
+class KeyedVectorsLightIndexTestCase(TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.words = ['薄餡', '隼興', 'gb', 'en', 'Alvin']
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def _copy(self, filename):
+        path = join(self.tmp_dir, filename)
+        shutil.copy(join(ROOT_DIR, 'data', filename), path)
+        return path
+
+    def test_reuse_index(self):
+        for filename, binary in [('example.vec', False), ('example.bin', True)]:
+            with self.subTest(binary=binary):
+                path = self._copy(filename)
+                KeyedVectorsLight(path=path, binary=binary).build()
+                self.assertTrue(exists(path + INDEX_SUFFIX))
+
+                embedder = KeyedVectorsLight(path=path, binary=binary)
+                with patch.object(
+                        KeyedVectorsLight, '_load_data',
+                        side_effect=AssertionError('should not rescan')):
+                    embedder.build()
+                self.assertEqual(self.words, embedder.vocab)
+                self.assertIsInstance(embedder._byte_pos, np.memmap)
+                self.assertEqual(
+                    np.array([0.11, 0.12, 0.13], dtype=np.float32).tolist(),
+                    embedder['en'].tolist(),
+                )
+
+    def test_rebuild_stale_index(self):
+        path = self._copy('example.vec')
+        KeyedVectorsLight(path=path).build()
+        with open(path, 'w', encoding='utf8') as fout:
+            fout.write('1 3\nkerker 1 2 3\n')
+        embedder = KeyedVectorsLight(path=path)
+        embedder.build()
+        self.assertEqual(['kerker'], embedder.vocab)
+        self.assertEqual([1., 2., 3.], embedder['kerker'].tolist())
+
+    def test_no_cache(self):
+        path = self._copy('example.vec')
+        embedder = KeyedVectorsLight(path=path, cache=False)
+        embedder.build()
+        self.assertFalse(exists(path + INDEX_SUFFIX))
+        self.assertEqual(self.words, embedder.vocab)
+
+    def test_build_twice(self):
+        path = self._copy('example.vec')
+        embedder = KeyedVectorsLight(path=path)
+        embedder.build()
+        with patch.object(
+                KeyedVectorsLight, '_load_cache',
+                side_effect=AssertionError('should not build again')):
+            embedder.build()
+
+    def test_build_missing_path(self):
+        for filename, binary in [('example.vec', False), ('example.bin', True)]:
+            with self.subTest(binary=binary):
+                gz_path = join(self.tmp_dir, filename + '.gz')
+                with open(join(ROOT_DIR, 'data', filename), 'rb') as fin:
+                    with gzip.open(gz_path, 'wb') as fout:
+                        shutil.copyfileobj(fin, fout)
+                path = join(self.tmp_dir, 'models', filename)
+                embedder = KeyedVectorsLight(path=path, binary=binary)
+                with patch.dict(os.environ, {filename: pathlib.Path(gz_path).as_uri()}):
+                    # offsets are read while downloading, the file is not scanned again
+                    with patch.object(
+                            KeyedVectorsLight, '_load_data',
+                            side_effect=AssertionError('should not rescan')):
+                        embedder.build()
+                self.assertTrue(exists(path))
+                self.assertTrue(exists(path + INDEX_SUFFIX))
+                self.assertEqual(self.words, embedder.vocab)
+                self.assertEqual(
+                    np.array([0.11, 0.12, 0.13], dtype=np.float32).tolist(),
+                    embedder['en'].tolist(),
+                )
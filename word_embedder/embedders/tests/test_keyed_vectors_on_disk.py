@@ -1,10 +1,13 @@
 from unittest import TestCase
 from os.path import abspath, dirname, join, exists
 import os
+import shutil
+import tempfile
 
 import numpy as np
 import pickle as pkl
 
+from ..cache import CACHE_SUFFIX
 from ..keyed_vectors_on_disk import KeyedVectorsOnDisk
 from .keyed_vectors_test_template import KeyedVectorsTestTemplate
 
@@ -61,7 +64,8 @@ class KeyedVectorsOnDiskTestCase(KeyedVectorsTestTemplate, TestCase):
 
     def test_correctly_create_instance(self):
         self.assertEqual(
-            set(['_path', '_array_path', '_is_built']),
+            set(['_path', '_binary', '_index_type', '_cache', '_storage_dtype',
+                 '_max_vocab', '_keep_words', '_progress', '_is_built', '_array_path']),
             set(self.embedder.__dict__.keys()),
         )
         self.assertEqual(
@@ -74,9 +78,10 @@ class KeyedVectorsOnDiskTestCase(KeyedVectorsTestTemplate, TestCase):
         self.embedder.build()
         self.assertTrue(self.embedder._is_built)
         self.assertEqual(
-            set(['_path', '_array_path', '_is_built',
+            set(['_path', '_binary', '_index_type', '_cache', '_storage_dtype',
+                 '_max_vocab', '_keep_words', '_progress', '_is_built', '_array_path',
                  '_embedding_size', '_vocab_size',
-                 '_vocab_list', '_word_vectors']),
+                 '_vocab_list', '_vocab_index', '_word_vectors', '_scales']),
             set(self.embedder.__dict__.keys()),
         )
         # check words
@@ -144,7 +149,8 @@ class KeyedVectorsOnDiskGivenArrayPathTestCase(
 
     def test_correctly_create_instance(self):
         self.assertEqual(
-            set(['_path', '_array_path', '_is_built']),
+            set(['_path', '_binary', '_index_type', '_cache', '_storage_dtype',
+                 '_max_vocab', '_keep_words', '_progress', '_is_built', '_array_path']),
             set(self.embedder.__dict__.keys()),
         )
         self.assertEqual(
@@ -157,9 +163,10 @@ class KeyedVectorsOnDiskGivenArrayPathTestCase(
         self.embedder.build()
         self.assertTrue(self.embedder._is_built)
         self.assertEqual(
-            set(['_path', '_array_path', '_is_built',
+            set(['_path', '_binary', '_index_type', '_cache', '_storage_dtype',
+                 '_max_vocab', '_keep_words', '_progress', '_is_built', '_array_path',
                  '_embedding_size', '_vocab_size',
-                 '_vocab_list', '_word_vectors']),
+                 '_vocab_list', '_vocab_index', '_word_vectors', '_scales']),
             set(self.embedder.__dict__.keys()),
         )
         # check array path should be the one given
@@ -180,3 +187,59 @@ class KeyedVectorsOnDiskGivenArrayPathTestCase(
                 self.param['syn0filename'][i],  # vectors stored in path
                 self.embedder[word].tolist(),  # vectors stored in array_path
             )
+
+
+class KeyedVectorsOnDiskStorageDtypeTestCase(TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.path = join(self.tmp_dir, 'example_on_disk.bin')
+        self.array_path = join(self.tmp_dir, 'example_on_disk.ny')
+        self.vectors = np.array(
+            [
+                [0.1, 0.2, 0.3],
+                [0.4, 0.5, 0.6],
+                [0.7, 0.8, 0.9],
+                [0.11, 0.12, 0.13],
+                [0.14, 0.15, 0.16],
+            ],
+        ).astype(np.float32)
+        fp = np.memmap(
+            self.array_path, dtype=self.vectors.dtype, mode='w+', shape=self.vectors.shape)
+        fp[:] = self.vectors[:]
+        del fp
+        with open(self.path, 'wb') as f:
+            pkl.dump(
+                {
+                    'vocab': None,
+                    'index2word': ['薄餡', '隼興', 'gb', 'en', 'Alvin'],
+                    'vector_size': self.vectors.shape[1],
+                    'syn0shape': self.vectors.shape,
+                    'syn0dtype': self.vectors.dtype,
+                    'syn0filename': self.array_path,
+                },
+                f,
+                protocol=pkl.HIGHEST_PROTOCOL,
+            )
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_storage_dtype(self):
+        for storage_dtype, rtol in [('float16', 1e-3), ('int8', 1e-2)]:
+            with self.subTest(storage_dtype=storage_dtype):
+                embedder = KeyedVectorsOnDisk(path=self.path, storage_dtype=storage_dtype)
+                embedder.build()
+                self.assertTrue(
+                    exists(f"{self.array_path}.{storage_dtype}{CACHE_SUFFIX}"))
+                self.assertEqual(np.dtype(storage_dtype), embedder._word_vectors.dtype)
+                self.assertEqual(np.float32, embedder['gb'].dtype)
+                np.testing.assert_allclose(self.vectors[2], embedder['gb'], rtol=rtol)
+                np.testing.assert_allclose(
+                    self.vectors[[4, 0]], embedder.lookup_many([4, 0]), rtol=rtol)
+
+                # later builds map the converted array
+                embedder = KeyedVectorsOnDisk(path=self.path, storage_dtype=storage_dtype)
+                embedder.build()
+                self.assertIsInstance(embedder._word_vectors, np.memmap)
+                np.testing.assert_allclose(self.vectors, embedder.lookup_many(range(5)), rtol=rtol)
@@ -0,0 +1,33 @@
+from unittest import TestCase
+
+import numpy as np
+
+from ..kmeans import assign, kmeans
+
+
+class KMeansTestCase(TestCase):
+
+    def setUp(self):
+        rand_state = np.random.RandomState(0)
+        self.centers = np.array([[10, 0], [0, 10], [-10, -10]], dtype=np.float32)
+        self.labels = rand_state.randint(0, 3, size=300)
+        self.data = self.centers[self.labels] + rand_state.randn(300, 2).astype(np.float32)
+
+    def test_assign(self):
+        labels = assign(self.data, self.centers, block_size=7)
+        np.testing.assert_array_equal(self.labels, labels)
+
+    def test_kmeans(self):
+        centroids = kmeans(self.data, n_clusters=3, n_iter=10)
+        self.assertEqual((3, 2), centroids.shape)
+        # every true center is recovered by one centroid
+        distances = np.linalg.norm(self.centers[:, None] - centroids[None], axis=2)
+        self.assertTrue((distances.min(axis=1) < 0.5).all())
+
+    def test_kmeans_sample(self):
+        centroids = kmeans(self.data, n_clusters=3, n_iter=10, sample_size=100)
+        self.assertEqual((3, 2), centroids.shape)
+
+    def test_too_many_clusters(self):
+        with self.assertRaises(ValueError):
+            kmeans(self.data[:2], n_clusters=3)
@@ -0,0 +1,179 @@
+from concurrent.futures import TimeoutError
+from os.path import abspath, dirname, join
+import threading
+from unittest import TestCase
+from unittest.mock import patch
+
+from ..keyed_vectors import KeyedVectors
+from ..library import Library
+from ..not_built_error import NotBuiltError
+
+
+ROOT_DIR = dirname(abspath(__file__))
+
+
+class BlockingEmbedder:
+
+    def __init__(self, fail: bool = False):
+        self.fail = fail
+        self.started = threading.Event()
+        self.unblock = threading.Event()
+        self.n_builds = 0
+        self._is_built = False
+
+    @property
+    def nbytes(self):
+        return 100 if self._is_built else 0
+
+    def release(self):
+        self._is_built = False
+
+    def build(self):
+        if self._is_built:
+            return
+        self.n_builds += 1
+        self.started.set()
+        self.unblock.wait(5)
+        if self.fail:
+            raise OSError('broken file')
+        self._is_built = True
+
+
+class LibraryTestCase(TestCase):
+
+    def setUp(self):
+        self.library = Library(max_workers=2)
+        self.embedders = {'a': BlockingEmbedder(), 'b': BlockingEmbedder()}
+        for name, embedder in self.embedders.items():
+            self.library.register(name, embedder)
+
+    def tearDown(self):
+        for embedder in self.embedders.values():
+            embedder.unblock.set()
+
+    def test_register_twice(self):
+        with self.assertRaises(KeyError):
+            self.library.register('a', BlockingEmbedder())
+
+    def test_getitem_not_found(self):
+        with self.assertRaises(KeyError):
+            self.library['c']
+        with self.assertRaises(KeyError):
+            self.library.prefetch(['c'])
+
+    def test_getitem(self):
+        self.embedders['a'].unblock.set()
+        self.assertIs(self.embedders['a'], self.library['a'])
+        self.assertIs(self.embedders['a'], self.library['a'])
+        self.assertEqual(1, self.embedders['a'].n_builds)
+        self.assertEqual('built', self.library.status()['a']['state'])
+        self.assertEqual('registered', self.library.status()['b']['state'])
+
+    def test_prefetch(self):
+        futures = self.library.prefetch()
+        self.assertEqual(['a', 'b'], list(futures))
+        self.assertTrue(self.embedders['a'].started.wait(5))
+        self.assertEqual('building', self.library.status()['a']['state'])
+        with self.assertRaises(TimeoutError):
+            self.library.get('a', timeout=0.01)
+
+        self.embedders['a'].unblock.set()
+        self.assertIs(self.embedders['a'], futures['a'].result(timeout=5))
+        self.assertIs(self.embedders['a'], self.library.get('a', timeout=5))
+        self.assertIs(futures['a'], self.library.prefetch(['a'])['a'])
+        self.assertEqual(1, self.embedders['a'].n_builds)
+        status = self.library.status()['a']
+        self.assertEqual('built', status['state'])
+        self.assertGreater(status['seconds'], 0.)
+
+        self.embedders['b'].unblock.set()
+        self.assertIs(self.embedders['b'], self.library.get('b', timeout=5))
+
+    def test_prefetch_queued(self):
+        library = Library(max_workers=1)
+        library.register('a', self.embedders['a'])
+        library.register('b', self.embedders['b'])
+        library.prefetch()
+        self.assertTrue(self.embedders['a'].started.wait(5))
+        self.assertEqual(
+            ['building', 'queued'],
+            [status['state'] for status in library.status().values()],
+        )
+
+    def test_failed_build(self):
+        embedder = BlockingEmbedder(fail=True)
+        embedder.unblock.set()
+        self.library.register('broken', embedder)
+        future = self.library.prefetch(['broken'])['broken']
+        with self.assertRaises(OSError):
+            future.result(timeout=5)
+        self.assertEqual('failed', self.library.status()['broken']['state'])
+
+        embedder.fail = False
+        self.assertIs(embedder, self.library['broken'])
+        self.assertEqual(2, embedder.n_builds)
+        self.assertEqual('built', self.library.status()['broken']['state'])
+
+    def test_evict_least_recently_used(self):
+        library = Library(max_bytes=250)
+        embedders = {name: BlockingEmbedder() for name in 'abc'}
+        for name, embedder in embedders.items():
+            embedder.unblock.set()
+            library.register(name, embedder)
+        library['a']
+        library['b']
+        library['a']
+        self.assertEqual((250, 200, 2, 0, 0, 0), tuple(library.memory_info()))
+
+        library['c']
+        self.assertFalse(embedders['b']._is_built)
+        self.assertTrue(embedders['a']._is_built)
+        self.assertEqual('evicted', library.status()['b']['state'])
+        self.assertEqual(100, library.status()['c']['nbytes'])
+        self.assertEqual((250, 200, 2, 1, 100, 0), tuple(library.memory_info()))
+
+        self.assertIs(embedders['b'], library['b'])
+        self.assertTrue(embedders['b']._is_built)
+        self.assertFalse(embedders['a']._is_built)
+        self.assertEqual(2, embedders['b'].n_builds)
+        self.assertEqual((250, 200, 2, 2, 200, 1), tuple(library.memory_info()))
+
+    def test_get_does_not_return_evicted(self):
+        library = Library(max_bytes=150)
+        embedders = {name: BlockingEmbedder() for name in 'ab'}
+        for name, embedder in embedders.items():
+            embedder.unblock.set()
+            library.register(name, embedder)
+        library['a']
+
+        get_future = library._get_future
+
+        def evict_a_meanwhile(name):
+            result = get_future(name)
+            if name == 'a':
+                library['b']  # evicts a before get('a') returns it
+            return result
+
+        with patch.object(library, '_get_future', side_effect=evict_a_meanwhile):
+            self.assertIs(embedders['a'], library.get('a'))
+        self.assertTrue(embedders['a']._is_built)
+        self.assertEqual(2, embedders['a'].n_builds)
+
+    def test_use_evicted(self):
+        path = join(ROOT_DIR, 'data/example.vec')
+        library = Library(max_bytes=1)
+        for name in 'ab':
+            library.register(name, KeyedVectors(path=path, cache=False))
+        embedder = library['a']
+        library['b']
+        with self.assertRaises(NotBuiltError):
+            embedder['gb']
+        self.assertIs(embedder, library['a'])
+        self.assertEqual(3, len(embedder['gb']))
+
+    def test_no_budget(self):
+        self.embedders['a'].unblock.set()
+        self.embedders['b'].unblock.set()
+        self.library['a']
+        self.library['b']
+        self.assertEqual((None, 200, 2, 0, 0, 0), tuple(self.library.memory_info()))
@@ -1,9 +1,17 @@
+from concurrent.futures import ThreadPoolExecutor
 from unittest import TestCase
+from unittest.mock import patch
 from os.path import abspath, dirname, join
+import shutil
+import tempfile
 
 import numpy as np
 
-from ..keyed_vectors_light import LowMemoryVecLoader
+from ..keyed_vectors_light import (
+    LowMemoryVecLoader,
+    _load_bin_file,
+    _load_text_file,
+)
 
 
 ROOT_DIR = dirname(abspath(__file__))
@@ -16,6 +24,15 @@ class LowMemoryVecLoaderTestCase(TestCase):
             path=join(ROOT_DIR, 'data/example.vec'),
             byte_pos=[4, 23, 42, 57, 75, 95],
         )
+        self.vectors = np.array(
+            [
+                [0.1, 0.2, 0.3],
+                [0.4, 0.5, 0.6],
+                [0.7, 0.8, 0.9],
+                [0.11, 0.12, 0.13],
+                [0.14, 0.15, 0.16],
+            ],
+        ).astype(np.float32)
 
     def test_getitem_forward(self):
         self.assertEqual(
@@ -40,3 +57,113 @@ class LowMemoryVecLoaderTestCase(TestCase):
     def test_getitem_out_of_index(self):
         with self.assertRaises(ValueError):
             self.loader[100]
+        with self.assertRaises(ValueError):
+            self.loader[5]
+
+    def test_get_many(self):
+        indices = [4, 0, 3, 0, 2]
+        self.assertEqual(
+            self.vectors[indices].tolist(),
+            self.loader.get_many(indices).tolist(),
+        )
+
+    def test_get_many_into_out(self):
+        out = np.zeros((2, 3), dtype=np.float32)
+        output = self.loader.get_many([1, 3], out=out)
+        self.assertIs(out, output)
+        self.assertEqual(self.vectors[[1, 3]].tolist(), out.tolist())
+
+    def test_get_many_empty(self):
+        self.assertEqual((0, 3), self.loader.get_many([]).shape)
+
+    def test_get_many_out_of_index(self):
+        with self.assertRaises(ValueError):
+            self.loader.get_many([0, 5])
+
+
+class LowMemoryVecLoaderWithoutMmapTestCase(LowMemoryVecLoaderTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.loader = LowMemoryVecLoader(
+            path=join(ROOT_DIR, 'data/example.vec'),
+            byte_pos=[4, 23, 42, 57, 75, 95],
+            use_mmap=False,
+        )
+
+    def test_no_mmap(self):
+        self.assertIsNone(self.loader._mmap)
+
+
+class LowMemoryVecLoaderBinTestCase(LowMemoryVecLoaderTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.loader = LowMemoryVecLoader(
+            path=join(ROOT_DIR, 'data/example.bin'),
+            byte_pos=[11, 30, 45, 60, 78],
+            binary=True,
+        )
+
+    def test_getitem_is_view_over_mmap(self):
+        vector = self.loader[2]
+        self.assertIs(self.loader._mmap, vector.base.obj)
+        self.assertFalse(vector.flags.writeable)
+
+
+class LowMemoryVecLoaderConcurrencyTestCase(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.tmp_dir = tempfile.mkdtemp()
+        rand_state = np.random.RandomState(2018)
+        cls.vectors = rand_state.rand(500, 16).astype(np.float32)
+        cls.vec_path = join(cls.tmp_dir, 'random.vec')
+        cls.bin_path = join(cls.tmp_dir, 'random.bin')
+        with open(cls.vec_path, 'w', encoding='utf8') as fout:
+            fout.write('500 16\n')
+            for i, vector in enumerate(cls.vectors):
+                fout.write(f"w{i} " + ' '.join(map(repr, vector.tolist())) + '\n')
+        with open(cls.bin_path, 'wb') as fout:
+            fout.write(b'500 16\n')
+            for i, vector in enumerate(cls.vectors):
+                fout.write(f"w{i} ".encode('utf8') + vector.tobytes())
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.tmp_dir)
+
+    def _hammer(self, loader):
+        rand_state = np.random.RandomState(0)
+        indices = rand_state.randint(0, 500, size=(16, 400))
+
+        def lookup(row):
+            return [loader[index].tolist() for index in row]
+
+        with ThreadPoolExecutor(max_workers=16) as executor:
+            results = list(executor.map(lookup, indices.tolist()))
+        for row, vectors in zip(indices, results):
+            self.assertEqual(self.vectors[row].tolist(), vectors)
+
+    def _loaders(self, use_mmap):
+        byte_pos = _load_text_file(self.vec_path)[-1]
+        yield LowMemoryVecLoader(self.vec_path, byte_pos=byte_pos, use_mmap=use_mmap)
+        byte_pos = _load_bin_file(self.bin_path)[-1]
+        yield LowMemoryVecLoader(
+            self.bin_path, byte_pos=byte_pos, binary=True, use_mmap=use_mmap)
+
+    def test_concurrent_getitem_mmap(self):
+        for loader in self._loaders(use_mmap=True):
+            with self.subTest(binary=loader._binary):
+                self._hammer(loader)
+
+    def test_concurrent_getitem_pread(self):
+        for loader in self._loaders(use_mmap=False):
+            with self.subTest(binary=loader._binary):
+                self._hammer(loader)
+
+    def test_concurrent_getitem_lock(self):
+        with patch('word_embedder.embedders.keyed_vectors_light._HAS_PREAD', False):
+            for loader in self._loaders(use_mmap=False):
+                with self.subTest(binary=loader._binary):
+                    self._hammer(loader)
@@ -0,0 +1,181 @@
+from unittest import TestCase
+from unittest.mock import patch
+from os.path import abspath, dirname, join, exists
+import shutil
+import tempfile
+
+import numpy as np
+
+from ..cache import read_arrays
+from ..keyed_vectors import KeyedVectors
+from ..pq_keyed_vectors import PQKeyedVectors
+from .keyed_vectors_test_template import KeyedVectorsTestTemplate
+
+
+ROOT_DIR = dirname(abspath(__file__))
+
+
+class PQKeyedVectorsTestCase(KeyedVectorsTestTemplate, TestCase):
+
+    """One centroid per word and per dimension, so codes reconstruct vectors exactly"""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.path = join(self.tmp_dir, 'example.wepq')
+        self.source = KeyedVectors(path=join(ROOT_DIR, 'data/example.vec'), cache=False)
+        self.embedder = PQKeyedVectors(
+            path=self.path,
+            source=self.source,
+            n_subspaces=3,
+            n_centroids=5,
+        )
+        self.words = ['薄餡', '隼興', 'gb', 'en', 'Alvin']
+        self.vectors = np.array(
+            [
+                [0.1, 0.2, 0.3],
+                [0.4, 0.5, 0.6],
+                [0.7, 0.8, 0.9],
+                [0.11, 0.12, 0.13],
+                [0.14, 0.15, 0.16],
+            ],
+        ).astype(np.float32)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_correctly_create_instance(self):
+        self.assertEqual(
+            set(['_path', '_binary', '_index_type', '_cache', '_storage_dtype',
+                 '_max_vocab', '_keep_words', '_progress', '_is_built',
+                 '_source', '_n_subspaces', '_n_centroids', '_n_iter', '_train_size']),
+            set(self.embedder.__dict__.keys()),
+        )
+        self.assertFalse(self.embedder._is_built)
+
+    def test_build(self):
+        self.embedder.build()
+        self.assertTrue(self.embedder._is_built)
+        self.assertEqual(
+            set(['_path', '_binary', '_index_type', '_cache', '_storage_dtype',
+                 '_max_vocab', '_keep_words', '_progress', '_is_built',
+                 '_source', '_n_subspaces', '_n_centroids', '_n_iter', '_train_size',
+                 '_embedding_size', '_vocab_size', '_vocab_list', '_vocab_index',
+                 '_codebooks', '_codes', '_norms', '_reconstruction_error']),
+            set(self.embedder.__dict__.keys()),
+        )
+        self.assertEqual(self.words, self.embedder._vocab_list)
+        self.assertEqual((5, 3), self.embedder._codes.shape)
+        self.assertEqual(np.uint8, self.embedder._codes.dtype)
+        self.assertEqual((3, 5, 1), self.embedder._codebooks.shape)
+        self.assertAlmostEqual(0., self.embedder.reconstruction_error)
+
+    def test_norms(self):
+        with patch('word_embedder.embedders.pq_keyed_vectors.BLOCK_SIZE', 2):
+            self.embedder.build()
+        self.assertEqual(np.float32, self.embedder._norms.dtype)
+        np.testing.assert_allclose(
+            np.linalg.norm(self.vectors, axis=1), self.embedder._norms, rtol=1e-5)
+
+    def test_save_and_load(self):
+        self.embedder.build()
+        self.assertTrue(exists(self.path))
+        meta, arrays = read_arrays(self.path)
+        self.assertEqual(
+            set(['codebooks', 'codes', 'vocab_offsets', 'vocab_blob']),
+            set(arrays.keys()),
+        )
+
+        embedder = PQKeyedVectors(path=self.path)
+        embedder.build()
+        self.assertEqual(self.words, embedder.vocab)
+        self.assertEqual(self.vectors.tolist(), embedder.lookup_many(np.arange(5)).tolist())
+
+    def test_save_train_options(self):
+        self.embedder.build()
+        meta, _ = read_arrays(self.path)
+        self.assertEqual(join(ROOT_DIR, 'data/example.vec'), meta['source_path'])
+        self.assertEqual(3, meta['n_subspaces'])
+        self.assertEqual(5, meta['n_centroids'])
+        self.assertIn('source_mtime_ns', meta)
+
+    def test_retrain_with_other_options(self):
+        self.embedder.build()
+        embedder = PQKeyedVectors(path=self.path, source=self.source, n_subspaces=1, n_centroids=2)
+        embedder.build()
+        self.assertEqual((5, 1), embedder._codes.shape)
+        self.assertEqual(1, read_arrays(self.path)[0]['n_subspaces'])
+
+    def test_retrain_stale_source(self):
+        source_path = join(self.tmp_dir, 'example.vec')
+        shutil.copy(join(ROOT_DIR, 'data/example.vec'), source_path)
+        source = KeyedVectors(path=source_path, cache=False)
+        PQKeyedVectors(path=self.path, source=source, n_subspaces=3, n_centroids=5).build()
+
+        with open(source_path, 'w', encoding='utf8') as fout:
+            fout.write('6 3\n')
+            for word, vector in zip(self.words + ['kerker'], self.vectors.tolist() + [[1, 1, 1]]):
+                fout.write(' '.join([word] + [str(x) for x in vector]) + '\n')
+        with self.assertRaises(ValueError):
+            PQKeyedVectors(path=self.path).build()
+
+        source = KeyedVectors(path=source_path, cache=False)
+        embedder = PQKeyedVectors(path=self.path, source=source, n_subspaces=3, n_centroids=5)
+        embedder.build()
+        self.assertEqual(self.words + ['kerker'], embedder.vocab)
+
+    def test_no_file_and_no_source(self):
+        embedder = PQKeyedVectors(path=join(self.tmp_dir, 'missing.wepq'))
+        with self.assertRaises(FileNotFoundError):
+            embedder.build()
+
+    def test_n_subspaces_not_dividing_n_dim(self):
+        embedder = PQKeyedVectors(path=self.path, source=self.source, n_subspaces=2)
+        with self.assertRaises(ValueError):
+            embedder.build()
+
+    def test_too_many_centroids(self):
+        with self.assertRaises(ValueError):
+            PQKeyedVectors(path=self.path, source=self.source, n_centroids=257)
+
+
+class PQKeyedVectorsApproximationTestCase(TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        rand_state = np.random.RandomState(0)
+        self.vectors = rand_state.randn(2000, 8).astype(np.float32)
+        source_path = join(self.tmp_dir, 'random.vec')
+        with open(source_path, 'w', encoding='utf8') as fout:
+            fout.write(f"{self.vectors.shape[0]} {self.vectors.shape[1]}\n")
+            for i, vector in enumerate(self.vectors):
+                fout.write(f"w{i} " + ' '.join(repr(float(v)) for v in vector) + '\n')
+        self.embedder = PQKeyedVectors(
+            path=join(self.tmp_dir, 'random.wepq'),
+            source=KeyedVectors(path=source_path, cache=False),
+            n_subspaces=4,
+            n_centroids=64,
+            n_iter=10,
+        )
+        self.embedder.build()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_reconstruction_error(self):
+        reconstructed = self.embedder.lookup_many(np.arange(len(self.vectors)))
+        error = ((self.vectors - reconstructed) ** 2).sum() / (self.vectors ** 2).sum()
+        self.assertLess(error, 0.25)
+        self.assertAlmostEqual(error, self.embedder.reconstruction_error, places=5)
+
+    def test_asymmetric_search_matches_reconstruction(self):
+        query = self.vectors[:3]
+        indices, scores = self.embedder._search(
+            query / np.linalg.norm(query, axis=1, keepdims=True), topk=5, block_size=512)
+
+        reconstructed = self.embedder.lookup_many(np.arange(len(self.vectors)))
+        reconstructed /= np.linalg.norm(reconstructed, axis=1, keepdims=True)
+        expected = (query / np.linalg.norm(query, axis=1, keepdims=True)) @ reconstructed.T
+        np.testing.assert_allclose(
+            np.take_along_axis(expected, indices, axis=1), scores, rtol=1e-4, atol=1e-5)
+        np.testing.assert_allclose(
+            -np.sort(-expected, axis=1)[:, :5], scores, rtol=1e-4, atol=1e-5)
@@ -0,0 +1,54 @@
+from unittest import TestCase
+
+import numpy as np
+
+from ..quantization import dequantize, quantize
+
+
+class QuantizationTestCase(TestCase):
+
+    def setUp(self):
+        self.vectors = np.random.RandomState(0).randn(50, 8).astype(np.float32)
+        self.vectors[3] = 0.
+
+    def test_float32(self):
+        data, scales = quantize(self.vectors, 'float32')
+        self.assertIs(self.vectors, data)
+        self.assertIsNone(scales)
+
+    def test_float16(self):
+        data, scales = quantize(self.vectors, 'float16')
+        self.assertEqual(np.float16, data.dtype)
+        self.assertIsNone(scales)
+        vectors = dequantize(data)
+        self.assertEqual(np.float32, vectors.dtype)
+        np.testing.assert_allclose(self.vectors, vectors, rtol=1e-3, atol=1e-4)
+
+    def test_int8(self):
+        data, scales = quantize(self.vectors, 'int8')
+        self.assertEqual(np.int8, data.dtype)
+        self.assertEqual((50,), scales.shape)
+        self.assertEqual(127, np.abs(data[0]).max())
+        vectors = dequantize(data, scales)
+        self.assertEqual(np.float32, vectors.dtype)
+        self.assertTrue(
+            (np.abs(self.vectors - vectors) <= scales[:, None] / 2 + 1e-7).all())
+        self.assertFalse(vectors[3].any())
+
+    def test_dequantize_into_out(self):
+        data, scales = quantize(self.vectors, 'int8')
+        out = np.empty((2, 8), dtype=np.float32)
+        output = dequantize(data[[1, 2]], scales[[1, 2]], out=out)
+        self.assertIs(out, output)
+        self.assertEqual(dequantize(data, scales)[[1, 2]].tolist(), out.tolist())
+
+    def test_dequantize_row(self):
+        data, scales = quantize(self.vectors, 'int8')
+        self.assertEqual(
+            dequantize(data, scales)[5].tolist(),
+            dequantize(data[5], scales[5]).tolist(),
+        )
+
+    def test_unknown_storage_dtype(self):
+        with self.assertRaises(ValueError):
+            quantize(self.vectors, 'int4')
@@ -0,0 +1,169 @@
+from io import BytesIO
+from os.path import abspath, dirname, join
+from unittest import TestCase
+
+import numpy as np
+
+from ..readers import (
+    iter_bin_records,
+    iter_line_blocks,
+    parse_text_block,
+    parse_text_range,
+    read_bin_records,
+    split_line_ranges,
+)
+
+
+ROOT_DIR = dirname(abspath(__file__))
+
+
+class IterLineBlocksTestCase(TestCase):
+
+    def test_blocks_end_with_complete_lines(self):
+        data = 'a 1 2\nbb 3 4\n薄餡 5 6\n'.encode('utf8')
+        blocks = list(iter_line_blocks(BytesIO(data), chunk_size=4))
+        self.assertEqual(data, b''.join(blocks))
+        for block in blocks:
+            self.assertTrue(block.endswith(b'\n'))
+
+    def test_last_line_without_newline(self):
+        data = b'a 1 2\nb 3 4'
+        self.assertEqual(
+            [b'a 1 2\n', b'b 3 4'],
+            list(iter_line_blocks(BytesIO(data), chunk_size=6)),
+        )
+
+    def test_empty(self):
+        self.assertEqual([], list(iter_line_blocks(BytesIO(b''))))
+
+
+class ParseTextBlockTestCase(TestCase):
+
+    def test_parse(self):
+        block = '薄餡 0.1 0.2 0.3 \r\n\ngb -1e-3 5 6\n'.encode('utf8')
+        words, vectors = parse_text_block(block, n_dim=3)
+        self.assertEqual(['薄餡', 'gb'], words)
+        self.assertEqual(np.float32, vectors.dtype)
+        self.assertEqual(
+            np.array([[0.1, 0.2, 0.3], [-1e-3, 5, 6]], dtype=np.float32).tolist(),
+            vectors.tolist(),
+        )
+
+    def test_parse_empty_word(self):
+        words, vectors = parse_text_block(b' 1 2\nx 3 4\n', n_dim=2)
+        self.assertEqual(['', 'x'], words)
+        self.assertEqual([[1., 2.], [3., 4.]], vectors.tolist())
+
+    def test_parse_empty(self):
+        words, vectors = parse_text_block(b'\n\n', n_dim=3)
+        self.assertEqual([], words)
+        self.assertEqual((0, 3), vectors.shape)
+
+    def test_parse_wrong_dim(self):
+        with self.assertRaises(ValueError):
+            parse_text_block(b'a 1 2\nb 3 4\n', n_dim=3)
+
+
+class SplitLineRangesTestCase(TestCase):
+
+    def setUp(self):
+        with open(join(ROOT_DIR, 'data/example.vec'), 'rb') as fin:
+            self.data = fin.read()
+        self.start = self.data.index(b'\n') + 1
+
+    def test_split(self):
+        for range_size in [1, 7, 19, 30, 1000]:
+            with self.subTest(range_size=range_size):
+                ranges = split_line_ranges(
+                    BytesIO(self.data), self.start, len(self.data), range_size=range_size)
+                self.assertEqual(self.start, ranges[0][0])
+                self.assertEqual(len(self.data), ranges[-1][1])
+                for (_, end), (start, _) in zip(ranges[:-1], ranges[1:]):
+                    self.assertEqual(end, start)
+                    self.assertEqual(b'\n', self.data[end - 1: end])
+                lines = [self.data[start: end] for start, end in ranges]
+                self.assertEqual(self.data[self.start:], b''.join(lines))
+
+    def test_parse_text_range(self):
+        path = join(ROOT_DIR, 'data/example.vec')
+        words = []
+        for start, end in split_line_ranges(
+                BytesIO(self.data), self.start, len(self.data), range_size=30):
+            range_words, vectors = parse_text_range(path, start, end, n_dim=3)
+            self.assertEqual((len(range_words), 3), vectors.shape)
+            words.extend(range_words)
+        self.assertEqual(['薄餡', '隼興', 'gb', 'en', 'Alvin'], words)
+
+
+class ReadBinRecordsTestCase(TestCase):
+
+    def setUp(self):
+        self.words = ['薄餡', '隼興', 'gb', 'en', 'Alvin']
+        self.vectors = np.array(
+            [
+                [0.1, 0.2, 0.3],
+                [0.4, 0.5, 0.6],
+                [0.7, 0.8, 0.9],
+                [0.11, 0.12, 0.13],
+                [0.14, 0.15, 0.16],
+            ],
+        ).astype(np.float32)
+
+    def _read(self, fin, chunk_size):
+        fin.readline()
+        word_vectors = np.zeros((5, 3), dtype=np.float32)
+        byte_pos = np.zeros(5, dtype=np.int64)
+        vocab_list = read_bin_records(
+            fin,
+            vocab_size=5,
+            n_dim=3,
+            word_vectors=word_vectors,
+            byte_pos=byte_pos,
+            chunk_size=chunk_size,
+        )
+        return vocab_list, word_vectors, byte_pos
+
+    def test_read(self):
+        with open(join(ROOT_DIR, 'data/example.bin'), 'rb') as fin:
+            data = fin.read()
+        for chunk_size in [1, 7, 1 << 20]:
+            with self.subTest(chunk_size=chunk_size):
+                vocab_list, word_vectors, byte_pos = self._read(
+                    BytesIO(data), chunk_size)
+                self.assertEqual(self.words, vocab_list)
+                self.assertEqual(self.vectors.tolist(), word_vectors.tolist())
+                for i, pos in enumerate(byte_pos):
+                    self.assertEqual(
+                        self.vectors[i].tobytes(), data[pos: pos + 12])
+
+    def test_newlines_in_front_of_words(self):
+        data = b'5 3\n' + b''.join(
+            b'\n' + word.encode('utf8') + b' ' + vector.tobytes()
+            for word, vector in zip(self.words, self.vectors)
+        )
+        vocab_list, word_vectors, _ = self._read(BytesIO(data), chunk_size=5)
+        self.assertEqual(self.words, vocab_list)
+        self.assertEqual(self.vectors.tolist(), word_vectors.tolist())
+
+    def test_truncated(self):
+        with open(join(ROOT_DIR, 'data/example.bin'), 'rb') as fin:
+            data = fin.read()
+        with self.assertRaises(EOFError):
+            self._read(BytesIO(data[:-4]), chunk_size=8)
+
+    def test_iter_bin_records(self):
+        with open(join(ROOT_DIR, 'data/example.bin'), 'rb') as fin:
+            fin.readline()
+            blocks = list(iter_bin_records(fin, vocab_size=5, n_dim=3, chunk_size=40))
+        self.assertGreater(len(blocks), 1)
+        self.assertEqual(self.words, [word for words, _, _ in blocks for word in words])
+        self.assertEqual(
+            self.vectors.tolist(),
+            np.concatenate([vectors for _, vectors, _ in blocks]).tolist(),
+        )
+
+    def test_iter_bin_records_without_vectors(self):
+        with open(join(ROOT_DIR, 'data/example.bin'), 'rb') as fin:
+            fin.readline()
+            for _, vectors, _ in iter_bin_records(fin, vocab_size=5, n_dim=3, with_vectors=False):
+                self.assertIsNone(vectors)
@@ -0,0 +1,168 @@
+from unittest import TestCase, skipIf
+from unittest.mock import patch
+from os.path import abspath, dirname, join
+import multiprocessing
+import os
+import subprocess
+import sys
+import uuid
+
+import numpy as np
+
+from .. import shared_keyed_vectors
+from ..shared_keyed_vectors import SharedKeyedVectors, resource_tracker
+from .keyed_vectors_test_template import KeyedVectorsTestTemplate
+
+
+ROOT_DIR = dirname(abspath(__file__))
+
+
+def _read_in_worker(name, words, path=None):
+    embedder = SharedKeyedVectors(name=name, path=path, cache=False)
+    embedder.build()
+    result = (
+        embedder._owner,
+        embedder.get_indices(words).tolist(),
+        embedder.get_vectors_batch(words)[0].tolist(),
+    )
+    embedder.close()
+    return result
+
+
+class SharedKeyedVectorsTestCase(KeyedVectorsTestTemplate, TestCase):
+
+    def setUp(self):
+        self.name = f"we-test-{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self.embedder = SharedKeyedVectors(
+            name=self.name,
+            path=join(ROOT_DIR, 'data/example.vec'),
+            cache=False,
+        )
+        self.words = ['薄餡', '隼興', 'gb', 'en', 'Alvin']
+        self.vectors = np.array(
+            [
+                [0.1, 0.2, 0.3],
+                [0.4, 0.5, 0.6],
+                [0.7, 0.8, 0.9],
+                [0.11, 0.12, 0.13],
+                [0.14, 0.15, 0.16],
+            ],
+        ).astype(np.float32)
+
+    def tearDown(self):
+        self.embedder.close()
+        self.embedder.unlink()
+
+    def test_correctly_create_instance(self):
+        self.assertEqual(
+            set(['_path', '_binary', '_index_type', '_cache', '_storage_dtype',
+                 '_max_vocab', '_keep_words', '_progress', '_is_built', '_name', '_timeout']),
+            set(self.embedder.__dict__.keys()),
+        )
+        self.assertFalse(self.embedder._is_built)
+
+    def test_build(self):
+        self.embedder.build()
+        self.assertTrue(self.embedder._is_built)
+        self.assertTrue(self.embedder._owner)
+        self.assertEqual(
+            set(['_path', '_binary', '_index_type', '_cache', '_storage_dtype',
+                 '_max_vocab', '_keep_words', '_progress', '_is_built', '_name', '_timeout',
+                 '_shm', '_owner', '_embedding_size', '_vocab_size',
+                 '_word_vectors', '_scales', '_vocab_list', '_vocab_index']),
+            set(self.embedder.__dict__.keys()),
+        )
+        self.assertEqual(self.words, self.embedder._vocab_list)
+        self.assertEqual(self.vectors.tolist(), self.embedder._word_vectors.tolist())
+
+    def test_attach(self):
+        self.embedder.build()
+        with SharedKeyedVectors(name=self.name) as embedder:
+            self.assertFalse(embedder._owner)
+            self.assertEqual(self.words, list(embedder.vocab))
+            self.assertEqual(self.vectors[2].tolist(), embedder['gb'].tolist())
+            self.assertEqual(3, embedder.get_index('en'))
+        self.assertFalse(embedder._is_built)
+
+    @skipIf(sys.version_info >= (3, 13), 'attaching is not tracked since python 3.13')
+    def test_attach_unregisters_from_tracker(self):
+        self.embedder.build()
+        register = resource_tracker.register
+        with patch.object(
+                resource_tracker, 'unregister', wraps=resource_tracker.unregister) as unregister:
+            # as if the segment were created by another process
+            with patch.object(shared_keyed_vectors, '_CREATED_NAMES', set()):
+                with SharedKeyedVectors(name=self.name) as embedder:
+                    self.assertIs(register, resource_tracker.register)
+            unregister.assert_called_once_with(embedder._shm._name, 'shared_memory')
+            # the creating process keeps its registration
+            with SharedKeyedVectors(name=self.name):
+                pass
+            unregister.assert_called_once()
+
+    def test_create_attach_unlink_in_one_process(self):
+        code = (
+            'from word_embedder.embedders import SharedKeyedVectors\n'
+            f'owner = SharedKeyedVectors(name={self.name!r}, path={self.embedder._path!r},'
+            ' cache=False)\n'
+            'owner.build()\n'
+            f'with SharedKeyedVectors(name={self.name!r}) as embedder:\n'
+            "    assert embedder['gb'].tolist() == owner['gb'].tolist()\n"
+            'owner.close()\n'
+            'owner.unlink()\n'
+        )
+        completed = subprocess.run(
+            [sys.executable, '-c', code],
+            cwd=dirname(dirname(dirname(ROOT_DIR))),
+            stderr=subprocess.PIPE,
+            universal_newlines=True,
+        )
+        self.assertEqual(0, completed.returncode, completed.stderr)
+        self.assertEqual('', completed.stderr)
+
+    def test_attach_storage_dtype(self):
+        embedder = SharedKeyedVectors(
+            name=self.name,
+            path=join(ROOT_DIR, 'data/example.vec'),
+            cache=False,
+            storage_dtype='int8',
+        )
+        embedder.build()
+        with SharedKeyedVectors(name=self.name) as attached:
+            self.assertEqual('int8', attached._storage_dtype)
+            self.assertEqual((5,), attached._scales.shape)
+            np.testing.assert_allclose(self.vectors[2], attached['gb'], rtol=1e-2)
+        embedder.close()
+
+    def test_attach_missing_segment(self):
+        with self.assertRaises(FileNotFoundError):
+            SharedKeyedVectors(name=self.name).build()
+
+    def test_close_with_referenced_vectors(self):
+        self.embedder.build()
+        vector = self.embedder['gb']
+        with self.assertWarns(RuntimeWarning):
+            self.embedder.close()
+        del vector
+
+    def test_processes_attach(self):
+        self.embedder.build()
+        words = ['gb', 'kerker', 'Alvin']
+        with multiprocessing.get_context('spawn').Pool(3) as pool:
+            results = pool.starmap(_read_in_worker, [(self.name, words)] * 3)
+        for owner, indices, vectors in results:
+            self.assertFalse(owner)
+            self.assertEqual([2, -1, 4], indices)
+            self.assertEqual(self.vectors[[2, 4]].tolist(), [vectors[0], vectors[2]])
+        # workers exiting do not destroy the segment
+        with SharedKeyedVectors(name=self.name) as embedder:
+            self.assertEqual(self.words, list(embedder.vocab))
+
+    def test_processes_race_to_create(self):
+        path = join(ROOT_DIR, 'data/example.vec')
+        with multiprocessing.get_context('spawn').Pool(3) as pool:
+            results = pool.starmap(_read_in_worker, [(self.name, ['en'], path)] * 3)
+        self.assertEqual(1, sum(owner for owner, _, _ in results))
+        for _, indices, vectors in results:
+            self.assertEqual([3], indices)
+            self.assertEqual(self.vectors[[3]].tolist(), vectors)
@@ -0,0 +1,48 @@
+from unittest import TestCase
+
+import numpy as np
+
+from ..similarity import normalize_blocks, normalize_rows, top_k_similar
+
+
+class NormalizeTestCase(TestCase):
+
+    def test_normalize_rows(self):
+        output = normalize_rows(np.array([[3, 4], [0, 0]]))
+        self.assertEqual(np.float32, output.dtype)
+        np.testing.assert_allclose([[0.6, 0.8], [0., 0.]], output)
+
+    def test_normalize_blocks(self):
+        matrix = np.random.RandomState(0).rand(10, 4)
+        out = np.empty((10, 4), dtype=np.float32)
+        normalize_blocks(lambda start, end: matrix[start: end], 10, out=out, block_size=3)
+        np.testing.assert_allclose(normalize_rows(matrix), out)
+
+
+class TopKSimilarTestCase(TestCase):
+
+    def setUp(self):
+        rand_state = np.random.RandomState(2018)
+        self.vectors = normalize_rows(rand_state.randn(1000, 8))
+        self.queries = normalize_rows(rand_state.randn(5, 8))
+
+    def test_top_k_similar(self):
+        expected_scores = self.queries @ self.vectors.T
+        expected_indices = np.argsort(-expected_scores, axis=1)[:, :10]
+        for block_size in [1, 7, 100, 5000]:
+            with self.subTest(block_size=block_size):
+                indices, scores = top_k_similar(
+                    self.vectors, self.queries, topk=10, block_size=block_size)
+                self.assertEqual((5, 10), indices.shape)
+                np.testing.assert_array_equal(expected_indices, indices)
+                np.testing.assert_allclose(
+                    np.take_along_axis(expected_scores, expected_indices, axis=1),
+                    scores,
+                    rtol=1e-6,
+                )
+
+    def test_topk_larger_than_vocab(self):
+        indices, scores = top_k_similar(
+            self.vectors[:3], self.queries, topk=10, block_size=2)
+        self.assertEqual((5, 3), indices.shape)
+        self.assertEqual([0, 1, 2], sorted(indices[0].tolist()))
@@ -0,0 +1,83 @@
+from os.path import join
+import tempfile
+from unittest import TestCase
+
+import numpy as np
+
+from ..keyed_vectors import KeyedVectors
+from ..oov_error import OOVError
+from ..subword_embedder import SubwordEmbedder
+from ..subwords import char_ngrams, fasttext_hash
+from .test_subwords import write_fasttext_bin
+
+
+class SubwordEmbedderTestCase(TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        path = join(self.tmp_dir.name, 'chars.vec')
+        with open(path, 'w') as fout:
+            fout.write('4 2\n蘋 1 0\n果 0 1\n汁 1 1\n蘋果 2 2\n')
+        self.inner = KeyedVectors(path=path, cache=False)
+        self.embedder = SubwordEmbedder(self.inner, minn=1, maxn=2)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_build(self):
+        self.embedder.build()
+        self.assertTrue(self.inner._is_built)
+        self.assertEqual(4, self.embedder.n_vocab)
+        self.assertEqual(2, self.embedder.n_dim)
+        self.assertEqual(['蘋', '果', '汁', '蘋果'], self.embedder.vocab)
+
+    def test_getitem(self):
+        self.embedder.build()
+        self.assertEqual([2., 2.], self.embedder['蘋果'].tolist())
+        self.assertEqual([0., 1.], self.embedder[1].tolist())
+        self.assertEqual([0.5, 1.], self.embedder['果汁'].tolist())
+
+    def test_getitem_oov(self):
+        self.embedder.build()
+        with self.assertRaises(OOVError):
+            self.embedder['台北']
+        with self.assertRaises(OOVError):
+            self.embedder[10]
+
+    def test_get_vectors_batch(self):
+        self.embedder.build()
+        vectors, oov_mask = self.embedder.get_vectors_batch(['果汁', '台北', '汁'])
+        self.assertEqual([False, True, False], oov_mask.tolist())
+        self.assertEqual([[0.5, 1.], [0., 0.], [1., 1.]], vectors.tolist())
+
+    def test_get_vectors_batch_int(self):
+        self.embedder.build()
+        vectors, oov_mask = self.embedder.get_vectors_batch(np.array([3, 7]))
+        self.assertEqual([False, True], oov_mask.tolist())
+        self.assertEqual([[2., 2.], [0., 0.]], vectors.tolist())
+
+    def test_release(self):
+        self.embedder.build()
+        self.embedder.release()
+        self.assertFalse(self.embedder._is_built)
+        self.assertFalse(self.inner._is_built)
+        self.assertNotIn('_ngrams', self.embedder.__dict__)
+
+    def test_fasttext(self):
+        path = join(self.tmp_dir.name, 'model.bin')
+        matrix = np.random.RandomState(2018).randn(4 + 20, 2).astype(np.float32)
+        write_fasttext_bin(path, ['蘋', '果', '汁', '蘋果'], matrix, minn=1, maxn=2, bucket=20)
+        embedder = SubwordEmbedder(self.inner, fasttext_path=path)
+        embedder.build()
+        rows = [
+            4 + fasttext_hash(ngram.encode('utf8')) % 20
+            for ngram in char_ngrams('台北', 1, 2, bow='<', eow='>')
+        ]
+        np.testing.assert_allclose(matrix[rows].mean(axis=0), embedder['台北'], rtol=1e-6)
+        self.assertEqual([2., 2.], embedder['蘋果'].tolist())
+
+    def test_fasttext_wrong_dim(self):
+        path = join(self.tmp_dir.name, 'model.bin')
+        write_fasttext_bin(path, ['蘋'], np.zeros((11, 3)), minn=1, maxn=2, bucket=10)
+        with self.assertRaises(ValueError):
+            SubwordEmbedder(self.inner, fasttext_path=path).build()
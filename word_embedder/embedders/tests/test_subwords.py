@@ -0,0 +1,166 @@
+from os.path import abspath, dirname, join
+import struct
+import tempfile
+from unittest import TestCase
+
+import numpy as np
+
+from ..keyed_vectors import KeyedVectors
+from ..subwords import (
+    FASTTEXT_MAGIC,
+    FastTextNgrams,
+    NgramTable,
+    VocabNgrams,
+    char_ngrams,
+    fasttext_hash,
+)
+
+
+ROOT_DIR = dirname(abspath(__file__))
+
+
+def write_fasttext_bin(
+        path: str,
+        words: list,
+        matrix: np.ndarray,
+        minn: int,
+        maxn: int,
+        bucket: int,
+        pruned: dict = None,
+    ) -> None:
+    """Write a minimal fastText .bin model, matrix has len(words) + bucket rows"""
+    with open(path, 'wb') as fout:
+        fout.write(struct.pack('<ii', FASTTEXT_MAGIC, 12))
+        # dim, ws, epoch, min_count, neg, word_ngrams, loss, model,
+        # bucket, minn, maxn, lr_update_rate
+        args = (matrix.shape[1], 5, 5, 1, 5, 1, 2, 2, bucket, minn, maxn, 100)
+        fout.write(struct.pack('<12i', *args))
+        fout.write(struct.pack('<d', 1e-4))
+        fout.write(struct.pack('<3i', len(words), len(words), 0))
+        fout.write(struct.pack('<2q', 100, -1 if pruned is None else len(pruned)))
+        for word in words:
+            fout.write(word.encode('utf8') + b'\x00' + struct.pack('<qb', 10, 0))
+        for key, value in (pruned or {}).items():
+            fout.write(struct.pack('<ii', key, value))
+        fout.write(b'\x00')
+        fout.write(struct.pack('<2q', *matrix.shape))
+        fout.write(matrix.astype(np.float32).tobytes())
+
+
+class CharNgramsTestCase(TestCase):
+
+    def test_char_ngrams(self):
+        self.assertEqual(
+            ['蘋', '蘋果', '果', '果汁', '汁'],
+            char_ngrams('蘋果汁', minn=1, maxn=2),
+        )
+
+    def test_char_ngrams_with_boundaries(self):
+        # same as fastText get_subwords
+        self.assertEqual(
+            ['<蘋', '<蘋果', '蘋', '蘋果', '蘋果汁', '果', '果汁', '果汁>', '汁', '汁>'],
+            char_ngrams('蘋果汁', minn=1, maxn=3, bow='<', eow='>'),
+        )
+        self.assertEqual(
+            ['<ab', 'ab>'],
+            char_ngrams('ab', minn=3, maxn=3, bow='<', eow='>'),
+        )
+
+    def test_fasttext_hash(self):
+        # reference FNV-1a of ASCII
+        self.assertEqual(0xe40c292c, fasttext_hash(b'a'))
+        # bucket of a fastText model trained with bucket=5000
+        self.assertEqual(1608, fasttext_hash('<蘋'.encode('utf8')) % 5000)
+
+
+class NgramTableTestCase(TestCase):
+
+    def test_abstract(self):
+        class NoLookup(NgramTable):
+
+            n_dim = 2
+
+            def ngram_ids(self, word):
+                return []
+
+        with self.assertRaises(TypeError):
+            NoLookup()
+
+
+class FastTextNgramsTestCase(TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.path = join(self.tmp_dir.name, 'model.bin')
+        self.words = ['apple', '蘋果']
+        self.bucket = 50
+        self.matrix = np.random.RandomState(2018).randn(
+            len(self.words) + self.bucket, 4).astype(np.float32)
+        write_fasttext_bin(self.path, self.words, self.matrix, minn=2, maxn=3, bucket=self.bucket)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def expected_vector(self, word: str) -> np.ndarray:
+        rows = [
+            len(self.words) + fasttext_hash(ngram.encode('utf8')) % self.bucket
+            for ngram in char_ngrams(word, 2, 3, bow='<', eow='>')
+        ]
+        return self.matrix[rows].mean(axis=0)
+
+    def test_read_header(self):
+        ngrams = FastTextNgrams(self.path)
+        self.assertEqual((2, 3, 50, 4), (ngrams.minn, ngrams.maxn, ngrams.bucket, ngrams.n_dim))
+        self.assertEqual((52, 4), ngrams._matrix.shape)
+        np.testing.assert_array_equal(self.matrix, ngrams._matrix)
+
+    def test_compose(self):
+        ngrams = FastTextNgrams(self.path)
+        words = ['蘋果汁', 'pineapple', '蘋果汁']
+        vectors, found_mask = ngrams.compose(words)
+        self.assertEqual([True, True, True], found_mask.tolist())
+        for i, word in enumerate(words):
+            with self.subTest(word=word):
+                np.testing.assert_allclose(self.expected_vector(word), vectors[i], rtol=1e-6)
+
+    def test_pruned(self):
+        bucket_id = fasttext_hash('<a'.encode('utf8')) % self.bucket
+        write_fasttext_bin(
+            self.path, self.words, self.matrix[:3], minn=2, maxn=2, bucket=self.bucket,
+            pruned={bucket_id: 0},
+        )
+        vectors, found_mask = FastTextNgrams(self.path).compose(['ab', 'b'])
+        self.assertEqual([True, False], found_mask.tolist())
+        self.assertEqual(self.matrix[2].tolist(), vectors[0].tolist())
+        self.assertEqual([0.] * 4, vectors[1].tolist())
+
+    def test_not_fasttext(self):
+        with self.assertRaises(ValueError):
+            FastTextNgrams(join(ROOT_DIR, 'data/example.bin'))
+
+
+class VocabNgramsTestCase(TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        path = join(self.tmp_dir.name, 'chars.vec')
+        with open(path, 'w') as fout:
+            fout.write('4 2\n蘋 1 0\n果 0 1\n汁 1 1\n蘋果 2 2\n')
+        self.embedder = KeyedVectors(path=path, cache=False)
+        self.embedder.build()
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_compose(self):
+        ngrams = VocabNgrams(self.embedder, minn=1, maxn=2)
+        vectors, found_mask = ngrams.compose(['蘋果汁', '台北', '果汁'])
+        self.assertEqual([True, False, True], found_mask.tolist())
+        # 蘋, 蘋果, 果, 汁
+        self.assertEqual([1., 1.], vectors[0].tolist())
+        self.assertEqual([0., 0.], vectors[1].tolist())
+        self.assertEqual([0.5, 1.], vectors[2].tolist())
+
+    def test_word_itself_excluded(self):
+        ngrams = VocabNgrams(self.embedder, minn=1, maxn=2)
+        self.assertEqual([0, 1], sorted(ngrams.ngram_ids('蘋果')))
@@ -0,0 +1,163 @@
+import gzip
+import hashlib
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from os.path import abspath, dirname, exists, join
+import pathlib
+import tempfile
+import threading
+from unittest import TestCase
+
+from ..utils import (
+    DOWNLOAD_SUFFIX,
+    PART_SUFFIX,
+    SourceReader,
+    download_data,
+    extract_gz,
+    fetch_file,
+    open_url,
+)
+
+
+ROOT_DIR = dirname(abspath(__file__))
+
+
+class RangeHandler(BaseHTTPRequestHandler):
+
+    """Serve server.content, honouring Range: bytes=N-"""
+
+    def do_GET(self):
+        content = self.server.content
+        self.server.ranges.append(self.headers.get('Range'))
+        start = 0
+        if self.headers.get('Range'):
+            start = int(self.headers['Range'][len('bytes='):-1])
+            if start >= len(content):
+                self.send_response(416)
+                self.end_headers()
+                return
+            self.send_response(206)
+        else:
+            self.send_response(200)
+        self.send_header('Content-Length', str(len(content) - start))
+        self.end_headers()
+        self.wfile.write(content[start:])
+
+    def log_message(self, *args):
+        pass
+
+
+class UtilsTestCase(TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        with open(join(ROOT_DIR, 'data/example.vec'), 'rb') as fin:
+            self.content = fin.read()
+        self.gz_path = join(self.tmp_dir.name, 'example.vec.gz')
+        with gzip.open(self.gz_path, 'wb') as fout:
+            fout.write(self.content)
+        with open(self.gz_path, 'rb') as fin:
+            self.gz_content = fin.read()
+        self.path = join(self.tmp_dir.name, 'out', 'example.vec')
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def serve(self, content: bytes) -> str:
+        server = HTTPServer(('127.0.0.1', 0), RangeHandler)
+        server.content = content
+        server.ranges = []
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        self.server = server
+        return f"http://127.0.0.1:{server.server_port}/example.vec.gz"
+
+    def assert_fetched(self):
+        with open(self.path, 'rb') as fin:
+            self.assertEqual(self.content, fin.read())
+        self.assertFalse(exists(self.path + PART_SUFFIX))
+        self.assertFalse(exists(self.path + DOWNLOAD_SUFFIX))
+
+    def test_open_url_local_gz(self):
+        with open_url(pathlib.Path(self.gz_path).as_uri(), self.path) as fin:
+            self.assertEqual(self.content.splitlines(True)[0], fin.readline())
+            self.assertFalse(exists(self.path))
+        # the rest is saved even if the caller stops early
+        self.assert_fetched()
+
+    def test_fetch_file_not_gzipped(self):
+        fetch_file(join(ROOT_DIR, 'data/example.vec'), self.path)
+        self.assert_fetched()
+
+    def test_fetch_file_http(self):
+        progress = []
+        fetch_file(
+            self.serve(self.gz_content),
+            self.path,
+            progress=lambda done, total: progress.append((done, total)),
+        )
+        self.assert_fetched()
+        self.assertEqual((len(self.gz_content), len(self.gz_content)), progress[-1])
+
+    def test_resume_http(self):
+        url = self.serve(self.gz_content)
+        pathlib.Path(self.path).parent.mkdir()
+        with open(self.path + DOWNLOAD_SUFFIX, 'wb') as fout:
+            fout.write(self.gz_content[:20])
+        fetch_file(url, self.path)
+        self.assertEqual(['bytes=20-'], self.server.ranges)
+        self.assert_fetched()
+
+    def test_resume_http_complete(self):
+        url = self.serve(self.gz_content)
+        pathlib.Path(self.path).parent.mkdir()
+        with open(self.path + DOWNLOAD_SUFFIX, 'wb') as fout:
+            fout.write(self.gz_content)
+        fetch_file(url, self.path)
+        self.assert_fetched()
+
+    def test_sha256(self):
+        sha256 = hashlib.sha256(self.gz_content).hexdigest()
+        fetch_file(self.serve(self.gz_content), self.path, sha256=sha256)
+        self.assert_fetched()
+
+    def test_sha256_mismatch(self):
+        with self.assertRaises(ValueError):
+            fetch_file(self.serve(self.gz_content), self.path, sha256='0' * 64)
+        self.assertFalse(exists(self.path))
+        self.assertFalse(exists(self.path + PART_SUFFIX))
+        self.assertFalse(exists(self.path + DOWNLOAD_SUFFIX))
+
+    def test_error_keeps_download(self):
+        with self.assertRaises(RuntimeError):
+            with open_url(self.serve(self.gz_content), self.path) as fin:
+                fin.read()
+                raise RuntimeError
+        self.assertFalse(exists(self.path))
+        self.assertFalse(exists(self.path + PART_SUFFIX))
+        with open(self.path + DOWNLOAD_SUFFIX, 'rb') as fin:
+            self.assertEqual(self.gz_content, fin.read())
+
+    def test_download_data_resume_complete(self):
+        url = self.serve(self.gz_content)
+        pathlib.Path(self.path).parent.mkdir()
+        with open(self.path + '.gz' + DOWNLOAD_SUFFIX, 'wb') as fout:
+            fout.write(self.gz_content)
+        download_data(url, self.path + '.gz')
+        self.assertFalse(exists(self.path + '.gz' + DOWNLOAD_SUFFIX))
+        with open(self.path + '.gz', 'rb') as fin:
+            self.assertEqual(self.gz_content, fin.read())
+
+    def test_is_download(self):
+        download_path = self.gz_path + DOWNLOAD_SUFFIX
+        with SourceReader(self.serve(self.gz_content), download_path=download_path) as fin:
+            self.assertTrue(fin.is_download)
+        with SourceReader(self.gz_path, download_path=download_path) as fin:
+            self.assertFalse(fin.is_download)
+
+    def test_download_data_and_extract_gz(self):
+        download_data(self.serve(self.gz_content), self.path + '.gz')
+        extract_gz(self.path + '.gz')
+        self.assertFalse(exists(self.path + '.gz'))
+        self.assert_fetched()
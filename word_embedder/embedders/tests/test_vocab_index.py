@@ -0,0 +1,103 @@
+from unittest import TestCase
+
+from ..cache import pack_vocab
+from ..vocab_index import (
+    build_packed_table,
+    build_vocab_index,
+    HashVocabIndex,
+    PackedVocabIndex,
+    SortedVocabIndex,
+)
+
+
+class VocabIndexTestCase(TestCase):
+
+    def setUp(self):
+        self.vocab_list = ['薄餡', '隼興', 'gb', 'en', 'Alvin', 'gb']
+
+    def test_build_vocab_index(self):
+        self.assertIsInstance(
+            build_vocab_index(self.vocab_list), HashVocabIndex)
+        self.assertIsInstance(
+            build_vocab_index(self.vocab_list, index_type='sorted'),
+            SortedVocabIndex,
+        )
+
+    def test_build_vocab_index_wrong_type(self):
+        with self.assertRaises(ValueError):
+            build_vocab_index(self.vocab_list, index_type='trie')
+
+    def test_get(self):
+        for index_type in ['hash', 'sorted']:
+            vocab_index = build_vocab_index(
+                self.vocab_list, index_type=index_type)
+            for i, word in enumerate(self.vocab_list[:5]):
+                with self.subTest(index_type=index_type, i=i):
+                    self.assertEqual(i, vocab_index.get(word))
+
+    def test_get_duplicated_returns_first(self):
+        for index_type in ['hash', 'sorted']:
+            vocab_index = build_vocab_index(
+                self.vocab_list, index_type=index_type)
+            with self.subTest(index_type=index_type):
+                self.assertEqual(2, vocab_index.get('gb'))
+
+    def test_get_oov(self):
+        for index_type in ['hash', 'sorted']:
+            vocab_index = build_vocab_index(
+                self.vocab_list, index_type=index_type)
+            with self.subTest(index_type=index_type):
+                self.assertEqual(-1, vocab_index.get('haha'))
+                self.assertEqual(-1, vocab_index.get('zzz'))
+                self.assertEqual(-1, vocab_index.get(''))
+
+    def test_get_many(self):
+        for index_type in ['hash', 'sorted']:
+            vocab_index = build_vocab_index(
+                self.vocab_list, index_type=index_type)
+            with self.subTest(index_type=index_type):
+                self.assertEqual(
+                    [4, -1, 2, 0],
+                    vocab_index.get_many(['Alvin', 'haha', 'gb', '薄餡']).tolist(),
+                )
+
+
+class PackedVocabIndexTestCase(TestCase):
+
+    def setUp(self):
+        self.vocab_list = ['薄餡', '隼興', 'gb', 'en', 'Alvin', 'gb', '']
+        offsets, blob = pack_vocab(self.vocab_list)
+        self.vocab_index = PackedVocabIndex(offsets, blob, build_packed_table(offsets, blob))
+
+    def test_get(self):
+        for i, word in enumerate(self.vocab_list[:5]):
+            with self.subTest(i=i):
+                self.assertEqual(i, self.vocab_index.get(word))
+
+    def test_get_duplicated_returns_first(self):
+        self.assertEqual(2, self.vocab_index.get('gb'))
+
+    def test_get_oov(self):
+        self.assertEqual(-1, self.vocab_index.get('haha'))
+        self.assertEqual(-1, self.vocab_index.get('g'))
+        self.assertEqual(-1, self.vocab_index.get('\ud800'))
+
+    def test_get_empty_word(self):
+        self.assertEqual(6, self.vocab_index.get(''))
+
+    def test_get_many(self):
+        self.assertEqual(
+            [1, -1, 4],
+            self.vocab_index.get_many(['隼興', 'haha', 'Alvin']).tolist(),
+        )
+
+    def test_len(self):
+        self.assertEqual(6, len(self.vocab_index))
+
+    def test_collisions(self):
+        vocab_list = [str(i) for i in range(5000)]
+        offsets, blob = pack_vocab(vocab_list)
+        table = build_packed_table(offsets, blob)
+        vocab_index = PackedVocabIndex(offsets, blob, table)
+        self.assertEqual(list(range(5000)), vocab_index.get_many(vocab_list).tolist())
+        self.assertEqual(-1, vocab_index.get('5000'))
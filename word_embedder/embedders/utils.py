@@ -1,12 +1,239 @@
+from contextlib import contextmanager
+import gzip
+import hashlib
+import io
 import os
-from os.path import dirname
+from os.path import dirname, isfile
+import shutil
+import sys
+from typing import BinaryIO, Callable, Iterator
+from urllib.error import HTTPError
+from urllib.parse import urlparse
+from urllib.request import Request, url2pathname, urlopen
+
 from mkdir_p import mkdir_p
 
 
-def download_data(url, output_path):
-    mkdir_p(dirname(output_path))
-    os.system("wget {} -O {}".format(url, output_path))
+CHUNK_SIZE = 1 << 20  # 1 MB
+PART_SUFFIX = '.part'  # content being written
+DOWNLOAD_SUFFIX = '.download'  # raw bytes of an unfinished HTTP download
+GZIP_MAGIC = b'\x1f\x8b'
+
+
+def print_progress(done: int, total: int = None) -> None:
+    """Report download progress on stderr"""
+    if total:
+        sys.stderr.write(f"\r{done / 2 ** 20:.1f} / {total / 2 ** 20:.1f} MB ({done / total:.0%})")
+    else:
+        sys.stderr.write(f"\r{done / 2 ** 20:.1f} MB")
+    if total is not None and done >= total:
+        sys.stderr.write('\n')
+    sys.stderr.flush()
+
+
+class SourceReader(io.RawIOBase):
+
+    """Raw stream of a local path, a file:// or an http(s):// url
+
+    The sha256 of the content is verified at the end of the stream.
+    HTTP downloads are also appended to download_path, a later reader
+    reads that part again and requests only the rest with a Range header.
+    """
+
+    def __init__(
+            self,
+            url: str,
+            download_path: str = None,
+            sha256: str = None,
+            progress: Callable[[int, int], None] = None,
+        ):
+        """
+        download_path: where an HTTP download is kept until it is complete
+        progress: called with (bytes read, total bytes or None) after each read
+        """
+        super().__init__()
+        self.url = url
+        self.download_path = download_path
+        self._sha256 = sha256
+        self._hash = hashlib.sha256() if sha256 else None
+        self._progress = progress
+        self._done = 0
+        self._replay = None
+        self._download = None
+        scheme = urlparse(url).scheme
+        self._is_http = scheme in ('http', 'https')
+        if self._is_http:
+            self._stream, self._total = self._open_http()
+        else:
+            path = url2pathname(urlparse(url).path) if scheme == 'file' else url
+            self._stream = open(path, 'rb')
+            self._total = os.fstat(self._stream.fileno()).st_size
+
+    def _open_http(self):
+        offset = 0
+        if self.download_path is not None and isfile(self.download_path):
+            offset = os.path.getsize(self.download_path)
+        headers = {'Range': f"bytes={offset}-"} if offset else {}
+        try:
+            response = urlopen(Request(self.url, headers=headers))
+        except HTTPError as e:
+            if e.code != 416 or not offset:  # 416: the part is already complete
+                raise
+            self._replay = open(self.download_path, 'rb')
+            return None, offset
+
+        if offset and response.status == 206:
+            self._replay = open(self.download_path, 'rb')
+        else:
+            offset = 0  # the server ignored Range, start over
+        if self.download_path is not None:
+            self._download = open(self.download_path, 'ab' if offset else 'wb')
+        length = response.headers.get('Content-Length')
+        return response, None if length is None else offset + int(length)
+
+    @property
+    def is_download(self) -> bool:
+        """Whether the content is saved to download_path (HTTP sources)"""
+        return self._is_http and self.download_path is not None
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        n_bytes = 0
+        if self._replay is not None:
+            n_bytes = self._replay.readinto(buffer)
+            if n_bytes == 0:
+                self._replay.close()
+                self._replay = None
+        if n_bytes == 0 and self._stream is not None:
+            n_bytes = self._stream.readinto(buffer)
+            if n_bytes and self._download is not None:
+                self._download.write(memoryview(buffer)[:n_bytes])
+        if n_bytes == 0:
+            self._verify()
+            return 0
+        if self._hash is not None:
+            self._hash.update(memoryview(buffer)[:n_bytes])
+        self._done += n_bytes
+        if self._progress is not None:
+            self._progress(self._done, self._total)
+        return n_bytes
+
+    def _verify(self) -> None:
+        if self._hash is None:
+            return
+        digest, self._hash = self._hash.hexdigest(), None
+        if digest != self._sha256.lower():
+            self.close()
+            if self.download_path is not None and isfile(self.download_path):
+                os.remove(self.download_path)
+            raise ValueError(
+                f"sha256 of [{self.url}] is {digest}, expected {self._sha256}",
+            )
+
+    def close(self) -> None:
+        for stream in [self._replay, self._stream, self._download]:
+            if stream is not None:
+                stream.close()
+        super().close()
+
+
+class TeeReader(io.RawIOBase):
+
+    """Raw stream that copies what is read from stream into sink"""
+
+    def __init__(self, stream: BinaryIO, sink: BinaryIO):
+        super().__init__()
+        self._stream = stream
+        self._sink = sink
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        n_bytes = self._stream.readinto(buffer)
+        self._sink.write(memoryview(buffer)[:n_bytes])
+        return n_bytes
+
+
+@contextmanager
+def open_url(
+        url: str,
+        path: str,
+        sha256: str = None,
+        progress: Callable[[int, int], None] = None,
+    ) -> Iterator[BinaryIO]:
+    """Stream the content of url, decompressed if it is gzipped, while saving it to path
+
+        The caller can parse the stream while it is downloaded and
+        decompressed, what the caller does not read is saved as well.
+        path appears only once all of it is written and verified.
+        An interrupted HTTP download resumes from path + DOWNLOAD_SUFFIX.
+
+        sha256: checksum of the (compressed) content of url
+
+    """
+    if dirname(path):
+        mkdir_p(dirname(path))
+    source = SourceReader(
+        url,
+        download_path=path + DOWNLOAD_SUFFIX,
+        sha256=sha256,
+        progress=progress,
+    )
+    try:
+        stream = io.BufferedReader(source, CHUNK_SIZE)
+        if stream.peek(2)[:2] == GZIP_MAGIC:
+            stream = gzip.GzipFile(fileobj=stream)
+        with open(path + PART_SUFFIX, 'wb') as sink:
+            fin = io.BufferedReader(TeeReader(stream, sink), CHUNK_SIZE)
+            yield fin
+            while fin.read(CHUNK_SIZE):
+                pass
+    except BaseException:
+        source.close()
+        if isfile(path + PART_SUFFIX):
+            os.remove(path + PART_SUFFIX)
+        raise
+    source.close()
+    os.replace(path + PART_SUFFIX, path)
+    if isfile(path + DOWNLOAD_SUFFIX):
+        os.remove(path + DOWNLOAD_SUFFIX)
+
+
+def fetch_file(
+        url: str,
+        path: str,
+        sha256: str = None,
+        progress: Callable[[int, int], None] = None,
+    ) -> str:
+    """Download and decompress url into path in one pass, see open_url"""
+    with open_url(url, path, sha256=sha256, progress=progress):
+        pass
+    return path
+
+
+def download_data(url, output_path, sha256=None, progress=None):
+    """Download url into output_path as is, resumable like open_url"""
+    if dirname(output_path):
+        mkdir_p(dirname(output_path))
+    download_path = output_path + DOWNLOAD_SUFFIX
+    with SourceReader(url, download_path=download_path, sha256=sha256, progress=progress) as fin:
+        if not fin.is_download:
+            with open(output_path + PART_SUFFIX, 'wb') as fout:
+                shutil.copyfileobj(fin, fout, CHUNK_SIZE)
+            os.replace(output_path + PART_SUFFIX, output_path)
+            return
+        while fin.read(CHUNK_SIZE):
+            pass
+    os.replace(download_path, output_path)
 
 
 def extract_gz(path):
-    os.system("gzip -d {}".format(path))
+    """Decompress path into path without .gz and remove path, like gzip -d"""
+    output_path = path[:-len('.gz')] if path.endswith('.gz') else path + '.out'
+    with gzip.open(path, 'rb') as fin, open(output_path + PART_SUFFIX, 'wb') as fout:
+        shutil.copyfileobj(fin, fout, CHUNK_SIZE)
+    os.replace(output_path + PART_SUFFIX, output_path)
+    os.remove(path)
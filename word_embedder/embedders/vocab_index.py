@@ -0,0 +1,150 @@
+from bisect import bisect_left
+from itertools import repeat
+from typing import List
+import zlib
+
+import numpy as np
+
+
+class HashVocabIndex:
+
+    """word -> index lookup backed by a dict
+
+    O(1) lookup, costs one dict entry per word.
+    """
+
+    def __init__(self, vocab_list: List[str]):
+        # keep the first occurrence if a word is duplicated,
+        # which is what list.index used to return
+        self._word2index = {}
+        for idx, word in enumerate(vocab_list):
+            self._word2index.setdefault(word, idx)
+
+    def get(self, word: str) -> int:
+        return self._word2index.get(word, -1)
+
+    def get_many(self, words: List[str]) -> np.ndarray:
+        return np.fromiter(
+            map(self._word2index.get, words, repeat(-1)),
+            dtype=np.int64,
+            count=len(words),
+        )
+
+    def __len__(self) -> int:
+        return len(self._word2index)
+
+
+class SortedVocabIndex:
+
+    """word -> index lookup backed by a sorted permutation
+
+    O(log n) lookup, costs one reference and one int32 per word,
+    which is several times smaller than a dict for huge vocabularies.
+    """
+
+    def __init__(self, vocab_list: List[str]):
+        # stable sort keeps the first occurrence of duplicated words first
+        order = sorted(range(len(vocab_list)), key=vocab_list.__getitem__)
+        self._sorted_words = [vocab_list[idx] for idx in order]
+        self._indices = np.array(order, dtype=np.int32)
+
+    def get(self, word: str) -> int:
+        pos = bisect_left(self._sorted_words, word)
+        if pos < len(self._sorted_words) and self._sorted_words[pos] == word:
+            return int(self._indices[pos])
+        return -1
+
+    def get_many(self, words: List[str]) -> np.ndarray:
+        return np.fromiter(
+            map(self.get, words),
+            dtype=np.int64,
+            count=len(words),
+        )
+
+    def __len__(self) -> int:
+        return len(self._sorted_words)
+
+
+class PackedVocabIndex:
+
+    """word -> index lookup over words packed by cache.pack_vocab
+
+    An open-addressing hash table of int32 indices keyed by crc32 of UTF-8 words.
+    All state lives in three flat arrays, so it can be placed in shared memory
+    or a memory map and used by several processes without a copy.
+    """
+
+    def __init__(self, offsets: np.ndarray, blob: np.ndarray, table: np.ndarray):
+        """table is built by build_packed_table(offsets, blob)"""
+        # memoryviews index into plain python ints, several times faster than numpy scalars
+        self._offsets = memoryview(offsets)
+        self._blob = memoryview(blob)
+        self._table = memoryview(table)
+        self._mask = len(table) - 1
+
+    def get(self, word: str) -> int:
+        try:
+            key = word.encode('utf8')
+        except UnicodeEncodeError:
+            return -1
+        slot = zlib.crc32(key) & self._mask
+        while True:
+            idx = self._table[slot]
+            if idx < 0:
+                return -1
+            start = self._offsets[idx]
+            if self._offsets[idx + 1] - start - 1 == len(key) and \
+                    self._blob[start: start + len(key)] == key:
+                return idx
+            slot = (slot + 1) & self._mask
+
+    def get_many(self, words: List[str]) -> np.ndarray:
+        return np.fromiter(
+            map(self.get, words),
+            dtype=np.int64,
+            count=len(words),
+        )
+
+    def __len__(self) -> int:
+        return sum(1 for idx in self._table if idx >= 0)
+
+    def release(self) -> None:
+        """Release views of the arrays, required before closing the buffer they live in"""
+        for view in (self._offsets, self._blob, self._table):
+            view.release()
+
+
+def build_packed_table(offsets: np.ndarray, blob: np.ndarray) -> np.ndarray:
+    """Build the hash table of PackedVocabIndex, kept at most half full"""
+    vocab_size = len(offsets) - 1
+    size = 1 << max(1, (2 * vocab_size - 1).bit_length())
+    mask = size - 1
+    table = [-1] * size
+    data = blob.tobytes()
+    bounds = offsets.tolist()
+    for idx in range(vocab_size):
+        key = data[bounds[idx]: bounds[idx + 1] - 1]
+        slot = zlib.crc32(key) & mask
+        while table[slot] >= 0:
+            other = table[slot]
+            if data[bounds[other]: bounds[other + 1] - 1] == key:
+                # keep the first occurrence of a duplicated word
+                break
+            slot = (slot + 1) & mask
+        else:
+            table[slot] = idx
+    return np.array(table, dtype=np.int32)
+
+
+VOCAB_INDEX_TYPES = {
+    'hash': HashVocabIndex,
+    'sorted': SortedVocabIndex,
+}
+
+
+def build_vocab_index(vocab_list: List[str], index_type: str = 'hash'):
+    if index_type not in VOCAB_INDEX_TYPES:
+        raise ValueError(
+            f"index_type should be one of {sorted(VOCAB_INDEX_TYPES)}, got [{index_type}]",
+        )
+    return VOCAB_INDEX_TYPES[index_type](vocab_list)
@@ -1,47 +1,211 @@
+import hashlib
+import struct
 import warnings
-from typing import List
+from typing import Iterator, List, Tuple
 
 import numpy as np
 
 from .embedders import Embedder
 
 
+BLOCK_SIZE = 65536  # rows gathered at a time
+
+# splitmix64 constants
+_GOLDEN_GAMMA = np.uint64(0x9e3779b97f4a7c15)
+_MIX_1 = np.uint64(0xbf58476d1ce4e5b9)
+_MIX_2 = np.uint64(0x94d049bb133111eb)
+
+
 def get_vectors(
         embedder: Embedder,
         words: List[str] = None,
         seed: int = 2018,
         dtype: str = 'float32',
+        out: np.ndarray = None,
+        block_size: int = BLOCK_SIZE,
     ) -> np.ndarray:
+    """Return vectors of unique words, OOV words get random unit vectors
+
+        Rows are gathered a block of words at a time. The random vector
+        of an OOV word depends only on the word and seed (see oov_vectors),
+        not on its position, the other words or block_size.
+
+        out: array of shape (number of unique words, n_dim) to write into,
+            e.g. a np.memmap for huge word lists
+
+    """
+    if words is None:
+        words = embedder.vocab
+
+    words = remove_duplicated_words(words)
+
+    shape = (len(words), embedder.n_dim)
+    if out is None:
+        out = np.empty(shape, dtype=dtype)
+    elif out.shape != shape:
+        raise ValueError(f"out should have shape {shape}, got {out.shape}")
 
+    for start in range(0, len(words), block_size):
+        words_chunk = words[start:start + block_size]
+        _fill_vectors(embedder, words_chunk, seed, out[start:start + len(words_chunk)])
+    return out
+
+
+def iter_vectors(
+        embedder: Embedder,
+        words: List[str] = None,
+        seed: int = 2018,
+        dtype: str = 'float32',
+        chunk_size: int = BLOCK_SIZE,
+    ) -> Iterator[Tuple[List[str], np.ndarray]]:
+    """Yield (words_chunk, vectors_chunk) of get_vectors chunk by chunk
+
+        Chunks concatenated are equal to get_vectors with the same seed,
+        only one chunk of vectors is in memory at a time.
+
+    """
     if words is None:
         words = embedder.vocab
+    words = remove_duplicated_words(words)
+    return _iter_unique_vectors(embedder, words, seed, np.dtype(dtype), chunk_size)
+
+
+def save_vectors(
+        embedder: Embedder,
+        path: str,
+        words: List[str] = None,
+        seed: int = 2018,
+        dtype: str = 'float32',
+        chunk_size: int = BLOCK_SIZE,
+    ) -> List[str]:
+    """Stream get_vectors into a .npy file, np.load(path, mmap_mode='r') reads it back
+
+        Return the unique words, in the order of rows.
 
+    """
+    if words is None:
+        words = embedder.vocab
     words = remove_duplicated_words(words)
+    dtype = np.dtype(dtype)
+    header = {
+        'descr': np.lib.format.dtype_to_descr(dtype),
+        'fortran_order': False,
+        'shape': (len(words), embedder.n_dim),
+    }
+    with open(path, 'wb') as fout:
+        np.lib.format.write_array_header_1_0(fout, header)
+        for _, vectors in _iter_unique_vectors(embedder, words, seed, dtype, chunk_size):
+            fout.write(vectors.tobytes())
+    return words
+
+
+def _iter_unique_vectors(
+        embedder: Embedder,
+        words: List[str],
+        seed: int,
+        dtype: np.dtype,
+        chunk_size: int,
+    ) -> Iterator[Tuple[List[str], np.ndarray]]:
+    for start in range(0, len(words), chunk_size):
+        words_chunk = words[start:start + chunk_size]
+        vectors = np.empty((len(words_chunk), embedder.n_dim), dtype=dtype)
+        yield words_chunk, _fill_vectors(embedder, words_chunk, seed, vectors)
+
+
+def _fill_vectors(embedder: Embedder, words: List[str], seed: int, out: np.ndarray) -> np.ndarray:
+    """Write vectors of words into out, OOV words get oov_vectors"""
+    if out.dtype == np.float32:
+        _, oov_mask = _get_vectors_batch(embedder, words, out=out)
+    else:
+        vectors, oov_mask = _get_vectors_batch(embedder, words)
+        out[:] = vectors
+    if oov_mask.any():
+        out[oov_mask] = oov_vectors(
+            [words[i] for i in np.flatnonzero(oov_mask)],
+            n_dim=embedder.n_dim,
+            seed=seed,
+            dtype=out.dtype,
+        )
+    return out
 
-    rand_state = np.random.RandomState(seed)
-    embedding = rand_state.rand(len(words), embedder.n_dim).astype(dtype)
 
+def _get_vectors_batch(
+        embedder: Embedder,
+        words: List[str],
+        out: np.ndarray = None,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+    if hasattr(embedder, 'get_vectors_batch'):
+        return embedder.get_vectors_batch(words, out=out)
+    # embedders that only provide get_index and __getitem__
+    if out is None:
+        out = np.empty((len(words), embedder.n_dim), dtype=np.float32)
+    oov_mask = np.zeros(len(words), dtype=bool)
     for i, word in enumerate(words):
-        ind = embedder.get_index(word)
-        if ind != -1:
-            embedding[i, :] = embedder[ind]
+        index = embedder.get_index(word)
+        if index != -1:
+            out[i, :] = embedder[index]
         else:
-            embedding[i, :] = embedding[i, :] / np.linalg.norm(embedding[i, :])
-    return embedding
+            oov_mask[i] = True
+    return out, oov_mask
+
+
+def oov_vectors(
+        words: List[str],
+        n_dim: int,
+        seed: int = 2018,
+        dtype: str = 'float32',
+    ) -> np.ndarray:
+    """Return a random unit vector per word, a pure function of (word, seed)
+
+        Components are uniform in [0, 1) with 24-bit resolution before
+        normalization, drawn with splitmix64 from a 64-bit blake2b hash of
+        the word keyed by seed, so a word gets the same vector alone or in
+        any batch, on any platform.
+
+    """
+    key = struct.pack('<q', seed)
+    word_seeds = np.fromiter(
+        (
+            int.from_bytes(
+                hashlib.blake2b(word.encode('utf8'), digest_size=8, key=key).digest(),
+                'little',
+            )
+            for word in words
+        ),
+        dtype=np.uint64,
+        count=len(words),
+    )
+    # each 64-bit draw gives two 24-bit components
+    n_draws = (n_dim + 1) // 2
+    counters = np.arange(1, n_draws + 1, dtype=np.uint64) * _GOLDEN_GAMMA
+    z = word_seeds[:, None] + counters
+    tmp = np.empty_like(z)
+    for shift, multiplier in [(30, _MIX_1), (27, _MIX_2), (31, None)]:
+        np.right_shift(z, np.uint64(shift), out=tmp)
+        z ^= tmp
+        if multiplier is not None:
+            z *= multiplier
+    vectors = np.empty(
+        (len(words), 2 * n_draws),
+        dtype=np.float64 if np.dtype(dtype) == np.float64 else np.float32,
+    )
+    np.right_shift(z, np.uint64(40), out=tmp)
+    vectors[:, :n_draws] = tmp
+    np.right_shift(z, np.uint64(16), out=tmp)
+    tmp &= np.uint64(0xffffff)
+    vectors[:, n_draws:] = tmp
+    vectors = vectors[:, :n_dim]
+    vectors *= 2. ** -24  # uniform in [0, 1)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors.astype(dtype, copy=False)
 
 
 def remove_duplicated_words(words: List[str]) -> List[str]:
 
-    if len(words) != len(set(words)):
-        duplicate = []
-        visited = {word: False for word in set(words)}
-        unique_words = []
-        for word in words:
-            if visited[word]:
-                duplicate.append(word)
-            else:
-                visited[word] = True
-                unique_words.append(word)
+    unique_words = list(dict.fromkeys(words))
+    if len(unique_words) != len(words):
+        seen = set()
+        duplicate = [word for word in words if word in seen or seen.add(word)]
         warnings.warn(
             f"The input words are not unique. Duplicated elements are {duplicate}.",
             RuntimeWarning,
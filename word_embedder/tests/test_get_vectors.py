@@ -1,13 +1,23 @@
+from os.path import abspath, dirname, join
+import shutil
+import tempfile
 from unittest import TestCase
 
 import numpy as np
 
+from ..embedders import KeyedVectors
 from ..get_vectors import (
     get_vectors,
+    iter_vectors,
+    oov_vectors,
     remove_duplicated_words,
+    save_vectors,
 )
 
 
+DATA_DIR = join(dirname(dirname(abspath(__file__))), 'embedders', 'tests', 'data')
+
+
 class MockEmbedder(object):
 
     def __init__(self):
@@ -85,3 +95,129 @@ class GetVectorsTestCase(TestCase):
         )
         expected_output = self.mocked_embedder.vectors[0: 3, ]
         np.testing.assert_array_equal(output, expected_output)
+
+    def test_get_vectors_oov_unit_norm(self):
+        output = get_vectors(
+            embedder=self.mocked_embedder,
+            words=['家豪', '建甫', '志明', '春嬌'],
+        )
+        np.testing.assert_array_equal(self.mocked_embedder.vectors[2], output[1])
+        np.testing.assert_allclose([1., 1., 1.], np.linalg.norm(output[[0, 2, 3]], axis=1))
+
+    def test_get_vectors_deterministic(self):
+        words = ['家豪', '記良', '志明', '隼興', '春嬌']
+        output = get_vectors(embedder=self.mocked_embedder, words=words, seed=1)
+        np.testing.assert_array_equal(
+            output,
+            get_vectors(embedder=self.mocked_embedder, words=words, seed=1, block_size=2),
+        )
+        self.assertFalse(np.array_equal(
+            output,
+            get_vectors(embedder=self.mocked_embedder, words=words, seed=2),
+        ))
+
+    def test_get_vectors_oov_stable(self):
+        output = get_vectors(embedder=self.mocked_embedder, words=['家豪', '志明'])
+        np.testing.assert_array_equal(
+            output[::-1],
+            get_vectors(embedder=self.mocked_embedder, words=['志明', '記良', '家豪'])[[0, 2]],
+        )
+        np.testing.assert_array_equal(
+            output[1],
+            get_vectors(embedder=self.mocked_embedder, words=['志明'])[0],
+        )
+
+    def test_oov_vectors(self):
+        vectors = oov_vectors(['家豪', '志明', '家豪'], n_dim=50)
+        self.assertEqual((3, 50), vectors.shape)
+        self.assertEqual(np.float32, vectors.dtype)
+        np.testing.assert_array_equal(vectors[0], vectors[2])
+        self.assertFalse(np.array_equal(vectors[0], vectors[1]))
+        np.testing.assert_allclose([1., 1., 1.], np.linalg.norm(vectors, axis=1), rtol=1e-6)
+        self.assertTrue((vectors >= 0.).all())
+        np.testing.assert_array_equal(vectors[1:2], oov_vectors(['志明'], n_dim=50))
+        self.assertFalse(np.array_equal(vectors[1:2], oov_vectors(['志明'], n_dim=50, seed=1)))
+
+    def test_oov_vectors_empty(self):
+        self.assertEqual((0, 3), oov_vectors([], n_dim=3).shape)
+
+    def test_get_vectors_into_out(self):
+        out = np.zeros((3, 3), dtype=np.float64)
+        output = get_vectors(
+            embedder=self.mocked_embedder,
+            words=['勤彥', '家豪', '宜恩'],
+            out=out,
+        )
+        self.assertIs(out, output)
+        self.assertEqual([4., 4., 4.], out[0].tolist())
+        self.assertEqual([6., 6., 6.], out[2].tolist())
+        self.assertAlmostEqual(1., np.linalg.norm(out[1]))
+
+    def test_get_vectors_wrong_out_shape(self):
+        with self.assertRaises(ValueError):
+            get_vectors(
+                embedder=self.mocked_embedder,
+                words=['勤彥', '家豪'],
+                out=np.zeros((3, 3)),
+            )
+
+    def test_get_vectors_all_vocab(self):
+        output = get_vectors(embedder=self.mocked_embedder)
+        np.testing.assert_array_equal(self.mocked_embedder.vectors, output)
+
+    def test_get_vectors_batch_embedder(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = join(tmp_dir, 'example.vec')
+            shutil.copy(join(DATA_DIR, 'example.vec'), path)
+            embedder = KeyedVectors(path=path)
+            embedder.build()
+            words = ['隼興', '家豪', 'gb']
+            out = np.zeros((3, embedder.n_dim), dtype=np.float32)
+            output = get_vectors(embedder=embedder, words=words, out=out, block_size=2)
+            self.assertIs(out, output)
+            np.testing.assert_array_equal(embedder['隼興'], out[0])
+            np.testing.assert_array_equal(embedder['gb'], out[2])
+            np.testing.assert_array_equal(
+                oov_vectors(['家豪'], n_dim=embedder.n_dim)[0], out[1])
+
+
+class IterVectorsTestCase(TestCase):
+
+    def setUp(self):
+        self.embedder = MockEmbedder()
+        self.words = ['家豪', '記良', '志明', '隼興', '記良', '春嬌', '宜恩']
+        self.unique_words = ['家豪', '記良', '志明', '隼興', '春嬌', '宜恩']
+
+    def test_iter_vectors(self):
+        chunks = list(iter_vectors(self.embedder, words=self.words, chunk_size=4))
+        self.assertEqual(
+            [['家豪', '記良', '志明', '隼興'], ['春嬌', '宜恩']],
+            [words for words, _ in chunks],
+        )
+        self.assertEqual([(4, 3), (2, 3)], [vectors.shape for _, vectors in chunks])
+        np.testing.assert_array_equal(
+            get_vectors(self.embedder, words=self.words),
+            np.concatenate([vectors for _, vectors in chunks]),
+        )
+
+    def test_iter_vectors_all_vocab(self):
+        chunks = list(iter_vectors(self.embedder, chunk_size=5, dtype='float16'))
+        self.assertEqual(self.embedder.vocab, [word for words, _ in chunks for word in words])
+        self.assertEqual(np.float16, chunks[0][1].dtype)
+        np.testing.assert_array_equal(
+            self.embedder.vectors,
+            np.concatenate([vectors for _, vectors in chunks]),
+        )
+
+    def test_save_vectors(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = join(tmp_dir, 'vectors.npy')
+            words = save_vectors(self.embedder, path, words=self.words, chunk_size=4)
+            self.assertEqual(self.unique_words, words)
+            vectors = np.load(path, mmap_mode='r')
+            self.assertEqual(np.float32, vectors.dtype)
+            np.testing.assert_array_equal(
+                get_vectors(self.embedder, words=self.words),
+                vectors,
+            )
+            del vectors